@@ -369,12 +369,13 @@ async def delete_general_conversation(
         document_model.Document.conversation_id == conversation_id
     ).all()
 
-    for document in documents:
-        if settings.RAG_SERVICE_ENABLED and rag_client:
-            try:
+    if documents and settings.RAG_SERVICE_ENABLED and rag_client:
+        # Un único borrado por conversation_id en segundo plano
+        if not await rag_client.delete_by_filter(conversation_id=conversation_id):
+            for document in documents:
                 await rag_client.delete_document(document.id)
-            except Exception:
-                pass
+
+    for document in documents:
         db.delete(document)
     
     db.delete(conversation)
@@ -431,15 +432,18 @@ async def delete_conversation(
         document_model.Document.conversation_id == conversation_id
     ).all()
 
-    for document in documents:
-        # Eliminar del servicio RAG externo (si está habilitado)
-        if settings.RAG_SERVICE_ENABLED and rag_client:
-            try:
-                await rag_client.delete_document(document.id)
-                print(f"Documento {document.id} eliminado del servicio RAG")
-            except Exception as exc:
-                print(f"ERROR eliminando del RAG {document.id}: {exc}")
+    # Eliminar del servicio RAG externo con un único borrado por conversación en segundo plano
+    if documents and settings.RAG_SERVICE_ENABLED and rag_client:
+        job_id = await rag_client.delete_by_filter(conversation_id=conversation_id)
+        if job_id:
+            print(f"Conversación {conversation_id}: borrado RAG en segundo plano (job {job_id})")
+        else:
+            # Fallback: servicio RAG sin borrado por filtro
+            for document in documents:
+                if not await rag_client.delete_document(document.id):
+                    print(f"ERROR eliminando del RAG {document.id}")
 
+    for document in documents:
         # Eliminar de la BD explícitamente (no confiar en cascada)
         try:
             db.delete(document)
@@ -115,7 +115,8 @@ async def copilot_chat(request: Request):
                 rag_results = await rag_client.search(
                     query=last_user_message,
                     workspace_id=workspace_id,
-                    limit=5
+                    limit=5,
+                    fields=["chunk_index"]
                 )
                 rag_chunks = [
                     DocumentChunk(
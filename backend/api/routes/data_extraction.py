@@ -116,7 +116,8 @@ async def extract_data(
         rag_results = await rag_client.search(
             query=f"información de {request.data_type}",
             workspace_id=workspace_id,
-            limit=10
+            limit=10,
+            fields=[]
         )
         
         context = "\n\n".join([r.content for r in rag_results])
@@ -2,7 +2,8 @@ import httpx
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from typing import List, Any
 from core.config import settings
-from core.auth import get_current_active_user
+from core.auth import get_current_active_user, get_current_superuser
+from core.celery_app import celery_app
 from models import rag_schemas
 from models.user import User
 
@@ -69,3 +70,33 @@ async def health_check(
     Proxy to RAG Service: Health check.
     """
     return await forward_request("GET", "/health")
+
+
+@router.post("/reconcile", status_code=status.HTTP_202_ACCEPTED)
+def reconcile_index(
+    dry_run: bool = True,
+    current_user: User = Depends(get_current_superuser)
+):
+    """
+    Reconcilia el índice vectorial con la tabla documents en el worker:
+    elimina chunks huérfanos y re-encola documentos sin indexar.
+    Por defecto solo reporta (dry_run). Requiere permisos de superusuario.
+    """
+    task = celery_app.send_task("processing.tasks.reconcile_vector_index", kwargs={"dry_run": dry_run})
+    return {"task_id": task.id, "dry_run": dry_run}
+
+@router.get("/reconcile/{task_id}")
+def reconcile_status(
+    task_id: str,
+    current_user: User = Depends(get_current_superuser)
+):
+    """
+    Estado y reporte de una reconciliación. Requiere permisos de superusuario.
+    """
+    result = celery_app.AsyncResult(task_id)
+    response = {"task_id": task_id, "status": result.status}
+    if result.successful():
+        response["report"] = result.result
+    elif result.failed():
+        response["error"] = str(result.result)
+    return response
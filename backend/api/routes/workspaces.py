@@ -1086,12 +1086,14 @@ async def chat_with_workspace(
                 conversation_id=conversation.id,  # Agregar filtro por conversación
                 limit=top_k,
                 threshold=0.25,
+                fields=["chunk_index"],
             )
+            # Cada resultado es una ventana padre (chunks adyacentes ya fusionados y sin duplicados)
             relevant_chunks = [
                 schemas.DocumentChunk(
                     document_id=r.document_id,
                     chunk_text=r.content,
-                    chunk_index=0,
+                    chunk_index=r.metadata.get("chunk_index", 0) if r.metadata else 0,
                     score=r.score,
                 )
                 for r in rag_results
@@ -1363,20 +1365,21 @@ async def delete_workspace(
 
     documents = list(db_workspace.documents)
 
-    for document in documents:
-        # Eliminar del servicio RAG externo (si está habilitado)
-        if settings.RAG_SERVICE_ENABLED and rag_client:
-            try:
-                await rag_client.delete_document(document.id)
-                print(f"Documento {document.id} eliminado del servicio RAG externo")
-            except Exception as exc:
-                print(f"ERROR eliminando del RAG externo {document.id}: {exc}")
+    # Eliminar del servicio RAG externo con un único borrado por workspace_id en segundo plano
+    if settings.RAG_SERVICE_ENABLED and rag_client:
+        job_id = await rag_client.delete_by_filter(workspace_id=workspace_id)
+        if job_id:
+            print(f"Workspace {workspace_id}: borrado RAG en segundo plano (job {job_id})")
+        else:
+            # Fallback: servicio RAG sin borrado por filtro
+            for document in documents:
+                if not await rag_client.delete_document(document.id):
+                    print(f"ERROR eliminando del RAG externo {document.id}")
 
+    for document in documents:
         db.delete(document)
 
-    # Nota: El servicio RAG externo elimina documentos individualmente
-    # No hay concepto de "workspace vectors" en el servicio externo
-    print(f"Workspace {workspace_id} eliminado (documentos ya eliminados del RAG)")
+    print(f"Workspace {workspace_id} eliminado")
 
     db.delete(db_workspace)
     db.commit()
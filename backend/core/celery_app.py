@@ -16,4 +16,13 @@ celery_app.conf.update(
 )
 
 # Le dice a Celery que busque tareas en el módulo 'backend.processing.tasks'
-celery_app.autodiscover_tasks(['processing'])
\ No newline at end of file
+celery_app.autodiscover_tasks(['processing'])
+
+# Reconciliación periódica índice vectorial <-> MySQL (requiere un proceso `celery beat`)
+if settings.RAG_RECONCILE_INTERVAL_HOURS > 0:
+    celery_app.conf.beat_schedule = {
+        "reconcile-vector-index": {
+            "task": "processing.tasks.reconcile_vector_index",
+            "schedule": settings.RAG_RECONCILE_INTERVAL_HOURS * 3600,
+        }
+    }
@@ -85,6 +85,18 @@ class Settings(BaseSettings):
     RAG_SERVICE_API_KEY: Optional[str] = None
     RAG_SERVICE_TIMEOUT: float = 120.0
     RAG_SERVICE_ENABLED: bool = True
+    RAG_SEARCH_MODE: str = "dense"  # dense, hybrid (dense + BM25 con RRF)
+    RAG_SEARCH_CUTOFF: Optional[str] = None  # None, gap, knee (top-k dinámico según scores)
+    RAG_SEARCH_MMR: bool = False  # Diversificación MMR y descarte de chunks casi duplicados
+    RAG_WIRE_FORMAT: str = "msgpack"  # msgpack, json (formato de respuesta negociado con el servicio RAG)
+
+    # Reconciliación índice vectorial <-> tabla documents (processing.reconciliation)
+    RAG_RECONCILE_INTERVAL_HOURS: float = 0  # Ejecución periódica vía Celery beat (0 = solo bajo demanda)
+    RAG_RECONCILE_DELETE_BATCH: int = 500  # Documentos huérfanos por llamada de borrado
+    RAG_RECONCILE_REQUEUE_BATCH: int = 20  # Documentos re-encolados por lote
+    RAG_RECONCILE_REQUEUE_INTERVAL: int = 60  # Segundos entre lotes re-encolados
+    RAG_RECONCILE_MAX_REQUEUE: int = 500  # Máximo de documentos re-encolados por ejecución
+    RAG_RECONCILE_MAX_ORPHAN_RATIO: float = 0.5  # Por encima, no se borra nada (¿BD equivocada o vacía?)
     
     # ========================================================================
     # FILE UPLOAD
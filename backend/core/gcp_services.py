@@ -148,6 +148,21 @@ class GCPServices:
             logger.error(f"Error downloading blob {blob_name} to file: {e}")
             return False
 
+    def blob_exists(self, blob_name: str, bucket_name: str | None = None) -> bool:
+        """
+        Checks whether a blob exists, without downloading it.
+        """
+        bucket_name = bucket_name or os.getenv("GCS_BUCKET_NAME")
+        if not self.storage_client or not bucket_name:
+             logger.warning("Storage client not initialized or Bucket Name missing.")
+             return False
+
+        try:
+            return self.storage_client.bucket(bucket_name).blob(blob_name).exists()
+        except Exception as e:
+            logger.error(f"Error checking blob {blob_name}: {e}")
+            return False
+
     def open_file_stream(self, blob_name: str, bucket_name: str | None = None):
         """
         Opens a stream for reading.
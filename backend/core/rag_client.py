@@ -6,15 +6,26 @@ que maneja la búsqueda semántica, ingesta de documentos y gestión de embeddin
 """
 
 import httpx
-from typing import List, Dict, Optional, Any
+import msgpack
+from typing import List, Dict, Optional, Any, AsyncIterable, Iterable, Union
 from pydantic import BaseModel
 import logging
 import json
 from core.config import settings
 
+MSGPACK = "application/msgpack"
+
 logger = logging.getLogger(__name__)
 
 
+class RAGServiceError(Exception):
+    """Error del servicio RAG; status_code es None si no hubo respuesta HTTP."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
 # ============================================================================
 # SCHEMAS - Compatibles con el servicio RAG implementado
 # ============================================================================
@@ -38,6 +49,11 @@ class SearchRequest(BaseModel):
     conversation_id: Optional[str] = None
     limit: int = 15
     threshold: float = 0.6
+    mode: str = "dense"
+    route_documents: Optional[int] = None
+    cutoff: Optional[str] = None
+    mmr: bool = False
+    fields: Optional[List[str]] = None
 
 class RAGIngestRequest(BaseModel):
     document_id: str
@@ -53,6 +69,7 @@ class IngestResponse(BaseModel):
     chunks_count: int
     status: str
     message: Optional[str] = None
+    chunks_embedded: Optional[int] = None  # Chunks nuevos/modificados re-embebidos
 
 
 # ============================================================================
@@ -95,6 +112,10 @@ class RAGClient:
         """Obtiene o crea un cliente HTTP async"""
         if self._client is None:
             headers = {"Content-Type": "application/json"}
+            # El servicio responde msgpack si lo acepta el cliente; si no (o en
+            # versiones anteriores del servicio) responde JSON
+            if settings.RAG_WIRE_FORMAT == "msgpack":
+                headers["Accept"] = f"{MSGPACK}, application/json;q=0.9"
             if self.api_key:
                 headers["Authorization"] = f"Bearer {self.api_key}"
 
@@ -112,16 +133,20 @@ class RAGClient:
         try:
             response = await client.request(method, url, **kwargs)
             response.raise_for_status()
+            if response.headers.get("content-type", "").startswith(MSGPACK):
+                return msgpack.unpackb(response.content, raw=False)
             return response.json()
         except httpx.HTTPStatusError as e:
             logger.error(f"RAG HTTP error {e.response.status_code}: {e.response.text}")
-            raise Exception(f"RAG service error: {e.response.status_code}")
+            raise RAGServiceError(
+                f"RAG service error: {e.response.status_code}", e.response.status_code
+            )
         except httpx.RequestError as e:
             logger.error(f"RAG request error: {e}")
-            raise Exception(f"RAG service unavailable: {e}")
+            raise RAGServiceError(f"RAG service unavailable: {e}")
         except Exception as e:
             logger.error(f"RAG unexpected error: {e}")
-            raise Exception(f"RAG service error: {e}")
+            raise RAGServiceError(f"RAG service error: {e}")
 
     async def search(
         self,
@@ -129,7 +154,12 @@ class RAGClient:
         workspace_id: Optional[str] = None,
         conversation_id: Optional[str] = None,
         limit: int = 5,
-        threshold: float = 0.7
+        threshold: float = 0.7,
+        mode: Optional[str] = None,
+        route_documents: Optional[int] = None,
+        cutoff: Optional[str] = None,
+        mmr: Optional[bool] = None,
+        fields: Optional[List[str]] = None
     ) -> List[SearchResult]:
         """
         Busca documentos relevantes para una consulta.
@@ -140,6 +170,13 @@ class RAGClient:
             conversation_id: ID de la conversación (opcional, para filtrar documentos específicos)
             limit: Número máximo de resultados
             threshold: Umbral mínimo de similitud
+            mode: "dense" o "hybrid" (dense + BM25). Por defecto settings.RAG_SEARCH_MODE
+            route_documents: Búsqueda en dos etapas: limita los chunks a los N documentos
+                más cercanos a la consulta (0 la desactiva; None usa el valor del servicio)
+            cutoff: Corte dinámico de resultados, "gap" o "knee". Por defecto settings.RAG_SEARCH_CUTOFF
+            mmr: Diversificación MMR (descarta chunks casi duplicados). Por defecto settings.RAG_SEARCH_MMR
+            fields: Claves de metadata a recibir (None = todas, [] = ninguna); el resto
+                no se lee de Qdrant ni viaja por la red
 
         Returns:
             Lista de resultados de búsqueda ordenados por score
@@ -148,25 +185,24 @@ class RAGClient:
             payload = {
                 "query": query,
                 "limit": limit,
-                "threshold": threshold
+                "threshold": threshold,
+                "mode": mode or settings.RAG_SEARCH_MODE,
+                "cutoff": cutoff or settings.RAG_SEARCH_CUTOFF,
+                "mmr": settings.RAG_SEARCH_MMR if mmr is None else mmr
             }
             if workspace_id:
                 payload["workspace_id"] = workspace_id
             if conversation_id:
                 payload["conversation_id"] = conversation_id
+            if route_documents is not None:
+                payload["route_documents"] = route_documents
+            if fields is not None:
+                payload["fields"] = fields
 
             response_data = await self._make_request("POST", "/search", json=payload)
 
-            # Convertir respuesta a objetos SearchResult
-            results = []
-            for item in response_data:
-                result = SearchResult(
-                    document_id=item["document_id"],
-                    content=item["content"],
-                    metadata=item["metadata"],  # Mantener como dict
-                    score=item["score"]
-                )
-                results.append(result)
+            # El servicio ya validó los resultados: se envuelven sin volver a copiarlos
+            results = [SearchResult.model_construct(**item) for item in response_data]
 
             logger.info(f"RAG search: {len(results)} results for '{query[:50]}...'")
             return results
@@ -175,6 +211,62 @@ class RAGClient:
             logger.error(f"RAG search error: {e}")
             return []  # Retornar lista vacía en caso de error
 
+    async def search_many(
+        self,
+        queries: List[Dict[str, Any]],
+        threshold: float = 0.7,
+        mode: Optional[str] = None
+    ) -> List[List[SearchResult]]:
+        """
+        Ejecuta varias búsquedas en una sola petición (/search_batch): un único
+        batch de embeddings y una consulta batch en Qdrant.
+
+        Args:
+            queries: Lista de dicts con "query" y opcionalmente "workspace_id",
+                "conversation_id", "limit", "threshold", "mode", "route_documents",
+                "cutoff", "mmr" y "fields"
+            threshold: Umbral por defecto para las consultas que no lo indiquen
+            mode: Modo por defecto ("dense" o "hybrid"); por defecto settings.RAG_SEARCH_MODE
+
+        Returns:
+            Una lista de resultados por consulta, en el mismo orden
+            (listas vacías si el servicio falla)
+        """
+        if not queries:
+            return []
+
+        try:
+            payload = {
+                "queries": [
+                    {
+                        "limit": 5,
+                        "threshold": threshold,
+                        "mode": mode or settings.RAG_SEARCH_MODE,
+                        "cutoff": settings.RAG_SEARCH_CUTOFF,
+                        "mmr": settings.RAG_SEARCH_MMR,
+                        **{k: v for k, v in q.items() if v is not None}
+                    }
+                    for q in queries
+                ]
+            }
+
+            response_data = await self._make_request("POST", "/search_batch", json=payload)
+
+            results = [
+                [SearchResult.model_construct(**item) for item in hits]
+                for hits in response_data
+            ]
+
+            logger.info(
+                f"RAG search_many: {len(queries)} queries, "
+                f"{sum(len(r) for r in results)} results"
+            )
+            return results
+
+        except Exception as e:
+            logger.error(f"RAG search_many error: {e}")
+            return [[] for _ in queries]
+
     async def ingest_text_content(
         self,
         document_id: str,
@@ -214,6 +306,66 @@ class RAGClient:
             logger.error(f"RAG ingest text error: {e}")
             return None
 
+    async def ingest_text_stream(
+        self,
+        document_id: str,
+        workspace_id: str,
+        segments: Union[Iterable[str], AsyncIterable[str]],
+        metadata: Dict[str, Any],
+        user_id: Optional[str] = None
+    ) -> Optional[IngestResponse]:
+        """
+        Indexa un documento enviando el texto por segmentos (NDJSON) a medida que
+        se extrae, sin construir el documento completo en memoria.
+
+        Args:
+            document_id: ID único del documento
+            workspace_id: ID del workspace
+            segments: Segmentos de texto en orden (p.ej. el generador del parser)
+            metadata: Metadata adicional
+            user_id: ID del usuario (opcional)
+
+        Returns:
+            Respuesta de ingestión (status "empty" y 0 chunks si el documento no
+            tiene texto indexable) o None si falla
+        """
+        async def ndjson_body():
+            header = {
+                "document_id": document_id,
+                "workspace_id": workspace_id,
+                "metadata": metadata,
+                "user_id": user_id
+            }
+            yield (json.dumps(header) + "\n").encode("utf-8")
+            if hasattr(segments, "__aiter__"):
+                async for segment in segments:
+                    yield (json.dumps({"text": segment}) + "\n").encode("utf-8")
+            else:
+                for segment in segments:
+                    yield (json.dumps({"text": segment}) + "\n").encode("utf-8")
+
+        try:
+            response_data = await self._make_request(
+                "POST",
+                "/ingest_stream",
+                content=ndjson_body(),
+                headers={"Content-Type": "application/x-ndjson"}
+            )
+            result = IngestResponse(**response_data)
+            logger.info(f"RAG ingest stream: {result.document_id} with {result.chunks_count} chunks")
+            return result
+
+        except RAGServiceError as e:
+            # 422: el stream llegó completo pero sin texto (imagen escaneada, archivo vacío)
+            if e.status_code == 422:
+                logger.warning(f"RAG ingest stream: {document_id} has no indexable text")
+                return IngestResponse(document_id=document_id, chunks_count=0, status="empty")
+            logger.error(f"RAG ingest stream error: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"RAG ingest stream error: {e}")
+            return None
+
     async def delete_document(self, document_id: str) -> bool:
         """
         Elimina un documento del servicio RAG.
@@ -235,6 +387,83 @@ class RAGClient:
             logger.error(f"RAG delete error for {document_id}: {e}")
             return False
 
+    async def delete_by_filter(
+        self,
+        workspace_id: Optional[str] = None,
+        conversation_id: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        Elimina en segundo plano todos los chunks de un workspace y/o conversación.
+
+        El servicio RAG responde de inmediato; el borrado se ejecuta como un
+        único filter-delete en Qdrant.
+
+        Args:
+            workspace_id: ID del workspace a eliminar
+            conversation_id: ID de la conversación a eliminar
+
+        Returns:
+            ID del job de borrado (consultable con get_job), o None si falló
+        """
+        payload = {"workspace_id": workspace_id, "conversation_id": conversation_id}
+        try:
+            response_data = await self._make_request("POST", "/delete_by_filter", json=payload)
+            job_id = response_data.get("job_id")
+            logger.info(f"RAG delete_by_filter: job {job_id} queued for {payload}")
+            return job_id
+
+        except Exception as e:
+            logger.error(f"RAG delete_by_filter error for {payload}: {e}")
+            return None
+
+    async def delete_documents(self, document_ids: List[str]) -> Optional[int]:
+        """
+        Elimina los chunks de varios documentos con un único filter-delete.
+
+        Args:
+            document_ids: IDs de los documentos (máximo 1000 por llamada)
+
+        Returns:
+            Número de chunks eliminados, o None si falló
+        """
+        try:
+            response_data = await self._make_request(
+                "POST", "/delete_documents", json={"document_ids": document_ids}
+            )
+            return response_data.get("deleted_chunks", 0)
+
+        except Exception as e:
+            logger.error(f"RAG delete_documents error ({len(document_ids)} documentos): {e}")
+            return None
+
+    async def index_documents(self) -> Optional[Dict[str, Any]]:
+        """
+        Inventario del índice vectorial, para reconciliarlo con la base de datos.
+
+        Returns:
+            Dict con collection, documents ({document_id: chunks}), chunks y
+            storage (puntos, segmentos y colecciones obsoletas), o None si falló
+        """
+        try:
+            return await self._make_request("GET", "/index/documents")
+        except Exception as e:
+            logger.error(f"RAG index_documents error: {e}")
+            return None
+
+    async def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Consulta el estado de un job en segundo plano del servicio RAG.
+
+        Returns:
+            Dict con status (pending, running, completed, failed), result y error,
+            o None si el job no existe o el servicio no responde
+        """
+        try:
+            return await self._make_request("GET", f"/jobs/{job_id}")
+        except Exception as e:
+            logger.error(f"RAG job status error for {job_id}: {e}")
+            return None
+
     async def health_check(self) -> Dict[str, Any]:
         """
         Verifica el estado del servicio RAG.
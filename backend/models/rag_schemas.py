@@ -7,6 +7,11 @@ class SearchRequest(BaseModel):
     conversation_id: Optional[str] = None
     limit: int = Field(5, ge=1, le=50)
     threshold: float = Field(0.0, ge=0.0, le=1.0)
+    mode: str = Field("dense", pattern="^(dense|hybrid)$")
+    route_documents: Optional[int] = Field(None, ge=0, le=100)
+    expand_context: bool = True
+    cutoff: Optional[str] = Field(None, pattern="^(gap|knee)$")
+    mmr: bool = False
 
     @validator('query')
     def query_not_empty(cls, v):
@@ -32,6 +37,7 @@ class IngestResponse(BaseModel):
     document_id: str
     chunks_count: int
     status: str
+    chunks_embedded: Optional[int] = None
 
 class BatchIngestRequest(BaseModel):
     documents: List[RAGIngestRequest]
@@ -0,0 +1,206 @@
+"""
+Reconciliación entre la tabla `documents` (MySQL) y el índice vectorial (Qdrant).
+
+Los dos almacenes se escriben por separado, así que pueden divergir: un borrado
+en el RAG que falla deja chunks huérfanos que siguen apareciendo en búsquedas y
+ocupando memoria, y una ingesta que falla con el RAG caído deja documentos
+COMPLETED sin puntos. Esta tarea compara ambos lados y corrige en lotes:
+
+- Huérfanos: documentos con chunks en el índice que no existen en MySQL, o que
+  están FAILED (puntos parciales de una ingesta interrumpida). Se eliminan.
+- Faltantes: documentos COMPLETED con chunk_count > 0 sin ningún chunk. Se
+  vuelven a PENDING y se re-encolan en process_document, por lotes espaciados
+  para no saturar al worker. Los COMPLETED con chunk_count = 0 no tienen texto
+  indexable (o se procesaron con el RAG desactivado) y no se re-encolan: una
+  ingesta fallida deja el documento FAILED, no COMPLETED.
+
+Los documentos PENDING/PROCESSING no se tocan: su ingesta puede estar en curso.
+"""
+
+import logging
+import os
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from core.celery_app import celery_app
+from core.config import settings
+from core.gcp_services import gcp_services
+from core.rag_client import RAGClient
+from models import document as document_model
+
+logger = logging.getLogger(__name__)
+
+# Mismo directorio que usa la subida de archivos (api/routes/workspaces.py)
+UPLOAD_DIR = Path("uploaded_files")
+
+# Sus chunks en el índice son restos parciales de una ingesta fallida
+ORPHAN_STATUSES = ("FAILED",)
+
+
+def resolve_file_uri(document_id: str, file_name: str) -> Optional[str]:
+    """
+    Ubicación del archivo original, con el mismo formato que recibe
+    process_document: ruta local (uploaded_files/{id}{ext}) o gs://bucket/{id}{ext}.
+    """
+    for file_path in UPLOAD_DIR.glob(f"{document_id}.*"):
+        return str(file_path)
+
+    if settings.GCS_BUCKET_NAME:
+        blob_name = f"{document_id}{os.path.splitext(file_name or '')[1]}"
+        if gcp_services.blob_exists(blob_name, settings.GCS_BUCKET_NAME):
+            return f"gs://{settings.GCS_BUCKET_NAME}/{blob_name}"
+    return None
+
+
+def _batches(items: List[Any], size: int):
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+async def _delete_orphans(rag_client: RAGClient, orphans: List[str]) -> Dict[str, Any]:
+    deleted_chunks = 0
+    deleted_documents = 0
+    for batch in _batches(orphans, settings.RAG_RECONCILE_DELETE_BATCH):
+        deleted = await rag_client.delete_documents(batch)
+        if deleted is None:
+            return {
+                "deleted_documents": deleted_documents,
+                "deleted_chunks": deleted_chunks,
+                "error": "delete_documents falló; se reintentará en la próxima ejecución",
+            }
+        deleted_documents += len(batch)
+        deleted_chunks += deleted
+    return {"deleted_documents": deleted_documents, "deleted_chunks": deleted_chunks}
+
+
+def _requeue_missing(db: Session, missing: List[Any]) -> Dict[str, Any]:
+    """Vuelve los documentos a PENDING y los re-encola en lotes espaciados."""
+    recoverable = []
+    unrecoverable = []
+    for row in missing:
+        file_uri = resolve_file_uri(row.id, row.file_name)
+        if file_uri:
+            recoverable.append((row.id, file_uri))
+        else:
+            unrecoverable.append(row.id)
+
+    requeued = 0
+    for i, batch in enumerate(_batches(recoverable, settings.RAG_RECONCILE_REQUEUE_BATCH)):
+        ids = [document_id for document_id, _ in batch]
+        # process_document ignora los documentos que ya están COMPLETED
+        db.query(document_model.Document).filter(
+            document_model.Document.id.in_(ids),
+            document_model.Document.status == "COMPLETED",
+        ).update({"status": "PENDING"}, synchronize_session=False)
+        db.commit()
+        for document_id, file_uri in batch:
+            celery_app.send_task(
+                "processing.tasks.process_document",
+                args=[document_id, file_uri],
+                countdown=i * settings.RAG_RECONCILE_REQUEUE_INTERVAL,
+            )
+        requeued += len(batch)
+
+    return {"requeued": requeued, "unrecoverable": unrecoverable}
+
+
+async def reconcile_vector_index(
+    db: Session, rag_client: RAGClient, dry_run: bool = False
+) -> Dict[str, Any]:
+    """
+    Compara MySQL con el índice vectorial, elimina huérfanos y re-encola faltantes.
+
+    Args:
+        db: Sesión de base de datos
+        rag_client: Cliente del servicio RAG
+        dry_run: Solo reportar, sin borrar ni re-encolar
+
+    Returns:
+        Reporte con conteos por estado, huérfanos, faltantes y bloat del índice
+    """
+    started = time.perf_counter()
+
+    # El inventario va primero: un documento nuevo existe en MySQL antes de
+    # tener chunks, así que nunca aparece como huérfano
+    inventory = await rag_client.index_documents()
+    if inventory is None:
+        raise RuntimeError("No se pudo obtener el inventario del índice vectorial")
+    indexed: Dict[str, int] = inventory["documents"]
+    storage = inventory.get("storage", {})
+
+    rows = db.query(
+        document_model.Document.id,
+        document_model.Document.status,
+        document_model.Document.file_name,
+        document_model.Document.chunk_count,
+    ).all()
+    statuses = {row.id: row.status for row in rows}
+
+    orphans = sorted(
+        document_id
+        for document_id in indexed
+        if document_id not in statuses or statuses[document_id] in ORPHAN_STATUSES
+    )
+    orphan_chunks = sum(indexed[document_id] for document_id in orphans)
+    missing = [
+        row
+        for row in rows
+        if row.status == "COMPLETED" and row.chunk_count and row.id not in indexed
+    ]
+    empty = sum(1 for row in rows if row.status == "COMPLETED" and not row.chunk_count)
+
+    stale_points = storage.get("stale_points", 0)
+    stored_points = inventory.get("chunks", 0) + stale_points
+    report: Dict[str, Any] = {
+        "dry_run": dry_run,
+        "collection": inventory.get("collection"),
+        "mysql": {"documents": len(rows), "by_status": dict(Counter(statuses.values()))},
+        "index": {
+            "documents": len(indexed),
+            "chunks": inventory.get("chunks", 0),
+            "segments": storage.get("segments"),
+            "stale_collections": storage.get("stale_collections", []),
+        },
+        "orphans": {
+            "documents": len(orphans),
+            "not_in_mysql": sum(1 for d in orphans if d not in statuses),
+            "chunks": orphan_chunks,
+            "sample": orphans[:20],
+        },
+        "missing": {"documents": len(missing), "sample": [row.id for row in missing[:20]]},
+        # COMPLETED sin texto indexable: no deberían tener chunks
+        "empty": {"documents": empty},
+        # Fracción de puntos almacenados que no sirven a ningún documento vigente
+        "bloat": {
+            "orphan_chunks": orphan_chunks,
+            "stale_points": stale_points,
+            "ratio": round((orphan_chunks + stale_points) / stored_points, 4) if stored_points else 0.0,
+        },
+    }
+
+    if not dry_run:
+        orphan_ratio = len(orphans) / len(indexed) if indexed else 0.0
+        if orphans and orphan_ratio > settings.RAG_RECONCILE_MAX_ORPHAN_RATIO:
+            report["orphans"]["skipped"] = (
+                f"{orphan_ratio:.0%} de los documentos indexados serían borrados "
+                f"(máximo {settings.RAG_RECONCILE_MAX_ORPHAN_RATIO:.0%})"
+            )
+            logger.warning(f"RECONCILE: Borrado de huérfanos omitido: {report['orphans']['skipped']}")
+        elif orphans:
+            report["orphans"].update(await _delete_orphans(rag_client, orphans))
+
+        if missing:
+            report["missing"].update(
+                _requeue_missing(db, missing[: settings.RAG_RECONCILE_MAX_REQUEUE])
+            )
+
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    logger.info(
+        f"RECONCILE: {len(orphans)} huérfanos ({orphan_chunks} chunks), "
+        f"{len(missing)} faltantes, bloat {report['bloat']['ratio']:.1%}, dry_run={dry_run}"
+    )
+    return report
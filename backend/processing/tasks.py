@@ -130,12 +130,20 @@ def process_document(self, document_id: str, temp_file_path_str: str):
         except Exception:
             pass
 
-        text_content = ""
-        for text_chunk in parser.extract_text_from_file(temp_file_path):
-            text_content += text_chunk
+        # El texto se envía al RAG por segmentos a medida que se extrae,
+        # sin construir el documento completo en memoria
+        extraction_errors = []
+
+        def text_segments():
+            try:
+                yield from parser.extract_text_from_file(temp_file_path)
+            except Exception as e:
+                extraction_errors.append(e)
+                raise
 
         # 2) PROCESAR RAG
         chunk_count = 0
+        rag_failed = False
         if settings.RAG_SERVICE_ENABLED:
             try:
                 redis_client.publish(
@@ -172,13 +180,20 @@ def process_document(self, document_id: str, temp_file_path_str: str):
                 async def ingest_with_local_client():
                     local_client = RAGClient()
                     try:
-                        return await local_client.ingest_text_content(
+                        result = await local_client.ingest_text_stream(
                             document_id=db_document.id,
                             workspace_id=db_document.workspace_id,
                             user_id=user_id,
-                            content=text_content,
+                            segments=text_segments(),
                             metadata=metadata
                         )
+                        # Si el parser falló a mitad del archivo, los lotes ya
+                        # indexados quedarían buscables con el documento FAILED.
+                        # Si este borrado falla, la reconciliación los elimina
+                        # (los chunks de documentos FAILED son huérfanos)
+                        if extraction_errors:
+                            await local_client.delete_document(db_document.id)
+                        return result
                     finally:
                         await local_client.close()
 
@@ -188,12 +203,27 @@ def process_document(self, document_id: str, temp_file_path_str: str):
                 except ValueError:
                     pass  # Ya está aplicado o no es necesario
                 result = asyncio.run(ingest_with_local_client())
+                rag_failed = result is None
                 chunk_count = result.chunks_count if result else 0
 
             except Exception as e:
                 print(f"WORKER: Error RAG: {e}")
+                rag_failed = True
                 # No reintentar infinitamente si es error de conexión persistente
                 # raise self.retry(exc=e, countdown=60)
+        else:
+            # Sin RAG se sigue validando que el archivo se pueda extraer
+            for _ in text_segments():
+                pass
+
+        # Un error de extracción marca el documento como FAILED (no es un error del RAG)
+        if extraction_errors:
+            raise extraction_errors[0]
+
+        # Un documento sin indexar no se marca COMPLETED: COMPLETED con
+        # chunk_count=0 queda reservado a documentos sin texto (o sin RAG)
+        if rag_failed:
+            raise RuntimeError("El servicio RAG no pudo indexar el documento")
 
      
 
@@ -268,3 +298,27 @@ def process_document(self, document_id: str, temp_file_path_str: str):
                  print(f"WORKER: Error eliminando temporal: {e}")
         
         db.close()
+
+
+@celery_app.task
+def reconcile_vector_index(dry_run: bool = False):
+    """Reconcilia el índice vectorial con la tabla documents (ver processing.reconciliation)."""
+    from . import reconciliation
+
+    db: Session = database.SessionLocal()
+
+    async def reconcile_with_local_client():
+        local_client = RAGClient(timeout=settings.RAG_SERVICE_TIMEOUT)
+        try:
+            return await reconciliation.reconcile_vector_index(db, local_client, dry_run=dry_run)
+        finally:
+            await local_client.close()
+
+    try:
+        try:
+            nest_asyncio.apply()
+        except ValueError:
+            pass
+        return asyncio.run(reconcile_with_local_client())
+    finally:
+        db.close()
@@ -0,0 +1,123 @@
+"""
+Parity check and throughput benchmark for the embedding backends.
+
+Encodes the same passages and queries with the PyTorch reference model and
+each candidate backend, reports cosine agreement with the reference vectors
+and encode throughput, and exits non-zero if any backend's mean passage or
+query cosine falls below --min-cosine.
+
+Usage:
+    python bench_embedding_backends.py --backends onnx onnx-int8
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+import numpy as np
+
+from chunker import CharacterChunker
+from embedding_backends import load_embedding_model
+
+MODEL_NAME = "intfloat/multilingual-e5-base"
+
+SAMPLE_QUERIES = [
+    "genera propuesta",
+    "cotización",
+    "información de presupuesto",
+    "plazo de entrega del servicio",
+    "requisitos técnicos ISO 9001",
+    "garantía de seriedad de la oferta",
+]
+
+
+def load_passages(corpus_dir, limit):
+    chunker = CharacterChunker()
+    passages = []
+    for path in sorted(glob.glob(os.path.join(corpus_dir, "*.txt"))):
+        with open(path, encoding="utf-8", errors="ignore") as f:
+            passages.extend(chunker.split(f.read()))
+        if len(passages) >= limit:
+            break
+    return [f"passage: {p}" for p in passages[:limit]]
+
+
+def encode(model, texts, batch_size):
+    start = time.perf_counter()
+    vectors = model.encode(
+        texts,
+        batch_size=batch_size,
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+        show_progress_bar=False,
+    )
+    return vectors, len(texts) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--corpus-dir",
+        default=os.path.join(os.path.dirname(__file__), "..", "backend", "uploaded_files"),
+    )
+    parser.add_argument("--backends", nargs="+", default=["onnx-int8"])
+    parser.add_argument("--passages", type=int, default=256)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--onnx-dir", default="/tmp/rag-onnx")
+    parser.add_argument("--quantization", default="avx2")
+    parser.add_argument("--min-cosine", type=float, default=0.98)
+    args = parser.parse_args()
+
+    passages = load_passages(args.corpus_dir, args.passages)
+    queries = [f"query: {q}" for q in SAMPLE_QUERIES]
+    if not passages:
+        sys.exit(f"No .txt passages found in {args.corpus_dir}")
+    print(f"{len(passages)} passages, {len(queries)} queries")
+
+    reference = load_embedding_model(MODEL_NAME, backend="torch")
+    ref_passages, ref_rate = encode(reference, passages, args.batch_size)
+    ref_queries, _ = encode(reference, queries, args.batch_size)
+
+    rows = [("torch", 1.0, 1.0, 1.0, 1.0, ref_rate)]
+    for backend in args.backends:
+        model = load_embedding_model(
+            MODEL_NAME,
+            backend=backend,
+            onnx_cache_dir=args.onnx_dir,
+            quantization_config=args.quantization,
+        )
+        encode(model, passages[: args.batch_size], args.batch_size)  # warm-up
+        vectors, rate = encode(model, passages, args.batch_size)
+        query_vectors, _ = encode(model, queries, args.batch_size)
+
+        passage_cos = np.sum(vectors * ref_passages, axis=1)
+        query_cos = np.sum(query_vectors * ref_queries, axis=1)
+
+        # Same top-1 passage for each query as the reference model
+        ref_top = np.argmax(ref_queries @ ref_passages.T, axis=1)
+        top = np.argmax(query_vectors @ vectors.T, axis=1)
+        rows.append(
+            (
+                backend,
+                float(passage_cos.mean()),
+                float(passage_cos.min()),
+                float(query_cos.mean()),
+                float(np.mean(ref_top == top)),
+                rate,
+            )
+        )
+
+    print(f"\n{'backend':<12}{'mean cos':>10}{'min cos':>10}{'query cos':>11}{'top-1 agr':>11}{'texts/s':>10}{'speedup':>9}")
+    failed = False
+    for backend, mean_cos, min_cos, query_cos, top1, rate in rows:
+        print(f"{backend:<12}{mean_cos:>10.4f}{min_cos:>10.4f}{query_cos:>11.4f}{top1:>11.2f}{rate:>10.1f}{rate / ref_rate:>8.2f}x")
+        failed |= min(mean_cos, query_cos) < args.min_cosine
+
+    if failed:
+        sys.exit(f"Parity check failed: mean passage or query cosine below {args.min_cosine}")
+
+
+if __name__ == "__main__":
+    main()
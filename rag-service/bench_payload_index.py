@@ -0,0 +1,179 @@
+"""
+Filtered search latency benchmark: with vs. without payload indexes.
+
+Builds a scratch collection with a synthetic multi-workspace corpus, runs
+the filters VectorStore.asearch / adelete_document build, then creates the
+payload indexes VectorStore creates and runs them again.
+
+Usage:
+    python bench_payload_index.py --points 1000000 --workspaces 500
+"""
+
+import argparse
+import statistics
+import time
+import uuid
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.http import models as qmodels
+
+from vector_store import VectorStore
+
+def random_vectors(rng, n, dim):
+    vectors = rng.standard_normal((n, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def load_corpus(client, collection, args, rng):
+    chunks_per_doc = 50
+    docs_per_ws = max(1, args.points // (args.workspaces * chunks_per_doc))
+    print(
+        f"Loading {args.points} points "
+        f"({args.workspaces} workspaces x {docs_per_ws} docs x {chunks_per_doc} chunks)..."
+    )
+
+    start = time.perf_counter()
+    loaded = 0
+    batch_ids, batch_payloads = [], []
+
+    def flush():
+        vectors = random_vectors(rng, len(batch_ids), args.dim)
+        client.upsert(
+            collection_name=collection,
+            points=qmodels.Batch(
+                ids=list(batch_ids), vectors=vectors.tolist(), payloads=list(batch_payloads)
+            ),
+            wait=False,
+        )
+        batch_ids.clear()
+        batch_payloads.clear()
+
+    for ws in range(args.workspaces):
+        for doc in range(docs_per_ws):
+            # ~20% of documents are conversation-scoped, like chat uploads
+            conversation_id = f"conv-{ws}-{doc}" if doc % 5 == 0 else None
+            for chunk in range(chunks_per_doc):
+                if loaded >= args.points:
+                    break
+                batch_ids.append(str(uuid.uuid4()))
+                batch_payloads.append(
+                    {
+                        "workspace_id": f"ws-{ws}",
+                        "conversation_id": conversation_id,
+                        "document_id": f"doc-{ws}-{doc}",
+                        "chunk_index": chunk,
+                    }
+                )
+                loaded += 1
+                if len(batch_ids) >= args.batch_size:
+                    flush()
+    if batch_ids:
+        flush()
+
+    wait_for_green(client, collection)
+    print(f"Loaded {loaded} points in {time.perf_counter() - start:.1f}s")
+    return docs_per_ws
+
+
+def wait_for_green(client, collection):
+    while client.get_collection(collection).status != qmodels.CollectionStatus.GREEN:
+        time.sleep(1)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run_queries(client, collection, args, rng, docs_per_ws):
+    search_ms, delete_filter_ms = [], []
+    queries = random_vectors(rng, args.queries, args.dim)
+
+    for i in range(args.queries):
+        ws = int(rng.integers(args.workspaces))
+        conversation_id = f"conv-{ws}-0" if i % 2 else None
+
+        start = time.perf_counter()
+        client.query_points(
+            collection_name=collection,
+            query=queries[i].tolist(),
+            query_filter=VectorStore._build_filter(f"ws-{ws}", conversation_id),
+            limit=10,
+            with_payload=True,
+        )
+        search_ms.append(1000 * (time.perf_counter() - start))
+
+        # Same selector as adelete_document, measured as an exact count
+        doc = int(rng.integers(docs_per_ws))
+        start = time.perf_counter()
+        client.count(
+            collection_name=collection,
+            count_filter=VectorStore._document_selector(f"doc-{ws}-{doc}").filter,
+            exact=True,
+        )
+        delete_filter_ms.append(1000 * (time.perf_counter() - start))
+
+    return {
+        "search_p50_ms": statistics.median(search_ms),
+        "search_p95_ms": percentile(search_ms, 95),
+        "search_p99_ms": percentile(search_ms, 99),
+        "document_filter_p50_ms": statistics.median(delete_filter_ms),
+        "document_filter_p95_ms": percentile(delete_filter_ms, 95),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--qdrant-url", default="http://localhost:6333")
+    parser.add_argument("--collection", default="bench_payload_index")
+    parser.add_argument("--points", type=int, default=1_000_000)
+    parser.add_argument("--workspaces", type=int, default=500)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch collection")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    client = QdrantClient(url=args.qdrant_url, timeout=300)
+
+    if client.collection_exists(args.collection):
+        client.delete_collection(args.collection)
+    client.create_collection(
+        collection_name=args.collection,
+        vectors_config=qmodels.VectorParams(
+            size=args.dim, distance=qmodels.Distance.COSINE
+        ),
+    )
+
+    try:
+        docs_per_ws = load_corpus(client, args.collection, args, rng)
+
+        print("Running queries without payload indexes...")
+        before = run_queries(client, args.collection, args, np.random.default_rng(7), docs_per_ws)
+
+        for field_name in VectorStore.INDEXED_PAYLOAD_FIELDS:
+            client.create_payload_index(
+                collection_name=args.collection,
+                field_name=field_name,
+                field_schema=qmodels.PayloadSchemaType.KEYWORD,
+                wait=True,
+            )
+        wait_for_green(client, args.collection)
+
+        print("Running queries with payload indexes...")
+        after = run_queries(client, args.collection, args, np.random.default_rng(7), docs_per_ws)
+
+        print(f"\n{'metric':<26}{'no index':>12}{'indexed':>12}{'speedup':>10}")
+        for key in before:
+            speedup = before[key] / after[key] if after[key] else float("inf")
+            print(f"{key:<26}{before[key]:>12.2f}{after[key]:>12.2f}{speedup:>9.1f}x")
+    finally:
+        if not args.keep:
+            client.delete_collection(args.collection)
+
+
+if __name__ == "__main__":
+    main()
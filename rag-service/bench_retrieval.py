@@ -0,0 +1,306 @@
+"""
+Retrieval quality and speed benchmark for the rag-service.
+
+Builds a corpus from backend/uploaded_files (.txt and .pdf) plus synthetic
+distractor documents, ingests it through the real chunking and VectorStore
+paths once per configuration, runs a labeled query set and reports
+recall@1, recall@k, MRR, p50/p95/p99 search latency and ingest chunks/sec.
+
+Queries come from bench_queries.json (hand-labeled) plus known-item queries
+sampled from the corpus. A hit is relevant when it comes from the labeled
+source file and contains most of the answer's words.
+
+Usage:
+    python bench_retrieval.py                                  # all presets, Qdrant at QDRANT_URL
+    python bench_retrieval.py --vector-backend local           # in-process Qdrant (CI)
+    python bench_retrieval.py --configs baseline hybrid --distractors 2000 --output results.json
+"""
+
+import argparse
+import asyncio
+import glob
+import hashlib
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Per-configuration settings: chunking, search options and VectorStore env overrides
+DEFAULTS = {
+    "chunk_max_tokens": 480,
+    "chunk_overlap_tokens": 48,
+    "child_max_tokens": 128,
+    "mode": "dense",
+    "cutoff": None,
+    "mmr": False,
+    "env": {},
+}
+PRESETS = {
+    "baseline": {},
+    "no-parent-child": {"child_max_tokens": 0},
+    "chunk-256": {"chunk_max_tokens": 256, "child_max_tokens": 64},
+    "hybrid": {"mode": "hybrid"},
+    "int8": {"env": {"VECTOR_QUANTIZATION": "scalar"}},
+    "knee-mmr": {"cutoff": "knee", "mmr": True},
+}
+
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?:])\s+|\n+")
+WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def read_file(path):
+    if path.endswith(".pdf"):
+        from PyPDF2 import PdfReader
+
+        return "\n".join(page.extract_text() or "" for page in PdfReader(path).pages)
+    with open(path, encoding="utf-8", errors="ignore") as f:
+        return f.read()
+
+
+def load_sources(corpus_dir):
+    """{filename: text} for the sample files, skipping unreadable, empty and duplicate ones."""
+    sources, seen = {}, set()
+    for path in sorted(glob.glob(os.path.join(corpus_dir, "*"))):
+        if not path.endswith((".txt", ".pdf")):
+            continue
+        try:
+            text = read_file(path).strip()
+        except Exception as e:
+            print(f"Skipping {os.path.basename(path)}: {e}")
+            continue
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        if text and digest not in seen:
+            seen.add(digest)
+            sources[os.path.basename(path)] = text
+    return sources
+
+
+def sentences(text):
+    return [s.strip() for s in SENTENCE_SPLIT.split(text) if len(WORD.findall(s)) >= 4]
+
+
+def synthetic_queries(sources, per_doc, rng):
+    """Known-item queries: a window of words from a sentence, labeled with its source."""
+    queries = []
+    for filename, text in sources.items():
+        candidates = sentences(text)
+        for sentence in rng.sample(candidates, min(per_doc, len(candidates))):
+            words = sentence.split()
+            size = min(len(words), rng.randint(5, 10))
+            start = rng.randint(0, len(words) - size)
+            window = " ".join(words[start : start + size])
+            queries.append({"query": window, "source": filename, "answer": window})
+    return queries
+
+
+def distractor_documents(sources, queries, count, sentences_per_doc, rng):
+    """Scale-up documents mixing corpus sentences; sentences holding a labeled answer are excluded."""
+    answers = [q["answer"].lower() for q in queries]
+    pool = [
+        s
+        for text in sources.values()
+        for s in sentences(text)
+        if not any(a in s.lower() for a in answers)
+    ]
+    if not pool:
+        return {}
+    return {
+        f"synthetic-{i:05d}.txt": "\n".join(rng.choices(pool, k=sentences_per_doc))
+        for i in range(count)
+    }
+
+
+def is_relevant(hit, label):
+    if hit["metadata"].get("filename") != label["source"]:
+        return False
+    answer_words = set(WORD.findall(label["answer"].lower()))
+    content_words = set(WORD.findall(hit["content"].lower()))
+    return len(answer_words & content_words) >= 0.6 * len(answer_words)
+
+
+def percentile(values, p):
+    return statistics.quantiles(values, n=100, method="inclusive")[p - 1] if len(values) > 1 else values[0]
+
+
+async def run_config(name, config, documents, queries, model, args):
+    import main
+    from chunker import build_chunker
+    from index_catalog import IndexCatalog
+    from vector_store import VectorStore
+
+    saved_env = {key: os.environ.get(key) for key in config["env"]}
+    os.environ.update(config["env"])
+    try:
+        store = VectorStore()
+    finally:
+        for key, value in saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+    alias = f"bench_retrieval_{re.sub(r'[^a-z0-9]+', '_', name.lower())}"
+    store.collection_alias = store.collection_name = alias
+    store.initial_collection = f"{alias}_v1"
+    store.index_catalog = IndexCatalog(store.client, store.async_client, alias)
+    # Chunk collection (its alias goes with it), document vectors and catalog
+    scratch = (store.initial_collection, f"{store.initial_collection}_documents", store.index_catalog.collection_name)
+    for collection in scratch:
+        if store.client.collection_exists(collection):
+            store.client.delete_collection(collection)
+    store.embedding_model = model
+    store._ensure_collection()
+    store.ready.set()
+
+    main.chunker = build_chunker(
+        strategy="token",
+        tokenizer=model.tokenizer,
+        tokenizer_name=store.embedding_model_name,
+        model_max_tokens=model.max_seq_length,
+        max_tokens=config["chunk_max_tokens"],
+        overlap_tokens=config["chunk_overlap_tokens"],
+        child_max_tokens=config["child_max_tokens"],
+    )
+
+    try:
+        batch = []
+        for i, (filename, text) in enumerate(documents.items()):
+            request = main.RAGIngestRequest(
+                document_id=f"bench-doc-{i}",
+                workspace_id=args.workspace_id,
+                content=text,
+                metadata={"filename": filename},
+            )
+            batch.append((request.document_id, main.chunk_document(request)))
+
+        start = time.perf_counter()
+        chunks = 0
+        for b in range(0, len(batch), args.ingest_batch):
+            summaries = await store.aingest_documents(batch[b : b + args.ingest_batch])
+            chunks += sum(s["chunks"] for s in summaries)
+        ingest_seconds = time.perf_counter() - start
+
+        latencies, reciprocal_ranks, hits_at_1, hits_at_k = [], [], 0, 0
+        for label in queries:
+            start = time.perf_counter()
+            hits = await store.asearch(
+                label["query"],
+                workspace_id=args.workspace_id,
+                limit=args.k,
+                mode=config["mode"],
+                cutoff=config["cutoff"],
+                mmr=config["mmr"],
+            )
+            latencies.append(1000 * (time.perf_counter() - start))
+
+            rank = next((r for r, hit in enumerate(hits, 1) if is_relevant(hit, label)), None)
+            reciprocal_ranks.append(1.0 / rank if rank else 0.0)
+            hits_at_1 += rank == 1
+            hits_at_k += rank is not None
+
+        return {
+            "config": name,
+            "settings": config,
+            "chunks": chunks,
+            "ingest_chunks_per_sec": chunks / max(ingest_seconds, 1e-6),
+            "recall_at_1": hits_at_1 / len(queries),
+            f"recall_at_{args.k}": hits_at_k / len(queries),
+            "mrr": statistics.mean(reciprocal_ranks),
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "p99_ms": percentile(latencies, 99),
+        }
+    finally:
+        if not args.keep:
+            for collection in scratch:
+                store.client.delete_collection(collection)
+        await store.aclose()
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    sources = load_sources(args.corpus_dir)
+    if not sources:
+        sys.exit(f"No readable .txt/.pdf files in {args.corpus_dir}")
+
+    with open(args.queries, encoding="utf-8") as f:
+        queries = [q for q in json.load(f) if q["source"] in sources]
+    queries += synthetic_queries(sources, args.synthetic_queries, rng)
+    documents = {
+        **sources,
+        **distractor_documents(sources, queries, args.distractors, args.distractor_sentences, rng),
+    }
+    print(f"{len(sources)} source + {len(documents) - len(sources)} synthetic documents, {len(queries)} queries")
+
+    configs = dict(PRESETS)
+    if args.config_file:
+        with open(args.config_file, encoding="utf-8") as f:
+            configs.update(json.load(f))
+    selected = args.configs or list(configs)
+
+    from vector_store import VectorStore
+
+    loader = VectorStore()
+    loader._load_model()
+    model = loader.embedding_model
+    await loader.aclose()
+
+    rows = []
+    for name in selected:
+        print(f"Running configuration '{name}'...")
+        rows.append(
+            await run_config(name, {**DEFAULTS, **configs[name]}, documents, queries, model, args)
+        )
+
+    k = args.k
+    print(
+        f"\n{'config':<18}{'chunks':>8}{'ingest/s':>10}{'R@1':>7}{'R@' + str(k):>7}{'MRR':>7}"
+        f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+    )
+    for row in rows:
+        print(
+            f"{row['config']:<18}{row['chunks']:>8}{row['ingest_chunks_per_sec']:>10.1f}"
+            f"{row['recall_at_1']:>7.3f}{row[f'recall_at_{k}']:>7.3f}{row['mrr']:>7.3f}"
+            f"{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2, ensure_ascii=False)
+        print(f"\nResults written to {args.output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--corpus-dir", default=os.path.join(HERE, "..", "backend", "uploaded_files")
+    )
+    parser.add_argument("--queries", default=os.path.join(HERE, "bench_queries.json"))
+    parser.add_argument("--synthetic-queries", type=int, default=3, help="Sampled queries per source document")
+    parser.add_argument("--distractors", type=int, default=500, help="Synthetic scale-up documents")
+    parser.add_argument("--distractor-sentences", type=int, default=40)
+    parser.add_argument("--configs", nargs="+", help=f"Subset of configurations (presets: {', '.join(PRESETS)})")
+    parser.add_argument("--config-file", help="JSON {name: settings} with extra configurations")
+    parser.add_argument("--vector-backend", choices=["remote", "local"], default=os.getenv("VECTOR_BACKEND", "remote"))
+    parser.add_argument("--workspace-id", default="bench-workspace")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--ingest-batch", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the report as JSON")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch collections")
+    args = parser.parse_args()
+
+    # Read by VectorStore at construction; local mode keeps every configuration in memory
+    os.environ["VECTOR_BACKEND"] = args.vector_backend
+    if args.vector_backend == "local":
+        os.environ["QDRANT_LOCAL_PATH"] = ":memory:"
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Recall vs. memory report for the documents_v2 storage profiles.
+
+Loads the same corpus into one scratch collection per storage profile and
+compares recall@k (against exact brute-force neighbours), search latency
+and estimated resident memory.
+
+Usage:
+    python bench_storage_profiles.py --points 200000
+    python bench_storage_profiles.py --embeddings corpus.npy   # real E5 vectors
+"""
+
+import argparse
+import statistics
+import time
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.http import models as qmodels
+
+from storage_profile import StorageProfile
+
+PROFILES = {
+    "float32": StorageProfile(),
+    "float32-on-disk": StorageProfile(vectors_on_disk=True),
+    "int8": StorageProfile(quantization="scalar"),
+    "int8-on-disk": StorageProfile(quantization="scalar", vectors_on_disk=True),
+    "binary-on-disk": StorageProfile(
+        quantization="binary", vectors_on_disk=True, oversampling=3.0
+    ),
+    "binary-no-rescore": StorageProfile(
+        quantization="binary", vectors_on_disk=True, rescore=False
+    ),
+}
+
+
+def synthetic_corpus(rng, points, dim, clusters=256):
+    """Clustered unit vectors; uniform random vectors make ANN recall meaningless."""
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(clusters, size=points)
+    vectors = centers[labels] + 0.35 * rng.standard_normal((points, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def load_profile(client, name, profile, vectors, batch_size):
+    collection = f"bench_profile_{name.replace('-', '_')}"
+    if client.collection_exists(collection):
+        client.delete_collection(collection)
+    client.create_collection(
+        collection_name=collection, **profile.create_kwargs(vectors.shape[1])
+    )
+    for start in range(0, len(vectors), batch_size):
+        batch = vectors[start : start + batch_size]
+        client.upsert(
+            collection_name=collection,
+            points=qmodels.Batch(
+                ids=list(range(start, start + len(batch))), vectors=batch.tolist()
+            ),
+            wait=False,
+        )
+    while client.get_collection(collection).status != qmodels.CollectionStatus.GREEN:
+        time.sleep(1)
+    return collection
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--qdrant-url", default="http://localhost:6333")
+    parser.add_argument("--embeddings", help="Optional .npy of corpus vectors")
+    parser.add_argument("--points", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch collections")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    if args.embeddings:
+        vectors = np.load(args.embeddings).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    else:
+        vectors = synthetic_corpus(rng, args.points, args.dim)
+
+    # Queries are perturbed corpus vectors; ground truth is exact cosine top-k
+    picks = rng.choice(len(vectors), size=args.queries, replace=False)
+    queries = vectors[picks] + 0.1 * rng.standard_normal(
+        (args.queries, vectors.shape[1])
+    ).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    truth = np.argpartition(-(queries @ vectors.T), args.k, axis=1)[:, : args.k]
+
+    client = QdrantClient(url=args.qdrant_url, timeout=300)
+    rows = []
+    for name, profile in PROFILES.items():
+        print(f"Loading {len(vectors)} vectors with profile '{name}'...")
+        collection = load_profile(client, name, profile, vectors, args.batch_size)
+        try:
+            recalls, latencies = [], []
+            for query, expected in zip(queries, truth):
+                start = time.perf_counter()
+                hits = client.query_points(
+                    collection_name=collection,
+                    query=query.tolist(),
+                    limit=args.k,
+                    search_params=profile.search_params(),
+                ).points
+                latencies.append(1000 * (time.perf_counter() - start))
+                found = {hit.id for hit in hits}
+                recalls.append(len(found & set(expected.tolist())) / args.k)
+
+            rows.append(
+                (
+                    name,
+                    statistics.mean(recalls),
+                    statistics.median(latencies),
+                    profile.estimated_ram_bytes(len(vectors), vectors.shape[1]) / 2**20,
+                )
+            )
+        finally:
+            if not args.keep:
+                client.delete_collection(collection)
+
+    baseline_ram = rows[0][3]
+    print(f"\n{'profile':<20}{'recall@' + str(args.k):>10}{'p50 ms':>10}{'RAM MiB':>10}{'vs f32':>9}")
+    for name, recall, p50, ram in rows:
+        print(f"{name:<20}{recall:>10.4f}{p50:>10.2f}{ram:>10.1f}{baseline_ram / ram:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import logging
+from typing import Any, Dict, List
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+logger = logging.getLogger(__name__)
+
+# Tried in order: structural boundaries first, then paragraphs, lines, sentences, words
+STRUCTURAL_SEPARATORS = [
+    r"\n(?=#{1,6} )",  # Markdown headings
+    r"\n(?=(?:\d+\.)+\d*\s+[A-ZÁÉÍÓÚÑ])",  # Numbered sections ("3.2 Alcance")
+    r"\n(?=(?:CAPÍTULO|CAPITULO|ANEXO|SECCIÓN|SECCION|ARTÍCULO|ARTICULO)\b)",
+    r"\n\n",
+    r"\n(?=\|)",  # Table rows
+    r"\n(?=\s*(?:[-*•]|\d+[.)]|[a-z]\))\s)",  # List items
+    r"\n",
+    r"(?<=[.!?;:])\s+",
+    r" ",
+    r"",
+]
+
+
+class TokenChunker:
+    """
+    Splits text into chunks measured in embedding-model tokens, so no chunk
+    is silently truncated at encode time. Prefers headings, table rows and
+    list items as cut points over arbitrary character offsets.
+    """
+
+    def __init__(
+        self,
+        tokenizer: Any,
+        tokenizer_name: str,
+        max_tokens: int = 480,
+        overlap_tokens: int = 48,
+    ):
+        self.tokenizer = tokenizer
+        self.tokenizer_name = tokenizer_name
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self._splitter = RecursiveCharacterTextSplitter(
+            chunk_size=max_tokens,
+            chunk_overlap=overlap_tokens,
+            separators=STRUCTURAL_SEPARATORS,
+            is_separator_regex=True,
+            keep_separator=True,
+            length_function=self.count_tokens,
+        )
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.tokenizer.encode(text, add_special_tokens=False))
+
+    def split(self, text: str) -> List[str]:
+        return [chunk for chunk in self._splitter.split_text(text) if chunk.strip()]
+
+    @property
+    def params(self) -> Dict[str, Any]:
+        """Chunking parameters, stored in every chunk payload."""
+        return {
+            "strategy": "token",
+            "tokenizer": self.tokenizer_name,
+            "max_tokens": self.max_tokens,
+            "overlap_tokens": self.overlap_tokens,
+        }
+
+
+class CharacterChunker:
+    """Legacy fixed-size character chunker (2000 chars / 200 overlap)."""
+
+    def __init__(self, chunk_size: int = 2000, overlap: int = 200):
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self._splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=overlap,
+            separators=["\n\n", "\n", ". ", " ", ""],
+            length_function=len,
+        )
+
+    def split(self, text: str) -> List[str]:
+        return self._splitter.split_text(text)
+
+    @property
+    def params(self) -> Dict[str, Any]:
+        return {
+            "strategy": "chars",
+            "chunk_size": self.chunk_size,
+            "overlap": self.overlap,
+        }
+
+
+class ParentChildChunker:
+    """
+    Two-level chunking: non-overlapping parent windows (the context handed to
+    the LLM), each split into small overlapping child chunks (what gets
+    embedded and matched). split() returns parents; split_children() the
+    children of one parent.
+    """
+
+    def __init__(self, parent: TokenChunker, child: TokenChunker):
+        self.parent = parent
+        self.child = child
+
+    def split(self, text: str) -> List[str]:
+        return self.parent.split(text)
+
+    def split_children(self, parent_text: str) -> List[str]:
+        return self.child.split(parent_text) or [parent_text]
+
+    @property
+    def params(self) -> Dict[str, Any]:
+        return {
+            **self.parent.params,
+            "strategy": "parent_child",
+            "child_max_tokens": self.child.max_tokens,
+            "child_overlap_tokens": self.child.overlap_tokens,
+        }
+
+
+def build_chunker(
+    strategy: str,
+    tokenizer: Any,
+    tokenizer_name: str,
+    model_max_tokens: int,
+    max_tokens: int,
+    overlap_tokens: int,
+    child_max_tokens: int = 0,
+    child_overlap_tokens: int = 16,
+):
+    """
+    strategy "chars" is the legacy character chunker. For "token", a
+    child_max_tokens below max_tokens enables parent-child chunking, with
+    max_tokens as the (non-overlapping) parent window size.
+    """
+    if strategy == "chars":
+        return CharacterChunker()
+
+    # Leave room for the "passage: " prefix and the [CLS]/[SEP] special tokens
+    budget = model_max_tokens - 8
+    if max_tokens > budget:
+        logger.warning(
+            f"CHUNKER: CHUNK_MAX_TOKENS={max_tokens} exceeds the model window, using {budget}"
+        )
+        max_tokens = budget
+    if 0 < child_max_tokens < max_tokens:
+        return ParentChildChunker(
+            TokenChunker(tokenizer, tokenizer_name, max_tokens, 0),
+            TokenChunker(tokenizer, tokenizer_name, child_max_tokens, child_overlap_tokens),
+        )
+    return TokenChunker(tokenizer, tokenizer_name, max_tokens, overlap_tokens)
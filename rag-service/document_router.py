@@ -0,0 +1,232 @@
+import asyncio
+import logging
+import uuid
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.http import models as qmodels
+
+logger = logging.getLogger(__name__)
+
+# Chunk payload fields copied onto the document vector (routing filters + display)
+DOCUMENT_PAYLOAD_FIELDS = ("document_id", "workspace_id", "conversation_id", "filename")
+
+
+def dense_vector(record: qmodels.Record) -> List[float]:
+    """Unnamed dense vector of a point, whether or not it also has named sparse vectors."""
+    vector = record.vector
+    if isinstance(vector, dict):
+        vector = vector.get("")
+    return vector
+
+
+class _Centroid:
+    """Running mean of a document's chunk vectors, fed one scroll page at a time."""
+
+    def __init__(self, document_id: str):
+        self.document_id = document_id
+        self.total: Optional[np.ndarray] = None
+        self.count = 0
+        self.payload: Optional[Dict[str, Any]] = None
+
+    def add(self, records: List[qmodels.Record]):
+        if not records:
+            return
+        vectors = np.asarray([dense_vector(r) for r in records], dtype=np.float64)
+        page_total = vectors.sum(axis=0)
+        self.total = page_total if self.total is None else self.total + page_total
+        self.count += len(records)
+        # Shared chunks carry the metadata of the document that stored them
+        if self.payload is None or self.payload.get("document_id") != self.document_id:
+            owned = (
+                r.payload
+                for r in records
+                if r.payload and r.payload.get("document_id") == self.document_id
+            )
+            self.payload = next(owned, self.payload or records[0].payload or {})
+
+    def point(self, point_id: str) -> qmodels.PointStruct:
+        centroid = self.total / self.count
+        centroid /= max(float(np.linalg.norm(centroid)), 1e-12)
+        payload = {key: self.payload.get(key) for key in DOCUMENT_PAYLOAD_FIELDS}
+        payload["document_id"] = self.document_id
+        payload["chunks"] = self.count
+        return qmodels.PointStruct(
+            id=point_id, vector=centroid.astype(np.float32).tolist(), payload=payload
+        )
+
+
+class DocumentRouter:
+    """
+    Document-level stage of two-stage retrieval.
+    Keeps one centroid vector per document (mean of its normalized chunk
+    vectors) in a side collection; route() picks the documents closest to
+    the query so the chunk search can be restricted to them.
+    """
+
+    def __init__(
+        self,
+        client: QdrantClient,
+        async_client: AsyncQdrantClient,
+        chunk_collection: str,
+        vector_size: int,
+    ):
+        self.client = client
+        self.async_client = async_client
+        self.chunk_collection = chunk_collection
+        self.collection_name = f"{chunk_collection}_documents"
+        self.vector_size = vector_size
+
+    def ensure_collection(self):
+        """Create the document-vector collection; warn if existing chunks have no vectors yet."""
+        if self.client.collection_exists(self.collection_name):
+            return
+
+        logger.info(f"DOC_ROUTER: Creating collection '{self.collection_name}'...")
+        self.client.create_collection(
+            collection_name=self.collection_name,
+            vectors_config=qmodels.VectorParams(
+                size=self.vector_size, distance=qmodels.Distance.COSINE
+            ),
+        )
+        for field_name in ("workspace_id", "conversation_id"):
+            self.client.create_payload_index(
+                collection_name=self.collection_name,
+                field_name=field_name,
+                field_schema=qmodels.PayloadSchemaType.KEYWORD,
+                wait=True,
+            )
+        if self.client.count(self.chunk_collection, exact=False).count:
+            logger.warning(
+                f"DOC_ROUTER: '{self.chunk_collection}' already has chunks; documents "
+                "are not routed until POST /document_vectors/rebuild has run."
+            )
+
+    @staticmethod
+    def point_id(document_id: str) -> str:
+        return str(uuid.uuid5(uuid.NAMESPACE_DNS, f"document:{document_id}"))
+
+    @staticmethod
+    def _document_filter(document_id: str) -> qmodels.Filter:
+        """Chunks the document owns, or shares with another document (near-duplicates)."""
+        return qmodels.Filter(
+            should=[
+                qmodels.FieldCondition(
+                    key="document_id", match=qmodels.MatchValue(value=document_id)
+                ),
+                qmodels.FieldCondition(
+                    key="shared_by", match=qmodels.MatchValue(value=document_id)
+                ),
+            ]
+        )
+
+    def _page(self, document_id: str, offset: Any) -> Dict[str, Any]:
+        return dict(
+            collection_name=self.chunk_collection,
+            scroll_filter=self._document_filter(document_id),
+            limit=256,
+            offset=offset,
+            with_payload=list(DOCUMENT_PAYLOAD_FIELDS),
+            with_vectors=True,
+        )
+
+    async def aupdate(self, document_id: str):
+        """Recompute the document vector from the chunks currently stored."""
+        centroid = _Centroid(document_id)
+        offset = None
+        while True:
+            page, offset = await self.async_client.scroll(**self._page(document_id, offset))
+            centroid.add(page)
+            if offset is None:
+                break
+
+        if not centroid.count:
+            await self.adelete([document_id])
+            return
+        await self.async_client.upsert(
+            collection_name=self.collection_name,
+            points=[centroid.point(self.point_id(document_id))],
+            wait=True,
+        )
+
+    async def adelete(self, document_ids: List[str]):
+        await self.async_client.delete(
+            collection_name=self.collection_name,
+            points_selector=qmodels.PointIdsList(
+                points=[self.point_id(d) for d in document_ids]
+            ),
+            wait=True,
+        )
+
+    async def adelete_by_filter(self, scope: qmodels.Filter):
+        await self.async_client.delete(
+            collection_name=self.collection_name,
+            points_selector=qmodels.FilterSelector(filter=scope),
+            wait=True,
+        )
+
+    @staticmethod
+    def _document_ids(points: List[qmodels.ScoredPoint]) -> List[str]:
+        return [p.payload["document_id"] for p in points if p.payload]
+
+    async def aroute(
+        self, query_vector: List[float], query_filter: Optional[qmodels.Filter], top_k: int
+    ) -> List[str]:
+        """IDs of the top_k documents whose centroid is closest to the query."""
+        response = await self.async_client.query_points(
+            collection_name=self.collection_name,
+            query=query_vector,
+            query_filter=query_filter,
+            limit=top_k,
+            with_payload=["document_id"],
+        )
+        return self._document_ids(response.points)
+
+    async def aroute_many(
+        self, routes: List[Dict[str, Any]]
+    ) -> List[List[str]]:
+        """Route several queries in one batch call; items carry vector, filter and top_k."""
+        responses = await self.async_client.query_batch_points(
+            collection_name=self.collection_name,
+            requests=[
+                qmodels.QueryRequest(
+                    query=route["vector"],
+                    filter=route["filter"],
+                    limit=route["top_k"],
+                    with_payload=["document_id"],
+                )
+                for route in routes
+            ],
+        )
+        return [self._document_ids(response.points) for response in responses]
+
+    async def arebuild(self, concurrency: int = 4) -> Dict[str, int]:
+        """Recompute the vector of every document in the chunk collection (backfill)."""
+        document_ids = set()
+        offset = None
+        while True:
+            page, offset = await self.async_client.scroll(
+                collection_name=self.chunk_collection,
+                limit=1024,
+                offset=offset,
+                with_payload=["document_id", "shared_by"],
+                with_vectors=False,
+            )
+            for r in page:
+                payload = r.payload or {}
+                document_ids.update(
+                    d for d in [payload.get("document_id"), *(payload.get("shared_by") or [])] if d
+                )
+            if offset is None:
+                break
+
+        limiter = asyncio.Semaphore(concurrency)
+
+        async def rebuild(document_id: str):
+            async with limiter:
+                await self.aupdate(document_id)
+
+        await asyncio.gather(*(rebuild(d) for d in document_ids))
+        logger.info(f"DOC_ROUTER: Rebuilt vectors for {len(document_ids)} documents")
+        return {"documents": len(document_ids)}
@@ -0,0 +1,70 @@
+import os
+import logging
+from typing import Optional
+
+from sentence_transformers import SentenceTransformer
+
+logger = logging.getLogger(__name__)
+
+# torch: full-precision PyTorch; onnx: ONNX Runtime fp32; onnx-int8: dynamically quantized ONNX
+EMBEDDING_BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+def _onnx_int8_file(quantization_config: str) -> str:
+    return f"onnx/model_qint8_{quantization_config}.onnx"
+
+
+def _load_onnx_int8(
+    model_name: str, cache_dir: str, quantization_config: str, cache_folder: Optional[str]
+) -> SentenceTransformer:
+    """
+    Load the int8 ONNX export of model_name, exporting and quantizing it into
+    cache_dir on first use so later starts only read the file.
+    """
+    from sentence_transformers import export_dynamic_quantized_onnx_model
+
+    local_dir = os.path.join(cache_dir, model_name.strip("/").replace("/", "__"))
+    file_name = _onnx_int8_file(quantization_config)
+
+    if not os.path.exists(os.path.join(local_dir, file_name)):
+        logger.info(
+            f"EMBEDDING_BACKEND: Exporting '{model_name}' to int8 ONNX ({quantization_config}) in {local_dir}..."
+        )
+        model = SentenceTransformer(
+            model_name, device="cpu", backend="onnx", cache_folder=cache_folder
+        )
+        model.save(local_dir)
+        export_dynamic_quantized_onnx_model(
+            model, quantization_config=quantization_config, model_name_or_path=local_dir
+        )
+
+    return SentenceTransformer(
+        local_dir, device="cpu", backend="onnx", model_kwargs={"file_name": file_name}
+    )
+
+
+def load_embedding_model(
+    model_name: str,
+    backend: str = "torch",
+    cache_folder: Optional[str] = None,
+    onnx_cache_dir: Optional[str] = None,
+    quantization_config: str = "avx2",
+) -> SentenceTransformer:
+    """
+    Load model_name (hub name or local directory) on CPU with the requested
+    inference backend; cache_folder is where hub downloads are kept.
+    Every backend returns a SentenceTransformer, so encode(), tokenizer and
+    max_seq_length behave the same for the rest of the service.
+    """
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}', expected one of {EMBEDDING_BACKENDS}")
+
+    if backend == "torch":
+        return SentenceTransformer(model_name, device="cpu", cache_folder=cache_folder)
+    if backend == "onnx":
+        return SentenceTransformer(
+            model_name, device="cpu", backend="onnx", cache_folder=cache_folder
+        )
+    return _load_onnx_int8(
+        model_name, onnx_cache_dir or "/app/data/onnx", quantization_config, cache_folder
+    )
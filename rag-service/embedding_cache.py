@@ -0,0 +1,142 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """
+    Bounded LRU of query embeddings, optionally backed by Redis so
+    replicas share hits. Keys are derived from the model name plus the
+    prefixed text ("query: ..."), so a model change never serves stale vectors.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        max_size: int = 10000,
+        redis_url: Optional[str] = None,
+        ttl_seconds: int = 7 * 24 * 3600,
+    ):
+        self.model_name = model_name
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._redis_hits = 0
+        self._redis_errors = 0
+
+        self._async_redis = None
+        if redis_url:
+            try:
+                import redis.asyncio as aioredis
+
+                self._async_redis = aioredis.Redis.from_url(redis_url)
+                logger.info(f"EMBEDDING_CACHE: Redis backing enabled ({redis_url})")
+            except Exception as e:
+                logger.warning(f"EMBEDDING_CACHE: Redis unavailable, using LRU only: {e}")
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def _key(self, prefixed_text: str) -> str:
+        digest = hashlib.sha256(
+            f"{self.model_name}\0{prefixed_text}".encode("utf-8")
+        ).hexdigest()
+        return f"emb:{digest}"
+
+    @staticmethod
+    def _encode(vector: List[float]) -> bytes:
+        return np.asarray(vector, dtype=np.float32).tobytes()
+
+    @staticmethod
+    def _decode(raw: bytes) -> List[float]:
+        return np.frombuffer(raw, dtype=np.float32).tolist()
+
+    def _get_local(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+            return vector
+
+    def _put_local(self, key: str, vector: List[float]):
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _record(self, hit: bool, from_redis: bool = False):
+        with self._lock:
+            if hit:
+                self._hits += 1
+                if from_redis:
+                    self._redis_hits += 1
+            else:
+                self._misses += 1
+
+    async def aget(self, prefixed_text: str) -> Optional[List[float]]:
+        if not self.enabled:
+            return None
+        key = self._key(prefixed_text)
+        vector = self._get_local(key)
+        if vector is not None:
+            self._record(True)
+            return vector
+
+        if self._async_redis is not None:
+            try:
+                raw = await self._async_redis.get(key)
+                if raw is not None:
+                    vector = self._decode(raw)
+                    self._put_local(key, vector)
+                    self._record(True, from_redis=True)
+                    return vector
+            except Exception as e:
+                self._redis_errors += 1
+                logger.warning(f"EMBEDDING_CACHE: Redis get failed: {e}")
+
+        self._record(False)
+        return None
+
+    async def aput(self, prefixed_text: str, vector: List[float]):
+        if not self.enabled:
+            return
+        key = self._key(prefixed_text)
+        self._put_local(key, vector)
+        if self._async_redis is not None:
+            try:
+                await self._async_redis.set(
+                    key, self._encode(vector), ex=self.ttl_seconds
+                )
+            except Exception as e:
+                self._redis_errors += 1
+                logger.warning(f"EMBEDDING_CACHE: Redis set failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "enabled": self.enabled,
+                "backend": "lru+redis" if self._async_redis is not None else "lru",
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self._hits,
+                "misses": self._misses,
+                "redis_hits": self._redis_hits,
+                "redis_errors": self._redis_errors,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+            }
+
+    async def aclose(self):
+        if self._async_redis is not None:
+            await self._async_redis.close()
@@ -0,0 +1,98 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingExecutor:
+    """
+    Bounded worker pool for CPU-bound embedding work.
+    Keeps SentenceTransformer.encode off the event loop and applies
+    backpressure once max_workers + max_queue jobs are in flight.
+    """
+
+    def __init__(self, max_workers: int = 2, max_queue: int = 64):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="embedding"
+        )
+        self._slots = asyncio.Semaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self._waiting = 0  # Blocked on the semaphore (pool full)
+        self._queued = 0  # Submitted to the pool, not yet running
+        self._active = 0
+        self._completed = 0
+        self._failed = 0
+        self._wait_seconds_total = 0.0
+        self._run_seconds_total = 0.0
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run fn(*args) on the pool and await its result."""
+        with self._lock:
+            self._waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+        submitted = time.perf_counter()
+        with self._lock:
+            self._queued += 1
+
+        def _job():
+            started = time.perf_counter()
+            with self._lock:
+                self._queued -= 1
+                self._active += 1
+                self._wait_seconds_total += started - submitted
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self._run_seconds_total += time.perf_counter() - started
+
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(
+                self._executor, _job
+            )
+            with self._lock:
+                self._completed += 1
+            return result
+        except Exception:
+            with self._lock:
+                self._failed += 1
+            raise
+        finally:
+            self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue-depth and timing metrics for /health and /metrics."""
+        with self._lock:
+            finished = self._completed + self._failed
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "active": self._active,
+                "queued": self._queued,
+                "waiting": self._waiting,
+                "queue_depth": self._queued + self._waiting,
+                "completed": self._completed,
+                "failed": self._failed,
+                "avg_wait_ms": round(
+                    1000 * self._wait_seconds_total / finished, 2
+                ) if finished else 0.0,
+                "avg_run_ms": round(
+                    1000 * self._run_seconds_total / finished, 2
+                ) if finished else 0.0,
+            }
+
+    def shutdown(self):
+        logger.info("EMBEDDING_EXECUTOR: Shutting down worker pool...")
+        self._executor.shutdown(wait=False, cancel_futures=True)
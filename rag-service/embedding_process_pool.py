@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Set in the parent right before the workers are forked; each worker inherits
+# the loaded model, with the weight pages shared copy-on-write. Spawned
+# workers load their own copy in _init_worker instead.
+_model: Any = None
+
+
+def _init_worker(threads: int, loader: Optional[Callable[[], Any]] = None):
+    global _model
+    import torch
+
+    torch.set_num_threads(threads)
+    if loader is not None:
+        _model = loader()
+
+
+def _encode(texts: List[str], batch_size: int) -> np.ndarray:
+    return _model.encode(
+        texts,
+        batch_size=batch_size,
+        convert_to_numpy=True,
+        show_progress_bar=False,
+    ).astype(np.float32)
+
+
+def resolve_workers(setting: str, reserved_cores: int) -> int:
+    """EMBEDDING_PROCESSES: "0" disables, "auto" uses every core not reserved for search."""
+    if setting == "auto":
+        return max(1, (os.cpu_count() or 1) - reserved_cores)
+    return max(0, int(setting))
+
+
+class EmbeddingProcessPool:
+    """
+    Multi-process passage encoder for bulk ingest.
+    Workers are forked after the model is loaded, so they share its weights
+    instead of each loading a copy, and each runs single-threaded torch so
+    throughput scales with the number of processes. Texts are sharded into
+    batches spread across all workers; query encoding stays in the main
+    process and is not queued behind ingest.
+
+    With a `loader` the workers are spawned instead and each calls it to
+    load its own copy of the model. That is for restarts in a running
+    service, where forking a process with live threads (event loop, HTTP
+    clients, executors) can deadlock the children.
+    """
+
+    def __init__(
+        self,
+        model: Any,
+        workers: int,
+        batch_size: int = 32,
+        threads_per_worker: int = 1,
+        loader: Optional[Callable[[], Any]] = None,
+    ):
+        global _model
+        start_method = "fork" if loader is None else "spawn"
+        if start_method not in multiprocessing.get_all_start_methods():
+            raise RuntimeError(f"EmbeddingProcessPool requires the '{start_method}' start method")
+
+        self.workers = workers
+        self.batch_size = batch_size
+        self.threads_per_worker = threads_per_worker
+        self.start_method = start_method
+        if loader is None:
+            _model = model
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context(start_method),
+            initializer=_init_worker,
+            initargs=(threads_per_worker, loader),
+        )
+        # Two batches per worker in flight: one encoding, one queued
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._texts = 0
+        self._run_seconds_total = 0.0
+
+        # Start every worker now (and load the model, if spawned) instead of mid-ingest
+        started = time.perf_counter()
+        wait([self._executor.submit(_encode, ["warmup"], 1) for _ in range(workers)])
+        logger.info(
+            f"EMBEDDING_POOL: {workers} {start_method}ed worker processes x "
+            f"{threads_per_worker} threads ready in {time.perf_counter() - started:.2f}s"
+        )
+
+    async def _encode_batch(self, texts: List[str]) -> List[List[float]]:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(2 * self.workers)
+        async with self._slots:
+            started = time.perf_counter()
+            vectors = await asyncio.get_running_loop().run_in_executor(
+                self._executor, _encode, texts, self.batch_size
+            )
+        with self._lock:
+            self._batches += 1
+            self._texts += len(texts)
+            self._run_seconds_total += time.perf_counter() - started
+        return vectors.tolist()
+
+    async def encode(self, texts: List[str]) -> List[List[float]]:
+        """Encode (already prefixed) texts, sharded in batch_size pieces across the workers."""
+        shards = await asyncio.gather(
+            *(
+                self._encode_batch(texts[i : i + self.batch_size])
+                for i in range(0, len(texts), self.batch_size)
+            )
+        )
+        return [vector for shard in shards for vector in shard]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "threads_per_worker": self.threads_per_worker,
+                "start_method": self.start_method,
+                "batches": self._batches,
+                "texts": self._texts,
+                "avg_batch_ms": round(1000 * self._run_seconds_total / self._batches, 2)
+                if self._batches
+                else 0.0,
+            }
+
+    def shutdown(self):
+        logger.info("EMBEDDING_POOL: Shutting down worker processes...")
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,133 @@
+import os
+import logging
+import time
+import uuid
+from dataclasses import asdict, dataclass, field, fields, replace
+from typing import Any, Dict, Optional
+
+from qdrant_client.http import models as qmodels
+
+from storage_profile import StorageProfile
+
+logger = logging.getLogger(__name__)
+
+# ACTUALIZACIÓN: Modelo multilingüe superior (E5 Base), 768 dimensiones
+DEFAULT_EMBEDDING_MODEL = "intfloat/multilingual-e5-base"
+DEFAULT_VECTOR_SIZE = 768
+
+
+@dataclass
+class IndexSpec:
+    """
+    Everything a chunk collection was built with: embedding model, chunking
+    and storage settings. Queries and new ingests must use the same spec as
+    the collection behind the alias, so it is recorded per collection.
+    """
+
+    embedding_model: str = DEFAULT_EMBEDDING_MODEL
+    embedding_backend: str = "torch"  # torch | onnx | onnx-int8
+    vector_size: int = DEFAULT_VECTOR_SIZE
+    chunk_strategy: str = "token"  # token | chars
+    chunk_max_tokens: int = 480
+    chunk_overlap_tokens: int = 48
+    # Small child chunks are embedded, their chunk_max_tokens parent window is returned (0 = off)
+    child_chunk_max_tokens: int = 128
+    child_chunk_overlap_tokens: int = 16
+    storage: StorageProfile = field(default_factory=StorageProfile)
+
+    @classmethod
+    def from_env(cls) -> "IndexSpec":
+        return cls(
+            embedding_backend=os.getenv("EMBEDDING_BACKEND", "torch").lower(),
+            chunk_strategy=os.getenv("CHUNKING_STRATEGY", "token"),
+            chunk_max_tokens=int(os.getenv("CHUNK_MAX_TOKENS", "480")),
+            chunk_overlap_tokens=int(os.getenv("CHUNK_OVERLAP_TOKENS", "48")),
+            child_chunk_max_tokens=int(os.getenv("CHILD_CHUNK_MAX_TOKENS", "128")),
+            child_chunk_overlap_tokens=int(os.getenv("CHILD_CHUNK_OVERLAP_TOKENS", "16")),
+            storage=StorageProfile.from_env(),
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "IndexSpec":
+        known = {f.name for f in fields(cls)}
+        values = {k: v for k, v in data.items() if k in known}
+        values["storage"] = StorageProfile(**data.get("storage", {}))
+        return cls(**values)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    def with_overrides(self, overrides: Dict[str, Any]) -> "IndexSpec":
+        """Copy with the given spec and StorageProfile fields replaced."""
+        storage_fields = {f.name for f in fields(StorageProfile)}
+        storage = {k: v for k, v in overrides.items() if k in storage_fields}
+        spec = {k: v for k, v in overrides.items() if k not in storage_fields}
+        return replace(self, storage=replace(self.storage, **storage), **spec)
+
+    def same_model(self, other: "IndexSpec") -> bool:
+        return (self.embedding_model, self.embedding_backend) == (
+            other.embedding_model,
+            other.embedding_backend,
+        )
+
+
+class IndexCatalog:
+    """
+    IndexSpec of every chunk collection built by a reindex, kept in a small
+    Qdrant collection next to them so the record follows the alias (and
+    Qdrant backups) rather than the rag-service container.
+    Collections without an entry were built from the environment settings.
+    """
+
+    def __init__(self, client: Any, async_client: Any, alias: str):
+        self.client = client
+        self.async_client = async_client
+        self.collection_name = f"{alias}_catalog"
+
+    def ensure_collection(self):
+        if self.client.collection_exists(self.collection_name):
+            return
+        logger.info(f"INDEX_CATALOG: Creating collection '{self.collection_name}'...")
+        self.client.create_collection(
+            collection_name=self.collection_name,
+            vectors_config=qmodels.VectorParams(size=1, distance=qmodels.Distance.DOT),
+        )
+
+    @staticmethod
+    def point_id(collection: str) -> str:
+        return str(uuid.uuid5(uuid.NAMESPACE_DNS, f"index:{collection}"))
+
+    def get(self, collection: str) -> Optional[IndexSpec]:
+        records = self.client.retrieve(
+            collection_name=self.collection_name,
+            ids=[self.point_id(collection)],
+            with_payload=True,
+        )
+        if not records:
+            return None
+        return IndexSpec.from_dict(records[0].payload["spec"])
+
+    async def aput(self, collection: str, spec: IndexSpec, **stats: Any):
+        await self.async_client.upsert(
+            collection_name=self.collection_name,
+            points=[
+                qmodels.PointStruct(
+                    id=self.point_id(collection),
+                    vector=[1.0],
+                    payload={
+                        "collection": collection,
+                        "spec": spec.to_dict(),
+                        "created_at": time.time(),
+                        **stats,
+                    },
+                )
+            ],
+            wait=True,
+        )
+
+    def delete(self, collection: str):
+        self.client.delete(
+            collection_name=self.collection_name,
+            points_selector=qmodels.PointIdsList(points=[self.point_id(collection)]),
+            wait=True,
+        )
@@ -0,0 +1,85 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class JobRegistry:
+    """
+    In-process registry of long-running background jobs (e.g. filter deletes).
+    Jobs run as asyncio tasks on the service loop; callers get a job id back
+    immediately and poll get() for status. Only the most recent max_history
+    finished jobs are kept, and the registry does not survive a restart.
+    """
+
+    def __init__(self, max_history: int = 200):
+        self.max_history = max_history
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def submit(
+        self, kind: str, params: Dict[str, Any], fn: Callable[[], Awaitable[Any]]
+    ) -> Dict[str, Any]:
+        """Start fn() in the background and return its (pending) job record."""
+        job_id = uuid.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "kind": kind,
+            "params": params,
+            "status": "pending",
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None,
+        }
+        self._jobs[job_id] = job
+        self._tasks[job_id] = asyncio.create_task(self._run(job, fn))
+        self._prune()
+        return dict(job)
+
+    async def _run(self, job: Dict[str, Any], fn: Callable[[], Awaitable[Any]]):
+        job["status"] = "running"
+        job["started_at"] = time.time()
+        try:
+            job["result"] = await fn()
+            job["status"] = "completed"
+        except asyncio.CancelledError:
+            job["status"] = "cancelled"
+            raise
+        except Exception as e:
+            logger.error(f"JOBS: {job['kind']} job {job['job_id']} failed: {e}")
+            job["error"] = str(e)
+            job["status"] = "failed"
+        finally:
+            job["finished_at"] = time.time()
+            self._tasks.pop(job["job_id"], None)
+            logger.info(
+                f"JOBS: {job['kind']} job {job['job_id']} {job['status']} in "
+                f"{job['finished_at'] - job['started_at']:.2f}s"
+            )
+
+    def _prune(self):
+        finished = [job_id for job_id in self._jobs if job_id not in self._tasks]
+        for job_id in finished[: max(0, len(finished) - self.max_history)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id)
+        return dict(job) if job else None
+
+    def stats(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for job in self._jobs.values():
+            counts[job["status"]] = counts.get(job["status"], 0) + 1
+        return counts
+
+    async def shutdown(self):
+        """Cancel jobs still running at shutdown."""
+        for task in list(self._tasks.values()):
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
@@ -3,18 +3,27 @@ RAG Service API
 """
 
 import os
+import json
+import time
 import uuid
+import asyncio
 import logging
 import tempfile
-from typing import List, Dict, Any, Optional
+from collections import Counter
+from typing import AsyncIterator, List, Dict, Any, Optional
 
 from fastapi import FastAPI, HTTPException, UploadFile, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field, validator
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect
+from pydantic import BaseModel, Field, ValidationError, validator
 
 # Import the new VectorStore module
 from vector_store import vector_store
+from chunker import ParentChildChunker, build_chunker
+from job_registry import JobRegistry
+from reindexer import Reindexer, WriteGate
+from wire_format import encode, select_fields
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -42,6 +51,12 @@ class SearchRequest(BaseModel):
     conversation_id: Optional[str] = None
     limit: int = Field(5, ge=1, le=50)
     threshold: float = Field(0.0, ge=0.0, le=1.0) # Default 0.0 for cosine similarity
+    mode: str = Field("dense", pattern="^(dense|hybrid)$") # hybrid = dense + BM25 fused with RRF
+    route_documents: Optional[int] = Field(None, ge=0, le=100) # Two-stage: top-N documents first (None = DOC_ROUTING_TOP_K, 0 = off)
+    expand_context: bool = True # Return merged parent windows instead of the matched child chunks
+    cutoff: Optional[str] = Field(None, pattern="^(gap|knee)$") # Dynamic top-k: cut at the biggest score gap / the knee (hybrid: of the dense cosine scores)
+    mmr: bool = False # Maximal marginal relevance: diversify results, drop near-duplicates
+    fields: Optional[List[str]] = Field(None, max_length=64) # Metadata keys to return (None = all, [] = none)
 
     @validator('query')
     def query_not_empty(cls, v):
@@ -63,14 +78,33 @@ class RAGIngestRequest(BaseModel):
             raise ValueError('Content cannot be empty')
         return v.strip()
 
+class StreamIngestHeader(BaseModel):
+    """First NDJSON line of /ingest_stream; following lines are {"text": "..."} segments."""
+    document_id: str = Field(..., min_length=1)
+    workspace_id: str = Field(..., min_length=1)
+    metadata: Dict[str, Any] = Field(default_factory=dict)
+    user_id: Optional[str] = None
+    conversation_id: Optional[str] = None
+
 class IngestResponse(BaseModel):
     document_id: str
     chunks_count: int
     status: str
+    chunks_embedded: Optional[int] = None # Only new/changed chunks are re-embedded on re-ingest
+    chunks_shared: Optional[int] = None # Near-duplicates of another document's chunks, stored once
 
 class BatchIngestRequest(BaseModel):
     documents: List[RAGIngestRequest]
 
+    @validator('documents')
+    def unique_document_ids(cls, v):
+        # Two entries for one document would plan against, and overwrite, the same points
+        counts = Counter(d.document_id for d in v)
+        duplicates = sorted(d for d, n in counts.items() if n > 1)
+        if duplicates:
+            raise ValueError(f'Duplicate document_id in batch: {", ".join(duplicates)}')
+        return v
+
 class BatchIngestResponse(BaseModel):
     results: List[IngestResponse]
     total_processed: int
@@ -82,17 +116,222 @@ class SearchResult(BaseModel):
     score: float
     metadata: Dict[str, Any]
 
+class SearchBatchRequest(BaseModel):
+    queries: List[SearchRequest] = Field(..., min_length=1, max_length=32)
+
+class DeleteByFilterRequest(BaseModel):
+    workspace_id: Optional[str] = None
+    conversation_id: Optional[str] = None
+
+    @validator('conversation_id', always=True)
+    def scope_required(cls, v, values):
+        if not v and not values.get('workspace_id'):
+            raise ValueError('workspace_id or conversation_id is required')
+        return v
+
+class DeleteDocumentsRequest(BaseModel):
+    document_ids: List[str] = Field(..., min_length=1, max_length=1000)
+
+class ReindexRequest(BaseModel):
+    """Settings for the rebuilt collection; fields left out keep their current value."""
+    embedding_model: Optional[str] = Field(None, min_length=1) # Hub name or local directory
+    embedding_backend: Optional[str] = Field(None, pattern="^(torch|onnx|onnx-int8)$")
+    chunk_strategy: Optional[str] = Field(None, pattern="^(token|chars)$")
+    chunk_max_tokens: Optional[int] = Field(None, ge=16, le=8192)
+    chunk_overlap_tokens: Optional[int] = Field(None, ge=0)
+    child_chunk_max_tokens: Optional[int] = Field(None, ge=0) # 0 = no parent-child chunking
+    child_chunk_overlap_tokens: Optional[int] = Field(None, ge=0)
+    quantization: Optional[str] = Field(None, pattern="^(none|scalar|binary)$")
+    vectors_on_disk: Optional[bool] = None
+    hnsw_m: Optional[int] = Field(None, ge=4, le=128)
+    hnsw_ef_construct: Optional[int] = Field(None, ge=4)
+    batch_documents: int = Field(8, ge=1, le=256) # Documents re-chunked and embedded per step
+    max_chunks_per_second: Optional[float] = Field(None, gt=0) # Rate limit on top of yielding to live traffic
+    drop_previous: bool = False # Delete the old collection after the swap (default: kept for rollback)
+
+# Options of the reindex run itself, as opposed to IndexSpec overrides
+REINDEX_OPTIONS = ("batch_documents", "max_chunks_per_second", "drop_previous")
+
+# Background jobs (bulk deletes, document-vector backfills, reindexes); status is polled via /jobs/{job_id}
+jobs = JobRegistry(max_history=int(os.getenv("JOB_HISTORY_SIZE", "200")))
+
 # Utils
-# deolver a 512 y 50, cambiado por prueba de consumo de tokens y mejora de respuestas (codigo mirai)
-def chunk_text(text: str, chunk_size: int = 2000, overlap: int = 200) -> List[str]:
-    """Smart chunking with langchain (using smaller chunks for local models)"""
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=overlap,
-        separators=["\n\n", "\n", ". ", " ", ""],
-        length_function=len
+# Token-aware chunker, built once the model (and its tokenizer) has loaded
+chunker = None
+
+def _initialize_service():
+    """Background startup: model + collection, then the chunker that needs the tokenizer."""
+    global chunker
+    vector_store.initialize()
+    start = time.perf_counter()
+    chunker = build_index_chunker(vector_store.index_spec, vector_store.embedding_model)
+    vector_store.startup_timings["chunker"] = round(time.perf_counter() - start, 3)
+
+def build_index_chunker(spec, model):
+    """
+    Token-aware chunking sized to the model window (CHUNKING_STRATEGY=chars restores
+    2000-char chunks), with the chunk settings of the collection's IndexSpec.
+    """
+    return build_chunker(
+        strategy=spec.chunk_strategy,
+        tokenizer=model.tokenizer,
+        tokenizer_name=spec.embedding_model,
+        model_max_tokens=model.max_seq_length,
+        max_tokens=spec.chunk_max_tokens,
+        overlap_tokens=spec.chunk_overlap_tokens,
+        child_max_tokens=spec.child_chunk_max_tokens,
+        child_overlap_tokens=spec.child_chunk_overlap_tokens,
+    )
+
+def is_ready() -> bool:
+    return vector_store.ready.is_set() and chunker is not None
+
+def require_ready():
+    """Readiness gate for endpoints that need the model and the collection."""
+    if not is_ready():
+        raise HTTPException(
+            status_code=503,
+            detail=vector_store.startup_error or "RAG service is starting up",
+            headers={"Retry-After": "5"},
+        )
+
+def chunk_text(text: str) -> List[str]:
+    """Smart chunking with langchain, respecting headings, tables and list items"""
+    return chunker.split(text)
+
+def build_chunk_documents(
+    doc_request, chunks: List[str], start_index: int = 0, active_chunker=None
+) -> List[Dict[str, Any]]:
+    """
+    Chunk dicts (content + payload metadata) for VectorStore ingest.
+    With parent-child chunking each chunk is a parent window: its children are
+    indexed under the parent's chunk_index, and the first child also carries
+    the parent text (parent_content) that search returns.
+    active_chunker defaults to the service chunker (a reindex passes its own).
+    """
+    active_chunker = active_chunker or chunker
+    documents = []
+    for i, chunk in enumerate(chunks, start=start_index):
+        chunk_id = f"{doc_request.document_id}_chunk_{i}"
+
+        metadata = {
+            "conversation_id": None,
+            **doc_request.metadata,
+            "workspace_id": doc_request.workspace_id,
+            "chunk_index": i,
+            "document_id": doc_request.document_id,
+            "chunk_id": chunk_id,
+            "chunking": active_chunker.params
+        }
+        if doc_request.user_id:
+            metadata["user_id"] = doc_request.user_id
+
+        if doc_request.conversation_id: # If passed in metadata
+             metadata["conversation_id"] = doc_request.conversation_id
+
+        if not isinstance(active_chunker, ParentChildChunker):
+            documents.append({
+                "content": chunk,
+                "metadata": metadata
+            })
+            continue
+
+        for j, child in enumerate(active_chunker.split_children(chunk)):
+            child_metadata = {
+                **metadata,
+                "chunk_id": f"{chunk_id}_{j}",
+                "child_index": j,
+                "parent_chunk_id": f"{chunk_id}_0",
+            }
+            if j == 0:
+                child_metadata["parent_content"] = chunk
+            documents.append({
+                "content": child,
+                "metadata": child_metadata
+            })
+    return documents
+
+def chunk_document(doc_request, active_chunker=None) -> List[Dict[str, Any]]:
+    active_chunker = active_chunker or chunker
+    return build_chunk_documents(
+        doc_request, active_chunker.split(doc_request.content), active_chunker=active_chunker
     )
-    return text_splitter.split_text(text)
+
+def chunk_stored_document(document: Dict[str, Any], active_chunker) -> List[Dict[str, Any]]:
+    """Reindex: chunk a document rebuilt from the live collection with the new chunker."""
+    return chunk_document(RAGIngestRequest(**document), active_chunker)
+
+def use_chunker(new_chunker):
+    """Reindex swap: new ingests are chunked like the collection now behind the alias."""
+    global chunker
+    chunker = new_chunker
+
+# Every chunk write goes through the gate, so a running reindex can replay it and hold writes for the swap
+write_gate = WriteGate()
+reindexer = Reindexer(
+    vector_store,
+    write_gate,
+    make_chunker=build_index_chunker,
+    chunk_document=chunk_stored_document,
+    on_swap=use_chunker,
+    # Reindex batches wait while this many live embedding jobs are queued
+    busy_queue_depth=int(os.getenv("REINDEX_BUSY_QUEUE_DEPTH", "4")),
+    swap_drain_seconds=float(os.getenv("REINDEX_SWAP_DRAIN_SECONDS", "30")),
+)
+
+# Streaming ingest: text buffered before re-chunking, and chunks per embed/upsert batch
+STREAM_BUFFER_CHARS = int(os.getenv("STREAM_BUFFER_CHARS", "50000"))
+STREAM_UPSERT_BATCH = int(os.getenv("STREAM_UPSERT_BATCH", "64"))
+
+async def iter_ndjson(request: Request) -> AsyncIterator[Dict[str, Any]]:
+    """Parse an NDJSON request body line by line without buffering it whole."""
+    pending = b""
+    async for data in request.stream():
+        pending += data
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+    if pending.strip():
+        yield json.loads(pending)
+
+async def stream_chunk_batches(
+    header: StreamIngestHeader, segments: AsyncIterator[str], stats: Dict[str, int]
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Chunk text segments as they arrive. The last chunk of each pass is carried
+    over, since the next segment may continue it; complete chunks are emitted in
+    batches of STREAM_UPSERT_BATCH.
+    """
+    buffer = ""
+    ready: List[str] = []
+
+    async def drain(final: bool):
+        nonlocal ready
+        while ready and (final or len(ready) >= STREAM_UPSERT_BATCH):
+            batch, ready = ready[:STREAM_UPSERT_BATCH], ready[STREAM_UPSERT_BATCH:]
+            yield await run_in_threadpool(
+                build_chunk_documents, header, batch, start_index=stats["chunks"]
+            )
+            stats["chunks"] += len(batch)
+
+    async for segment in segments:
+        buffer += segment
+        if len(buffer) < STREAM_BUFFER_CHARS:
+            continue
+        chunks = await run_in_threadpool(chunk_text, buffer)
+        if len(chunks) > 1:
+            ready.extend(chunks[:-1])
+            # Keep the original text (incl. trailing whitespace) from the carried chunk on
+            carry_from = buffer.rfind(chunks[-1])
+            buffer = buffer[carry_from:] if carry_from >= 0 else chunks[-1]
+        async for documents in drain(final=False):
+            yield documents
+
+    if buffer.strip():
+        ready.extend(await run_in_threadpool(chunk_text, buffer))
+    async for documents in drain(final=True):
+        yield documents
 
 # Endpoints
 @app.post("/ingest_text", response_model=IngestResponse)
@@ -101,41 +340,26 @@ async def ingest_text_content(
     rag_request: RAGIngestRequest
 ):
     """Index text content"""
+    require_ready()
     try:
-        text_content = rag_request.content
-        chunks = chunk_text(text_content)
-        
-        documents_to_upsert = []
-        for i, chunk in enumerate(chunks):
-            chunk_id = f"{rag_request.document_id}_chunk_{i}"
-            
-            metadata = {
-                "conversation_id": None,
-                **rag_request.metadata,
-                "workspace_id": rag_request.workspace_id,
-                "chunk_index": i,
-                "document_id": rag_request.document_id,
-                "chunk_id": chunk_id
-            }
-            if rag_request.user_id:
-                metadata["user_id"] = rag_request.user_id
-            
-            if rag_request.conversation_id: # If passed in metadata
-                 metadata["conversation_id"] = rag_request.conversation_id
-
-            documents_to_upsert.append({
-                "content": chunk,
-                "metadata": metadata
-            })
+        async with write_gate.write([rag_request.document_id]):
+            documents_to_upsert = await run_in_threadpool(chunk_document, rag_request)
 
-        count = vector_store.upsert_documents(documents_to_upsert)
+            summary = await vector_store.aingest_document(
+                rag_request.document_id, documents_to_upsert
+            )
 
-        logger.info(f"Indexed doc {rag_request.document_id} with {count} chunks")
+        logger.info(
+            f"Indexed doc {rag_request.document_id} with {summary['chunks']} chunks "
+            f"({summary['embedded']} embedded)"
+        )
 
         return IngestResponse(
             document_id=rag_request.document_id,
-            chunks_count=count,
-            status="success"
+            chunks_count=summary["chunks"],
+            status="success",
+            chunks_embedded=summary["embedded"],
+            chunks_shared=summary["shared"]
         )
 
     except Exception as e:
@@ -145,48 +369,49 @@ async def ingest_text_content(
 @app.post("/ingest_batch", response_model=BatchIngestResponse)
 async def ingest_batch(request: Request, batch_request: BatchIngestRequest):
     """Batch index documents"""
+    require_ready()
     try:
         results = []
         total_chunks = 0
-        
+
+        async with write_gate.write([doc.document_id for doc in batch_request.documents]):
+            # Chunk every document first, then embed/upsert them as one pipelined batch
+            chunked = await asyncio.gather(
+                *(run_in_threadpool(chunk_document, doc) for doc in batch_request.documents),
+                return_exceptions=True,
+            )
+            to_ingest = []
+            for doc_request, documents in zip(batch_request.documents, chunked):
+                if isinstance(documents, Exception):
+                    logger.error(f"Error processing doc {doc_request.document_id}: {documents}")
+                    continue
+                to_ingest.append((doc_request.document_id, documents))
+
+            summaries = dict(
+                zip(
+                    (document_id for document_id, _ in to_ingest),
+                    await vector_store.aingest_documents(to_ingest),
+                )
+            )
+
         for doc_request in batch_request.documents:
-            try:
-                chunks = chunk_text(doc_request.content)
-                documents_to_upsert = []
-                
-                for i, chunk in enumerate(chunks):
-                    chunk_id = f"{doc_request.document_id}_chunk_{i}"
-                    metadata = {
-                        "conversation_id": None,
-                        **doc_request.metadata,
-                        "workspace_id": doc_request.workspace_id,
-                        "chunk_index": i,
-                        "document_id": doc_request.document_id,
-                        "chunk_id": chunk_id
-                    }
-                    if doc_request.user_id:
-                        metadata["user_id"] = doc_request.user_id
-                    
-                    documents_to_upsert.append({
-                        "content": chunk,
-                        "metadata": metadata
-                    })
-                
-                count = vector_store.upsert_documents(documents_to_upsert)
-                total_chunks += count
-                
-                results.append(IngestResponse(
-                    document_id=doc_request.document_id,
-                    chunks_count=count,
-                    status="success"
-                ))
-            except Exception as e:
-                logger.error(f"Error processing doc {doc_request.document_id}: {e}")
+            summary = summaries.get(doc_request.document_id)
+            if summary is None or "error" in summary:
                 results.append(IngestResponse(
                     document_id=doc_request.document_id,
                     chunks_count=0,
                     status="error"
                 ))
+                continue
+
+            total_chunks += summary["chunks"]
+            results.append(IngestResponse(
+                document_id=doc_request.document_id,
+                chunks_count=summary["chunks"],
+                status="success",
+                chunks_embedded=summary["embedded"],
+                chunks_shared=summary["shared"]
+            ))
         
         return BatchIngestResponse(
             results=results,
@@ -198,43 +423,260 @@ async def ingest_batch(request: Request, batch_request: BatchIngestRequest):
         logger.error(f"Batch error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/ingest_stream", response_model=IngestResponse)
+async def ingest_stream(request: Request):
+    """
+    Index a document streamed as NDJSON (application/x-ndjson):
+    a StreamIngestHeader line, then {"text": "..."} segments in document order.
+    Segments are chunked, embedded and upserted incrementally. If the body
+    breaks off (client disconnect, malformed line), the document's points are
+    deleted rather than left half-written and searchable.
+    """
+    require_ready()
+    lines = iter_ndjson(request)
+    try:
+        header = StreamIngestHeader(**await lines.__anext__())
+    except (StopAsyncIteration, json.JSONDecodeError, ValidationError, TypeError) as e:
+        raise HTTPException(status_code=422, detail=f"Invalid stream header: {e}")
+
+    async def segments() -> AsyncIterator[str]:
+        async for line in lines:
+            text = line.get("text")
+            if text:
+                yield text
+
+    try:
+        stats = {"chunks": 0}
+        async with write_gate.write([header.document_id]):
+            try:
+                summary = await vector_store.aingest_document_stream(
+                    header.document_id, stream_chunk_batches(header, segments(), stats)
+                )
+            except (ClientDisconnect, json.JSONDecodeError):
+                await vector_store.adelete_document(header.document_id)
+                raise
+        if summary["chunks"] == 0:
+            raise HTTPException(status_code=422, detail="Content cannot be empty")
+
+        logger.info(
+            f"Indexed streamed doc {header.document_id} with {summary['chunks']} chunks "
+            f"({summary['embedded']} embedded)"
+        )
+
+        return IngestResponse(
+            document_id=header.document_id,
+            chunks_count=summary["chunks"],
+            status="success",
+            chunks_embedded=summary["embedded"],
+            chunks_shared=summary["shared"]
+        )
+
+    except HTTPException:
+        raise
+    except (ClientDisconnect, json.JSONDecodeError) as e:
+        logger.warning(
+            f"Stream for {header.document_id} broke off after {stats['chunks']} chunks; points removed"
+        )
+        raise HTTPException(status_code=400, detail=f"Stream interrupted: {e!r}")
+    except Exception as e:
+        logger.error(f"Stream index error for {header.document_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/search", response_model=List[SearchResult])
 async def search_documents(request: Request, search_request: SearchRequest):
     """Search documents"""
+    require_ready()
     try:
-        results = vector_store.search(
+        results = await vector_store.asearch(
             query=search_request.query,
             workspace_id=search_request.workspace_id,
             conversation_id=search_request.conversation_id,
             limit=search_request.limit,
-            threshold=search_request.threshold
+            threshold=search_request.threshold,
+            mode=search_request.mode,
+            route_documents=search_request.route_documents,
+            expand_context=search_request.expand_context,
+            cutoff=search_request.cutoff,
+            mmr=search_request.mmr,
+            fields=search_request.fields
         )
 
-        return [SearchResult(**r) for r in results]
+        # Encoded as is (msgpack or JSON, per Accept); SearchResult only documents the shape
+        return encode(request, select_fields(results, search_request.fields))
 
     except Exception as e:
         logger.error(f"Search error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/search_batch", response_model=List[List[SearchResult]])
+async def search_documents_batch(request: Request, batch_request: SearchBatchRequest):
+    """Run several searches with one encode batch and one Qdrant batch query"""
+    require_ready()
+    try:
+        results = await vector_store.asearch_batch(
+            [query.model_dump() for query in batch_request.queries]
+        )
+
+        return encode(
+            request,
+            [
+                select_fields(hits, query.fields)
+                for query, hits in zip(batch_request.queries, results)
+            ],
+        )
+
+    except Exception as e:
+        logger.error(f"Batch search error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.delete("/delete/{document_id}")
 async def delete_document(request: Request, document_id: str):
     """Delete document"""
+    require_ready()
     try:
-        vector_store.delete_document(document_id)
+        async with write_gate.write([document_id]):
+            await vector_store.adelete_document(document_id)
         return {"status": "success", "message": f"Document {document_id} deleted"}
     except Exception as e:
         logger.error(f"Delete error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/delete_documents")
+async def delete_documents(request: Request, delete_request: DeleteDocumentsRequest):
+    """Delete the chunks of several documents at once (e.g. orphans found by reconciliation)"""
+    require_ready()
+    try:
+        async with write_gate.write(delete_request.document_ids):
+            return await vector_store.adelete_documents(delete_request.document_ids)
+    except Exception as e:
+        logger.error(f"Delete documents error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/delete_by_filter", status_code=202)
+async def delete_by_filter(request: Request, delete_request: DeleteByFilterRequest):
+    """Delete all chunks of a workspace and/or conversation in the background; returns a job handle"""
+    require_ready()
+    params = delete_request.model_dump()
+
+    async def run():
+        async with write_gate.write(scope=params):
+            return await vector_store.adelete_by_filter(**params)
+
+    job = jobs.submit("delete_by_filter", params, run)
+    logger.info(f"Delete job {job['job_id']} queued for {params}")
+    return job
+
+@app.get("/jobs/{job_id}")
+async def get_job(request: Request, job_id: str):
+    """Status of a background job"""
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+@app.post("/document_vectors/rebuild", status_code=202)
+async def rebuild_document_vectors(request: Request):
+    """Backfill the per-document routing vectors from the stored chunks (background job)"""
+    require_ready()
+    return jobs.submit("rebuild_document_vectors", {}, vector_store.document_router.arebuild)
+
+@app.post("/reindex", status_code=202)
+async def reindex(request: Request, reindex_request: ReindexRequest):
+    """
+    Rebuild the index with a new model, chunking or storage settings in the
+    background and swap it in behind the alias once verified (background job).
+    """
+    require_ready()
+    if reindexer.running:
+        raise HTTPException(status_code=409, detail="A reindex is already running")
+    params = reindex_request.model_dump(exclude_none=True)
+    overrides = {k: v for k, v in params.items() if k not in REINDEX_OPTIONS}
+    options = {k: v for k, v in params.items() if k in REINDEX_OPTIONS}
+    job = jobs.submit("reindex", params, lambda: reindexer.run(overrides, **options))
+    logger.info(f"Reindex job {job['job_id']} queued with {params}")
+    return job
+
+@app.get("/index")
+async def index_status(request: Request):
+    """Alias, the collection behind it, its settings and reindex progress"""
+    return {
+        "alias": vector_store.collection_alias,
+        "collection": vector_store.physical_collection,
+        "spec": vector_store.index_spec.to_dict(),
+        "reindex": reindexer.status,
+        "write_gate": write_gate.stats(),
+    }
+
+@app.get("/index/documents")
+async def index_documents(request: Request):
+    """
+    Chunk count per document in the live collection, plus its size and the
+    stale collections next to it, for reconciliation against the backend DB.
+    """
+    require_ready()
+    in_use = []
+    if reindexer.running:
+        in_use = [reindexer.status["target"], f"{reindexer.status['target']}_documents"]
+    documents = await vector_store.adocument_chunk_counts()
+    return {
+        "collection": vector_store.physical_collection,
+        "documents": documents,
+        "chunks": sum(documents.values()),
+        "storage": await vector_store.aindex_storage(in_use),
+    }
+
 @app.get("/health")
 async def health_check(request: Request):
     """Health check"""
     try:
         # Check Qdrant connection via vector_store
-        vector_store.client.get_collections()
-        return {"status": "healthy", "service": "RAG Service (Qdrant + Local Embeddings)"}
+        await vector_store.async_client.get_collections()
+        return {
+            "status": "healthy" if is_ready() else "starting",
+            "service": "RAG Service (Qdrant + Local Embeddings)",
+            "vector_backend": vector_store.vector_backend,
+            "collection": vector_store.physical_collection,
+            "startup": vector_store.startup_status(),
+            "embedding_pool": vector_store.embedding_executor.stats(),
+            "embedding_process_pool": (
+                vector_store.embedding_pool.stats() if vector_store.embedding_pool else None
+            ),
+            "query_batching": vector_store.query_batcher.stats(),
+            "query_cache": vector_store.query_cache.stats(),
+            "hybrid_search": vector_store.sparse_enabled,
+            "document_routing_top_k": vector_store.routing_top_k,
+        }
     except Exception as e:
-        return {"status": "error", "message": str(e)}
+        return {"status": "error", "message": str(e), "startup": vector_store.startup_status()}
+
+@app.get("/ready")
+async def readiness_check(request: Request):
+    """Readiness probe: 200 once the model is loaded and the collection is ensured"""
+    require_ready()
+    return {"status": "ready", "startup": vector_store.startup_status()}
+
+@app.get("/metrics")
+async def metrics(request: Request):
+    """Embedding pool, query batching and query cache metrics"""
+    return {
+        "embedding_pool": vector_store.embedding_executor.stats(),
+        "embedding_process_pool": (
+            vector_store.embedding_pool.stats() if vector_store.embedding_pool else None
+        ),
+        "query_batching": vector_store.query_batcher.stats(),
+        "query_cache": vector_store.query_cache.stats(),
+        "jobs": jobs.stats(),
+    }
+
+@app.on_event("startup")
+async def startup_event():
+    # Port is already bound; heavy initialization runs in the background
+    app.state.init_task = asyncio.create_task(run_in_threadpool(_initialize_service))
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await jobs.shutdown()
+    await vector_store.aclose()
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,190 @@
+"""
+Near-duplicate chunk detection with MinHash and LSH banding.
+
+RFP packages repeat boilerplate (legal clauses, headers, annex templates)
+in every document of a workspace. Each chunk gets a 64-value MinHash
+signature of its word 3-grams; the share of equal values estimates the
+Jaccard similarity of two chunks. The signature is also split into 16
+bands of 4 values, hashed into keyword band keys, so candidates are found
+with one indexed MatchAny filter: chunks with Jaccard >= 0.85 share a
+band with probability > 0.9999, unrelated chunks practically never.
+
+A near-duplicate chunk is not stored again. The point already holding it
+lists the document in `shared_by` (filterable) and keeps the document's
+chunk positions and metadata in `shared_refs`, so the chunk still belongs
+to that document for routing, reindexing and deletes.
+"""
+
+import hashlib
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+WORD = re.compile(r"\w+", re.UNICODE)
+SHINGLE_WORDS = 3
+PERMUTATIONS = 64
+BANDS = 16
+ROWS = PERMUTATIONS // BANDS
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+
+
+def _hash32(data: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=4).digest(), "little")
+
+
+def _coefficient(seed: str) -> int:
+    value = int.from_bytes(hashlib.blake2b(seed.encode(), digest_size=8).digest(), "little")
+    return value % ((1 << 61) - 1)
+
+
+# Hash permutations h -> (a*h + b) mod p, a and b in [1, p); a*h wraps in uint64,
+# which keeps the permutations independent enough for MinHash
+_A = np.array([_coefficient(f"a{i}") or 1 for i in range(PERMUTATIONS)], dtype=np.uint64)
+_B = np.array([_coefficient(f"b{i}") for i in range(PERMUTATIONS)], dtype=np.uint64)
+
+# Fingerprint fields; internal, so left out of search results and rebuilt documents
+FINGERPRINT_FIELDS = ("minhash", "minhash_bands")
+SHARED_FIELDS = ("shared_by", "shared_refs")
+# Where a referencing document has the chunk; the rest of its payload is document metadata
+REFERENCE_FIELDS = ("chunk_id", "chunk_index", "child_index", "parent_chunk_id")
+# Text fields (and hashes) of the stored point; a referencing document has no copy of its own
+TEXT_FIELDS = ("content", "content_hash", "payload_hash", "parent_content")
+
+
+def minhash(text: str) -> Tuple[np.ndarray, int]:
+    """MinHash signature (uint32 x PERMUTATIONS) of the text's word 3-grams, and its word count."""
+    words = WORD.findall(text.lower())
+    shingles = {
+        " ".join(words[i : i + SHINGLE_WORDS])
+        for i in range(max(1, len(words) - SHINGLE_WORDS + 1))
+    }
+    hashes = np.fromiter(
+        (_hash32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles)
+    )
+    permuted = (hashes[:, None] * _A + _B) % _MERSENNE_PRIME
+    return (permuted.min(axis=0) & np.uint64(0xFFFFFFFF)).astype("<u4"), len(words)
+
+
+def band_keys(signature: np.ndarray) -> List[str]:
+    return [
+        f"{i}:{_hash32(signature[i * ROWS : (i + 1) * ROWS].tobytes()):08x}" for i in range(BANDS)
+    ]
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.mean(a == b))
+
+
+def signature(payload: Dict[str, Any]) -> np.ndarray:
+    return np.frombuffer(bytes.fromhex(payload["minhash"]), dtype="<u4")
+
+
+def fingerprint_fields(text: str, min_words: int) -> Dict[str, Any]:
+    """Payload fields for a chunk; none for chunks too short to fingerprint reliably."""
+    values, words = minhash(text)
+    if words < min_words:
+        return {}
+    return {"minhash": values.tobytes().hex(), "minhash_bands": band_keys(values)}
+
+
+class FingerprintIndex:
+    """In-memory band index over the candidate points fetched for one ingest."""
+
+    def __init__(self):
+        self._by_band: Dict[str, List[str]] = {}
+        self._signatures: Dict[str, np.ndarray] = {}
+
+    def add(self, point_id: str, payload: Dict[str, Any]):
+        self._signatures[point_id] = signature(payload)
+        for band in payload["minhash_bands"]:
+            self._by_band.setdefault(band, []).append(point_id)
+
+    def nearest(self, payload: Dict[str, Any], threshold: float) -> Optional[str]:
+        """Most similar indexed point with estimated Jaccard >= threshold (ties: lowest ID), if any."""
+        values = signature(payload)
+        candidates = {p for band in payload["minhash_bands"] for p in self._by_band.get(band, ())}
+        best = max(
+            ((similarity(values, self._signatures[p]), p) for p in sorted(candidates)),
+            key=lambda c: c[0],
+            default=None,
+        )
+        return best[1] if best is not None and best[0] >= threshold else None
+
+
+def reference(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Position of a chunk in its document, recorded on the point it is shared with."""
+    return {k: payload[k] for k in REFERENCE_FIELDS if k in payload}
+
+
+def document_metadata(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Document-level part of a chunk payload (ids, filename, chunking...)."""
+    chunk_level = (*REFERENCE_FIELDS, *TEXT_FIELDS, *FINGERPRINT_FIELDS, *SHARED_FIELDS)
+    return {k: v for k, v in payload.items() if k not in chunk_level}
+
+
+def without_sharers(payload: Dict[str, Any], document_ids: Iterable[str]) -> Dict[str, Any]:
+    """Shared fields of a point once the given documents no longer reference it."""
+    dropped = set(document_ids)
+    refs = {d: entry for d, entry in (payload.get("shared_refs") or {}).items() if d not in dropped}
+    return {"shared_by": sorted(refs), "shared_refs": refs}
+
+
+def referenced_payloads(payload: Dict[str, Any], document_id: str) -> List[Dict[str, Any]]:
+    """Payloads of `document_id`'s chunks stored as references to this point."""
+    entry = (payload.get("shared_refs") or {}).get(document_id)
+    if not entry:
+        return []
+    shared = {k: payload[k] for k in ("content", "content_hash", *FINGERPRINT_FIELDS) if k in payload}
+    return [{**shared, **entry["metadata"], **chunk} for chunk in entry["chunks"]]
+
+
+def promoted(payload: Dict[str, Any], exclude: Iterable[str] = ()) -> Optional[Dict[str, Any]]:
+    """
+    Payload for a copy of a point that is going away (deleted, or overwritten
+    by its owner) but still referenced: owned by the first remaining
+    referencing document, at its position, carrying the other references.
+    None when no other document references the point.
+    """
+    refs = without_sharers(payload, exclude)["shared_refs"]
+    refs = {d: entry for d, entry in refs.items() if entry.get("chunks")}
+    if not refs:
+        return None
+    owner = min(refs)
+    first, *rest = referenced_payloads(payload, owner)
+    if rest:
+        refs[owner] = {**refs[owner], "chunks": refs[owner]["chunks"][1:]}
+    else:
+        del refs[owner]
+    return {**first, "shared_by": sorted(refs), "shared_refs": refs}
+
+
+def collapse_hits(points: List[Any], threshold: float) -> List[Any]:
+    """
+    Drop hits (in score order) that near-duplicate a better-scored one; the
+    kept hit lists the other documents in `duplicate_document_ids`. Catches
+    duplicates stored before sharing, or across conversations.
+    """
+    kept: List[Tuple[np.ndarray, Any]] = []
+    results = []
+    for point in points:
+        payload = point.payload or {}
+        if payload.get("minhash"):
+            values = signature(payload)
+            match = next((p for v, p in kept if similarity(v, values) >= threshold), None)
+            if match is not None:
+                duplicates = match.payload.get("duplicate_document_ids", [])
+                document_id = payload.get("document_id")
+                if document_id != match.payload.get("document_id") and document_id not in duplicates:
+                    match.payload["duplicate_document_ids"] = [*duplicates, document_id]
+                continue
+            kept.append((values, point))
+        results.append(point)
+    return results
+
+
+def public_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Payload as returned in search results, without dedup and change-detection internals."""
+    internal = (*FINGERPRINT_FIELDS, "payload_hash", "shared_refs")
+    return {k: v for k, v in payload.items() if k not in internal}
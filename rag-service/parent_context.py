@@ -0,0 +1,109 @@
+"""
+Search-side expansion of parent-child chunks.
+
+Child hits are grouped by their parent window (document_id + chunk_index),
+parent texts are looked up, and parent windows of the same document with
+consecutive chunk_index are merged into one context block. Points indexed
+without parent-child chunking pass through as their own block.
+"""
+
+from typing import Any, Callable, Dict, List
+
+from qdrant_client.http import models as qmodels
+
+from near_duplicates import public_payload
+
+
+def group_by_parent(
+    hits: List[qmodels.ScoredPoint],
+    limit: int,
+    point_id: Callable[[Dict[str, Any]], str],
+) -> List[Dict[str, Any]]:
+    """
+    Best-scoring hit per parent window, for at most `limit` parents.
+    point_id maps {"chunk_id": ...} to the Qdrant point ID holding the parent text.
+    """
+    groups: Dict[Any, Dict[str, Any]] = {}
+    for hit in hits:
+        payload = hit.payload or {}
+        parent_chunk_id = payload.get("parent_chunk_id")
+        key = (
+            (payload.get("document_id"), payload.get("chunk_index"))
+            if parent_chunk_id
+            else str(hit.id)
+        )
+
+        group = groups.get(key)
+        if group is None:
+            if len(groups) >= limit:
+                continue
+            group = groups[key] = {
+                "hit": hit,
+                "matches": 0,
+                "content": None if parent_chunk_id else payload.get("content"),
+                "parent_point_id": point_id({"chunk_id": parent_chunk_id})
+                if parent_chunk_id
+                else None,
+            }
+        group["matches"] += 1
+        if group["content"] is None and payload.get("parent_content"):
+            group["content"] = payload["parent_content"]
+    return list(groups.values())
+
+
+def missing_parent_ids(groups: List[Dict[str, Any]]) -> List[str]:
+    """Points to fetch for parents whose text was not in any of the hits."""
+    return [g["parent_point_id"] for g in groups if g["content"] is None]
+
+
+def _block(run: List[Dict[str, Any]], parent_texts: Dict[str, str]) -> Dict[str, Any]:
+    best = max(run, key=lambda g: g["hit"].score)
+    metadata = {
+        k: v for k, v in public_payload(best["hit"].payload or {}).items() if k != "parent_content"
+    }
+    if best["parent_point_id"]:
+        metadata["chunk_indexes"] = [g["hit"].payload.get("chunk_index") for g in run]
+    metadata["matched_chunks"] = sum(g["matches"] for g in run)
+
+    texts = [
+        g["content"]
+        or parent_texts.get(g["parent_point_id"])
+        or g["hit"].payload.get("content", "")
+        for g in run
+    ]
+    return {
+        "document_id": metadata.get("document_id"),
+        "content": "\n".join(t.strip() for t in texts),
+        "score": best["hit"].score,
+        "metadata": metadata,
+    }
+
+
+def merge_adjacent(
+    groups: List[Dict[str, Any]], parent_texts: Dict[str, str]
+) -> List[Dict[str, Any]]:
+    """
+    One result per run of consecutive parent windows of a document, scored
+    by its best hit; results are ordered by score like plain search hits.
+    """
+    by_document: Dict[Any, List[Dict[str, Any]]] = {}
+    blocks = []
+    for group in groups:
+        if group["parent_point_id"] is None:
+            blocks.append(_block([group], parent_texts))
+        else:
+            by_document.setdefault(group["hit"].payload.get("document_id"), []).append(group)
+
+    for document_groups in by_document.values():
+        document_groups.sort(key=lambda g: g["hit"].payload.get("chunk_index"))
+        run = [document_groups[0]]
+        for group in document_groups[1:]:
+            if group["hit"].payload.get("chunk_index") == run[-1]["hit"].payload.get("chunk_index") + 1:
+                run.append(group)
+            else:
+                blocks.append(_block(run, parent_texts))
+                run = [group]
+        blocks.append(_block(run, parent_texts))
+
+    blocks.sort(key=lambda b: b["score"], reverse=True)
+    return blocks
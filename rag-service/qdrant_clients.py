@@ -0,0 +1,73 @@
+import asyncio
+import functools
+import logging
+import threading
+from typing import Any, Tuple
+
+from qdrant_client import AsyncQdrantClient, QdrantClient
+
+logger = logging.getLogger(__name__)
+
+# remote: Qdrant server over HTTP; local: in-process Qdrant (":memory:" or a storage directory)
+VECTOR_BACKENDS = ("remote", "local")
+
+
+class _SerializedClient:
+    """
+    Local-mode QdrantClient shared by the sync and async paths.
+    Local storage is not safe for concurrent use, so every call holds a lock.
+    """
+
+    def __init__(self, client: QdrantClient):
+        self._client = client
+        self._lock = threading.RLock()
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        def call(*args, **kwargs):
+            with self._lock:
+                return attr(*args, **kwargs)
+
+        return call
+
+
+class _AsyncClientAdapter:
+    """AsyncQdrantClient-compatible facade running the shared local client in worker threads."""
+
+    def __init__(self, client: _SerializedClient):
+        self._client = client
+
+    def __getattr__(self, name: str) -> Any:
+        method = getattr(self._client, name)
+
+        async def call(*args, **kwargs):
+            return await asyncio.to_thread(method, *args, **kwargs)
+
+        return call
+
+
+def build_clients(backend: str, url: str, local_path: str) -> Tuple[Any, Any]:
+    """
+    (sync client, async client) for the configured backend.
+    In local mode both share one embedded Qdrant instance, since a local
+    storage directory (or ":memory:" store) can only be opened once.
+    """
+    if backend not in VECTOR_BACKENDS:
+        raise ValueError(f"Unknown vector backend '{backend}', expected one of {VECTOR_BACKENDS}")
+
+    if backend == "remote":
+        logger.info(f"VECTOR_STORE: Connecting to Qdrant at {url}...")
+        # Async client for the request path so Qdrant round trips don't block the event loop
+        return QdrantClient(url=url, timeout=60), AsyncQdrantClient(url=url, timeout=60)
+
+    logger.info(f"VECTOR_STORE: Using in-process Qdrant (local mode) at {local_path}...")
+    if local_path == ":memory:":
+        client = QdrantClient(location=":memory:")
+    else:
+        client = QdrantClient(path=local_path)
+    shared = _SerializedClient(client)
+    return shared, _AsyncClientAdapter(shared)
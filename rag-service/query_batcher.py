@@ -0,0 +1,91 @@
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from embedding_executor import EmbeddingExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class QueryEmbeddingBatcher:
+    """
+    Coalesces concurrent query embeddings into a single encode call.
+    Queries arriving within window_ms of the first pending one (or until
+    max_batch_size is reached) are encoded together; each caller gets
+    back its own vector.
+    """
+
+    def __init__(
+        self,
+        encode_fn: Callable[[List[str], bool], List[List[float]]],
+        executor: EmbeddingExecutor,
+        window_ms: float = 5.0,
+        max_batch_size: int = 32,
+    ):
+        self._encode_fn = encode_fn
+        self._executor = executor
+        self.window_seconds = window_ms / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._batches = 0
+        self._queries = 0
+
+    async def embed(self, text: str) -> List[float]:
+        """Embed a single (unprefixed) query string."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+
+        if len(self._pending) >= self.max_batch_size or self.window_seconds <= 0:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_seconds, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        task = asyncio.ensure_future(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future]]):
+        # Identical queries in the same window share one encode slot
+        unique_texts = list(dict.fromkeys(text for text, _ in batch))
+        self._batches += 1
+        self._queries += len(batch)
+
+        try:
+            vectors = await self._executor.run(self._encode_fn, unique_texts, True)
+        except Exception as e:
+            logger.error(f"QUERY_BATCHER: Batch of {len(batch)} failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        by_text = dict(zip(unique_texts, vectors))
+        for text, future in batch:
+            if not future.done():
+                future.set_result(by_text[text])
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "window_ms": self.window_seconds * 1000.0,
+            "max_batch_size": self.max_batch_size,
+            "pending": len(self._pending),
+            "batches": self._batches,
+            "queries": self._queries,
+            "avg_batch_size": round(self._queries / self._batches, 2)
+            if self._batches
+            else 0.0,
+        }
@@ -0,0 +1,466 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from dataclasses import replace
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from qdrant_client.http import models as qmodels
+
+from document_router import DocumentRouter
+from index_catalog import IndexSpec
+
+logger = logging.getLogger(__name__)
+
+# Chunk-level payload fields; the rest of a chunk payload describes its document
+CHUNK_FIELDS = (
+    "content",
+    "content_hash",
+    "payload_hash",
+    "chunk_index",
+    "chunk_id",
+    "child_index",
+    "parent_chunk_id",
+    "parent_content",
+    "chunking",
+    "minhash",
+    "minhash_bands",
+    "shared_by",
+    "shared_refs",
+)
+DOCUMENT_FIELDS = ("document_id", "workspace_id", "conversation_id", "user_id")
+
+# Chunk overlap is found by searching for the next chunk's first characters near the end of the text
+OVERLAP_PROBE_CHARS = 16
+MAX_OVERLAP_CHARS = 8000
+
+RUNNING_STATES = ("preparing", "copying", "catching_up", "swapping")
+
+
+def _join(text: str, next_text: str) -> str:
+    """
+    Append next_text to text, dropping the part of it that overlaps text's
+    end. On repetitive text the shortest overlap wins: a repeated line is
+    better than a lost one.
+    """
+    tail = text[-MAX_OVERLAP_CHARS:]
+    probe = next_text[:OVERLAP_PROBE_CHARS]
+    start = tail.rfind(probe)
+    while start >= 0:
+        if next_text.startswith(tail[start:]):
+            return text + next_text[len(tail) - start :]
+        start = tail.rfind(probe, 0, start + len(probe) - 1)
+    return f"{text}\n{next_text}"
+
+
+def merge_chunks(texts: Iterable[str]) -> str:
+    merged = ""
+    for text in texts:
+        if text:
+            merged = _join(merged, text) if merged else text
+    return merged
+
+
+def document_text(payloads: List[Dict[str, Any]]) -> str:
+    """
+    Rebuild a document's text from its stored chunks: the parent window of
+    each parent-child group (children merged if it is missing), otherwise
+    the chunk contents in order with the chunk overlap removed.
+    """
+    windows: Dict[int, Dict[str, Any]] = {}
+    for payload in payloads:
+        window = windows.setdefault(payload.get("chunk_index", 0), {"parent": None, "chunks": []})
+        if payload.get("parent_content"):
+            window["parent"] = payload["parent_content"]
+        window["chunks"].append((payload.get("child_index", 0), payload.get("content", "")))
+
+    return merge_chunks(
+        windows[i]["parent"] or merge_chunks(text for _, text in sorted(windows[i]["chunks"]))
+        for i in sorted(windows)
+    )
+
+
+def document_fields(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Ingest request fields (ids + document metadata) recovered from one chunk payload."""
+    fields = {key: payload.get(key) for key in DOCUMENT_FIELDS}
+    fields["metadata"] = {
+        k: v for k, v in payload.items() if k not in CHUNK_FIELDS and k not in DOCUMENT_FIELDS
+    }
+    return fields
+
+
+class WriteGate:
+    """
+    Wraps every chunk write (ingest, delete) so a reindex can see what
+    changed while it was copying, and briefly hold new writes back while
+    it drains the in-flight ones and swaps collections.
+    """
+
+    def __init__(self):
+        self._open = asyncio.Event()
+        self._open.set()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._active = 0
+        self._tracking = False
+        self._documents: Set[str] = set()
+        self._scopes: List[Dict[str, Optional[str]]] = []
+
+    @asynccontextmanager
+    async def write(
+        self, document_ids: Iterable[str] = (), scope: Optional[Dict[str, Optional[str]]] = None
+    ) -> AsyncIterator[None]:
+        await self._open.wait()
+        self._active += 1
+        self._idle.clear()
+        try:
+            yield
+        finally:
+            # Recorded once the write is done (or failed part way), so a catch-up reads its result
+            if self._tracking:
+                self._documents.update(document_ids)
+                if scope:
+                    self._scopes.append(scope)
+            self._active -= 1
+            if not self._active:
+                self._idle.set()
+
+    def start_tracking(self):
+        self._tracking = True
+        self._documents, self._scopes = set(), []
+
+    def stop_tracking(self):
+        self._tracking = False
+        self._documents, self._scopes = set(), []
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self._documents or self._scopes)
+
+    def take_dirty(self) -> Tuple[Set[str], List[Dict[str, Optional[str]]]]:
+        documents, scopes = self._documents, self._scopes
+        self._documents, self._scopes = set(), []
+        return documents, scopes
+
+    async def close(self, timeout: float) -> bool:
+        """Hold new writes and wait for in-flight ones; reopens and returns False on timeout."""
+        self._open.clear()
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            self._open.set()
+            return False
+
+    def open(self):
+        self._open.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"open": self._open.is_set(), "active_writes": self._active, "tracking": self._tracking}
+
+
+class Reindexer:
+    """
+    Zero-downtime rebuild of the chunk collection with a new IndexSpec
+    (embedding model, chunking, storage settings).
+
+    A new collection is filled in the background from the text already
+    stored in the live one, pausing while embedding traffic is queued.
+    Writes that land meanwhile are replayed from the live collection, then
+    writes are held for a final catch-up, the document set and point count
+    are verified, and the alias is swapped to the new collection.
+    """
+
+    def __init__(
+        self,
+        store: Any,
+        gate: WriteGate,
+        make_chunker: Callable[[IndexSpec, Any], Any],
+        chunk_document: Callable[[Dict[str, Any], Any], List[Dict[str, Any]]],
+        on_swap: Callable[[Any], None],
+        busy_queue_depth: int = 4,
+        busy_pause_seconds: float = 0.5,
+        swap_drain_seconds: float = 30.0,
+        max_catchup_passes: int = 5,
+        max_swap_attempts: int = 5,
+    ):
+        self.store = store
+        self.gate = gate
+        self.make_chunker = make_chunker
+        self.chunk_document = chunk_document
+        self.on_swap = on_swap
+        self.busy_queue_depth = busy_queue_depth
+        self.busy_pause_seconds = busy_pause_seconds
+        self.swap_drain_seconds = swap_drain_seconds
+        self.max_catchup_passes = max_catchup_passes
+        self.max_swap_attempts = max_swap_attempts
+        self.status: Dict[str, Any] = {"state": "idle"}
+
+    @property
+    def running(self) -> bool:
+        return self.status["state"] in RUNNING_STATES
+
+    async def run(
+        self,
+        overrides: Dict[str, Any],
+        batch_documents: int = 8,
+        max_chunks_per_second: Optional[float] = None,
+        drop_previous: bool = False,
+    ) -> Dict[str, Any]:
+        """Build, verify and swap in a collection with the current spec plus `overrides`."""
+        if self.running:
+            raise RuntimeError("A reindex is already running")
+        store = self.store
+        source = store.physical_collection
+        target = f"{store.collection_alias}_{time.strftime('%Y%m%d_%H%M%S')}"
+        spec = store.index_spec.with_overrides(overrides)
+        self.status = {
+            "state": "preparing",
+            "source": source,
+            "target": target,
+            "documents": 0,
+            "documents_done": 0,
+            "chunks": 0,
+            "throttled_seconds": 0.0,
+            "failed": {},
+            "started_at": time.time(),
+        }
+        started = time.perf_counter()
+        swapped = False
+        try:
+            model = store.embedding_model
+            if not spec.same_model(store.index_spec):
+                model = await asyncio.to_thread(store.load_model, spec)
+                spec = replace(spec, vector_size=model.get_sentence_embedding_dimension())
+            chunker = await asyncio.to_thread(self.make_chunker, spec, model)
+            router = DocumentRouter(store.client, store.async_client, target, spec.vector_size)
+            await asyncio.to_thread(self._create_target, target, spec, router)
+            build = {"target": target, "model": model, "chunker": chunker, "router": router}
+            # document_id -> (points, workspace_id, conversation_id) in the new collection
+            expected: Dict[str, Tuple[int, Optional[str], Optional[str]]] = {}
+
+            self.gate.start_tracking()
+            document_ids = await self._document_ids()
+            self.status.update(state="copying", documents=len(document_ids))
+            logger.info(
+                f"REINDEX: Copying {len(document_ids)} documents from '{source}' into "
+                f"'{target}' ({spec})"
+            )
+            for i in range(0, len(document_ids), batch_documents):
+                await self._yield_to_traffic(max_chunks_per_second, started)
+                await self._copy(document_ids[i : i + batch_documents], build, expected)
+
+            self.status["state"] = "catching_up"
+            for _ in range(self.max_catchup_passes):
+                if not self.gate.dirty:
+                    break
+                await self._catch_up(build, expected)
+
+            self.status["state"] = "swapping"
+            for _ in range(self.max_swap_attempts):
+                if await self.gate.close(self.swap_drain_seconds):
+                    break
+                logger.warning("REINDEX: In-flight writes did not drain, catching up and retrying...")
+                await self._catch_up(build, expected)
+            else:
+                raise RuntimeError("In-flight writes did not drain, collection not swapped")
+            try:
+                await self._catch_up(build, expected)
+                verified = await self._verify(target, expected)
+                await store.index_catalog.aput(target, spec, **verified)
+                store.swap_collection(target, spec, model)
+                self.on_swap(chunker)
+                swapped = True
+            finally:
+                self.gate.open()
+        except BaseException as e:
+            self.status.update(state="failed", error=str(e) or type(e).__name__, finished_at=time.time())
+            if not swapped:
+                logger.error(f"REINDEX: Failed, dropping '{target}': {e}")
+                self._drop(target)
+            raise
+        finally:
+            self.gate.stop_tracking()
+
+        await asyncio.to_thread(store.restart_embedding_pool)
+        if drop_previous and source:
+            await asyncio.to_thread(self._drop, source)
+
+        result = {
+            "collection": target,
+            "previous_collection": None if drop_previous else source,
+            **verified,
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+        self.status.update(state="completed", finished_at=time.time(), result=result)
+        logger.info(f"REINDEX: Completed, alias '{store.collection_alias}' -> '{target}': {result}")
+        return result
+
+    def _create_target(self, target: str, spec: IndexSpec, router: DocumentRouter):
+        self.store.create_chunk_collection(target, spec)
+        self.store.ensure_payload_indexes(target)
+        router.ensure_collection()
+
+    def _drop(self, collection: str):
+        for name in (collection, f"{collection}_documents"):
+            try:
+                self.store.client.delete_collection(name)
+            except Exception as e:
+                logger.error(f"REINDEX: Could not delete collection '{name}': {e}")
+        try:
+            self.store.index_catalog.delete(collection)
+        except Exception as e:
+            logger.error(f"REINDEX: Could not delete catalog entry of '{collection}': {e}")
+
+    async def _document_ids(self) -> List[str]:
+        """IDs of every document in the live collection."""
+        return sorted(await self.store.adocument_chunk_counts())
+
+    async def _yield_to_traffic(self, max_chunks_per_second: Optional[float], started: float):
+        """Wait while live embedding work is queued, and stay under the chunk rate limit."""
+        pause_start = time.perf_counter()
+        while self.store.embedding_executor.stats()["queue_depth"] >= self.busy_queue_depth:
+            await asyncio.sleep(self.busy_pause_seconds)
+        if max_chunks_per_second:
+            ahead = self.status["chunks"] / max_chunks_per_second - (time.perf_counter() - started)
+            if ahead > 0:
+                await asyncio.sleep(ahead)
+        self.status["throttled_seconds"] = round(
+            self.status["throttled_seconds"] + time.perf_counter() - pause_start, 3
+        )
+
+    async def _encode(self, texts: List[str], model: Any) -> List[List[float]]:
+        store = self.store
+        if model is store.embedding_model:
+            return await store.aget_embeddings(texts)
+
+        def encode(batch: List[str]) -> List[List[float]]:
+            return model.encode(
+                [f"passage: {text}" for text in batch],
+                batch_size=store.embedding_batch_size,
+                convert_to_numpy=True,
+                show_progress_bar=False,
+            ).tolist()
+
+        # Same bounded executor as live queries, one batch per job
+        vectors: List[List[float]] = []
+        for i in range(0, len(texts), store.embedding_batch_size):
+            vectors.extend(
+                await store.embedding_executor.run(encode, texts[i : i + store.embedding_batch_size])
+            )
+        return vectors
+
+    async def _copy(
+        self,
+        document_ids: List[str],
+        build: Dict[str, Any],
+        expected: Dict[str, Tuple[int, Optional[str], Optional[str]]],
+        replace_existing: bool = False,
+    ):
+        """Re-chunk, embed and write documents from the live collection into the new one."""
+        store, target, router = self.store, build["target"], build["router"]
+        failed = self.status["failed"]
+        prepared = []
+        for document_id in document_ids:
+            failed.pop(document_id, None)
+            try:
+                if replace_existing:
+                    await store.async_client.delete(
+                        collection_name=target,
+                        points_selector=store._document_selector(document_id),
+                        wait=True,
+                    )
+                payloads = await store.adocument_chunks(document_id)
+                if not payloads:
+                    # Deleted since it was listed
+                    expected.pop(document_id, None)
+                    await router.adelete([document_id])
+                    continue
+                document = {**document_fields(payloads[0]), "content": document_text(payloads)}
+                chunks = await asyncio.to_thread(self.chunk_document, document, build["chunker"])
+                prepared.append((document, chunks))
+            except Exception as e:
+                failed[document_id] = str(e)
+
+        entries = [
+            (document["document_id"], store._point_id(chunk["metadata"]), store._build_payload(chunk))
+            for document, chunks in prepared
+            for chunk in chunks
+        ]
+        try:
+            vectors = await self._encode([payload["content"] for _, _, payload in entries], build["model"])
+            points = [
+                store._build_point(point_id, payload, vector, sparse=True)
+                for (_, point_id, payload), vector in zip(entries, vectors)
+            ]
+            for b in range(0, len(points), 256):
+                await store.async_client.upsert(
+                    collection_name=target, points=points[b : b + 256], wait=True
+                )
+        except Exception as e:
+            for document, _ in prepared:
+                failed[document["document_id"]] = str(e)
+            return
+
+        for document, chunks in prepared:
+            document_id = document["document_id"]
+            expected[document_id] = (
+                len(chunks),
+                document["workspace_id"],
+                document["conversation_id"],
+            )
+            try:
+                await router.aupdate(document_id)
+            except Exception as e:
+                failed[document_id] = f"Document vector: {e}"
+        self.status["documents_done"] += len(document_ids)
+        self.status["chunks"] += len(entries)
+
+    async def _catch_up(
+        self,
+        build: Dict[str, Any],
+        expected: Dict[str, Tuple[int, Optional[str], Optional[str]]],
+    ):
+        """Replay writes recorded since the last pass: scope deletes, then changed documents."""
+        documents, scopes = self.gate.take_dirty()
+        # Documents whose copy failed are retried with the changed ones
+        documents |= set(self.status["failed"])
+        store, target = self.store, build["target"]
+        for scope in scopes:
+            scope_filter = store._scope_filter(scope.get("workspace_id"), scope.get("conversation_id"))
+            await store.async_client.delete(
+                collection_name=target,
+                points_selector=qmodels.FilterSelector(filter=scope_filter),
+                wait=True,
+            )
+            await build["router"].adelete_by_filter(scope_filter)
+            for document_id, (_, workspace_id, conversation_id) in list(expected.items()):
+                if (not scope.get("workspace_id") or scope["workspace_id"] == workspace_id) and (
+                    not scope.get("conversation_id") or scope["conversation_id"] == conversation_id
+                ):
+                    del expected[document_id]
+        if documents:
+            logger.info(f"REINDEX: Catching up {len(documents)} changed documents...")
+            self.status["documents"] += len(documents)
+            await self._copy(sorted(documents), build, expected, replace_existing=True)
+
+    async def _verify(
+        self, target: str, expected: Dict[str, Tuple[int, Optional[str], Optional[str]]]
+    ) -> Dict[str, int]:
+        """The new collection must hold every live document, with exactly the points written."""
+        failed = self.status["failed"]
+        if failed:
+            raise RuntimeError(
+                f"{len(failed)} documents could not be reindexed, e.g. {next(iter(failed.items()))}"
+            )
+        live = set(await self._document_ids())
+        missing, extra = live - expected.keys(), expected.keys() - live
+        points = (await self.store.async_client.count(collection_name=target, exact=True)).count
+        expected_points = sum(n for n, _, _ in expected.values())
+        if missing or extra or points != expected_points:
+            raise RuntimeError(
+                f"Verification failed: {len(missing)} documents missing, {len(extra)} unexpected, "
+                f"{points} points in '{target}' (expected {expected_points})"
+            )
+        logger.info(f"REINDEX: Verified {len(live)} documents / {points} points in '{target}'")
+        return {"documents": len(live), "points": points}
@@ -0,0 +1,111 @@
+from typing import List, Sequence
+
+import numpy as np
+
+# Dynamic cutoff modes accepted by /search
+CUTOFF_MODES = ("gap", "knee")
+
+
+def score_gap_cutoff(scores: Sequence[float], min_keep: int = 1, min_gap_ratio: float = 0.3) -> int:
+    """
+    Number of leading results to keep: cut at the largest drop between
+    consecutive scores, if that drop is at least min_gap_ratio of the
+    whole score range. Scores must be sorted in descending order.
+    """
+    n = len(scores)
+    if n <= min_keep:
+        return n
+    span = scores[0] - scores[-1]
+    if span <= 0:
+        return n
+
+    gaps = [scores[i] - scores[i + 1] for i in range(min_keep - 1, n - 1)]
+    best = int(np.argmax(gaps))
+    if gaps[best] / span < min_gap_ratio:
+        return n
+    return min_keep + best
+
+
+def knee_cutoff(scores: Sequence[float], min_keep: int = 1, sensitivity: float = 0.1) -> int:
+    """
+    Number of leading results to keep, up to and including the knee of the
+    score curve (Kneedle: the point farthest below the chord between the
+    first and last score). Flat or linear curves keep everything.
+    """
+    n = len(scores)
+    if n < 3:
+        return n
+    span = scores[0] - scores[-1]
+    if span <= 0:
+        return n
+
+    x = np.linspace(0.0, 1.0, n)
+    y = (np.asarray(scores, dtype=np.float64) - scores[-1]) / span
+    distance = (1.0 - x) - y
+    knee = int(np.argmax(distance))
+    if distance[knee] < sensitivity:
+        return n
+    return max(min_keep, knee + 1)
+
+
+def cutoff_count(mode: str, scores: Sequence[float], min_keep: int = 1) -> int:
+    if mode == "gap":
+        return score_gap_cutoff(scores, min_keep)
+    if mode == "knee":
+        return knee_cutoff(scores, min_keep)
+    raise ValueError(f"Unknown cutoff mode '{mode}', expected one of {CUTOFF_MODES}")
+
+
+def dense_cutoff(
+    mode: str,
+    query_vector: Sequence[float],
+    vectors: Sequence[Sequence[float]],
+    min_keep: int = 1,
+) -> List[int]:
+    """
+    Dynamic cutoff for a ranking whose scores are not similarities (RRF
+    fusion): the cut is placed on the dense cosine scores sorted on their
+    own, and candidates at or above the cut score are kept in their original
+    order. Returns candidate indices to keep.
+    """
+    if not len(vectors):
+        return []
+    relevance = np.asarray(vectors, dtype=np.float32) @ np.asarray(query_vector, dtype=np.float32)
+    ranked = np.sort(relevance)[::-1]
+    threshold = ranked[cutoff_count(mode, ranked.tolist(), min_keep) - 1]
+    return [i for i, score in enumerate(relevance) if score >= threshold]
+
+
+def mmr_select(
+    query_vector: Sequence[float],
+    vectors: Sequence[Sequence[float]],
+    k: int,
+    lambda_: float = 0.7,
+    duplicate_threshold: float = 0.95,
+) -> List[int]:
+    """
+    Maximal marginal relevance over normalized vectors: greedily pick the
+    candidate maximizing lambda * sim(query) - (1 - lambda) * max sim(picked).
+    Candidates at least duplicate_threshold similar to a picked one are
+    dropped outright. Returns candidate indices in selection order.
+    """
+    if not len(vectors):
+        return []
+    candidates = np.asarray(vectors, dtype=np.float32)
+    relevance = candidates @ np.asarray(query_vector, dtype=np.float32)
+    similarity = candidates @ candidates.T
+
+    selected: List[int] = []
+    max_similarity = np.full(len(candidates), -np.inf, dtype=np.float32)
+    available = np.ones(len(candidates), dtype=bool)
+    while len(selected) < k and available.any():
+        redundancy = np.where(np.isinf(max_similarity), 0.0, max_similarity)
+        scores = lambda_ * relevance - (1.0 - lambda_) * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+
+        selected.append(best)
+        available[best] = False
+        max_similarity = np.maximum(max_similarity, similarity[best])
+        available &= max_similarity < duplicate_threshold
+    return selected
@@ -0,0 +1,75 @@
+import re
+import unicodedata
+import zlib
+from collections import Counter
+from typing import Dict, List
+
+from qdrant_client.http import models as qmodels
+
+# Identifiers like "ISO-9001", "LP-2024/015" or "v2.1" are kept whole and also split into parts
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-./_][a-z0-9]+)*")
+PART_PATTERN = re.compile(r"[-./_]")
+
+STOPWORDS = frozenset(
+    """
+    a al algo algunas algunos ante antes como con contra cual cuando de del desde donde
+    durante e el ella ellas ellos en entre era es esa ese eso esta este esto estos fue
+    ha han hasta la las le les lo los mas me mi muy no nos o para pero por que se ser
+    si sin sobre su sus tambien te tiene todo u un una uno unos y ya
+    an and are as at be by for from in is it of on or the to with
+    """.split()
+)
+
+
+class BM25SparseEncoder:
+    """
+    Lexical sparse vectors for Qdrant hybrid search.
+    Passage weights use BM25 term-frequency saturation; IDF is applied by
+    Qdrant at query time (sparse vector modifier=IDF), so the index never
+    needs global statistics at ingest.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, avg_doc_len: float = 300.0):
+        self.k1 = k1
+        self.b = b
+        self.avg_doc_len = avg_doc_len
+
+    @staticmethod
+    def tokenize(text: str) -> List[str]:
+        normalized = unicodedata.normalize("NFKD", text.lower())
+        normalized = "".join(ch for ch in normalized if not unicodedata.combining(ch))
+
+        tokens = []
+        for match in TOKEN_PATTERN.findall(normalized):
+            parts = PART_PATTERN.split(match)
+            if len(parts) > 1:
+                tokens.append(match)
+            tokens.extend(p for p in parts if p and p not in STOPWORDS)
+        return tokens
+
+    @staticmethod
+    def _token_id(token: str) -> int:
+        return zlib.crc32(token.encode("utf-8"))
+
+    def _to_sparse(self, weights: Dict[int, float]) -> qmodels.SparseVector:
+        indices = sorted(weights)
+        return qmodels.SparseVector(
+            indices=indices, values=[weights[i] for i in indices]
+        )
+
+    def encode_passage(self, text: str) -> qmodels.SparseVector:
+        tokens = self.tokenize(text)
+        doc_len = len(tokens)
+        norm = self.k1 * (1 - self.b + self.b * doc_len / self.avg_doc_len)
+
+        weights: Dict[int, float] = {}
+        for token, tf in Counter(tokens).items():
+            token_id = self._token_id(token)
+            weights[token_id] = weights.get(token_id, 0.0) + tf * (self.k1 + 1) / (tf + norm)
+        return self._to_sparse(weights)
+
+    def encode_query(self, text: str) -> qmodels.SparseVector:
+        weights: Dict[int, float] = {}
+        for token in set(self.tokenize(text)):
+            weights[self._token_id(token)] = 1.0
+        return self._to_sparse(weights)
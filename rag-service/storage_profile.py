@@ -0,0 +1,132 @@
+import os
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from qdrant_client.http import models as qmodels
+
+logger = logging.getLogger(__name__)
+
+QUANTIZATION_MODES = ("none", "scalar", "binary")
+
+
+@dataclass
+class StorageProfile:
+    """
+    Storage and index settings for a Qdrant vector collection.
+    Quantized vectors stay in RAM; originals can be moved to disk and
+    are only read back for rescoring.
+    """
+
+    quantization: str = "none"  # none | scalar (int8) | binary
+    vectors_on_disk: bool = False
+    hnsw_m: int = 16
+    hnsw_ef_construct: int = 100
+    search_hnsw_ef: Optional[int] = None
+    rescore: bool = True
+    oversampling: float = 2.0
+
+    def __post_init__(self):
+        if self.quantization not in QUANTIZATION_MODES:
+            raise ValueError(
+                f"Unknown quantization '{self.quantization}', expected one of {QUANTIZATION_MODES}"
+            )
+
+    @classmethod
+    def from_env(cls) -> "StorageProfile":
+        search_hnsw_ef = os.getenv("SEARCH_HNSW_EF")
+        return cls(
+            quantization=os.getenv("VECTOR_QUANTIZATION", "none").lower(),
+            vectors_on_disk=os.getenv("VECTORS_ON_DISK", "false").lower() == "true",
+            hnsw_m=int(os.getenv("HNSW_M", "16")),
+            hnsw_ef_construct=int(os.getenv("HNSW_EF_CONSTRUCT", "100")),
+            search_hnsw_ef=int(search_hnsw_ef) if search_hnsw_ef else None,
+            rescore=os.getenv("QUANTIZATION_RESCORE", "true").lower() == "true",
+            oversampling=float(os.getenv("QUANTIZATION_OVERSAMPLING", "2.0")),
+        )
+
+    def quantization_config(self) -> Optional[qmodels.QuantizationConfig]:
+        if self.quantization == "scalar":
+            return qmodels.ScalarQuantization(
+                scalar=qmodels.ScalarQuantizationConfig(
+                    type=qmodels.ScalarType.INT8, quantile=0.99, always_ram=True
+                )
+            )
+        if self.quantization == "binary":
+            return qmodels.BinaryQuantization(
+                binary=qmodels.BinaryQuantizationConfig(always_ram=True)
+            )
+        return None
+
+    def hnsw_config(self) -> qmodels.HnswConfigDiff:
+        return qmodels.HnswConfigDiff(m=self.hnsw_m, ef_construct=self.hnsw_ef_construct)
+
+    def vectors_config(self, size: int) -> qmodels.VectorParams:
+        return qmodels.VectorParams(
+            size=size, distance=qmodels.Distance.COSINE, on_disk=self.vectors_on_disk
+        )
+
+    def search_params(self) -> Optional[qmodels.SearchParams]:
+        quantization = None
+        if self.quantization != "none":
+            quantization = qmodels.QuantizationSearchParams(
+                rescore=self.rescore, oversampling=self.oversampling
+            )
+        if quantization is None and self.search_hnsw_ef is None:
+            return None
+        return qmodels.SearchParams(hnsw_ef=self.search_hnsw_ef, quantization=quantization)
+
+    def create_kwargs(self, size: int) -> Dict[str, Any]:
+        """Keyword arguments for QdrantClient.create_collection."""
+        return {
+            "vectors_config": self.vectors_config(size),
+            "hnsw_config": self.hnsw_config(),
+            "quantization_config": self.quantization_config(),
+        }
+
+    def update_kwargs(self, config: qmodels.CollectionConfig) -> Dict[str, Any]:
+        """
+        Keyword arguments for QdrantClient.update_collection that bring an
+        existing collection in line with this profile (empty if it already is).
+        """
+        update: Dict[str, Any] = {}
+
+        current_on_disk = bool(getattr(config.params.vectors, "on_disk", False))
+        if current_on_disk != self.vectors_on_disk:
+            update["vectors_config"] = {
+                "": qmodels.VectorParamsDiff(on_disk=self.vectors_on_disk)
+            }
+
+        hnsw = config.hnsw_config
+        if (hnsw.m, hnsw.ef_construct) != (self.hnsw_m, self.hnsw_ef_construct):
+            update["hnsw_config"] = self.hnsw_config()
+
+        if quantization_mode(config.quantization_config) != self.quantization:
+            update["quantization_config"] = (
+                self.quantization_config() or qmodels.Disabled.DISABLED
+            )
+
+        return update
+
+    def estimated_ram_bytes(self, points: int, size: int) -> int:
+        """Rough resident memory for vectors + HNSW graph of `points` vectors."""
+        original = 0 if self.vectors_on_disk else points * size * 4
+        if self.quantization == "scalar":
+            quantized = points * size
+        elif self.quantization == "binary":
+            quantized = points * ((size + 7) // 8)
+        else:
+            quantized = 0
+        # Level-0 links dominate the graph: 2 * m neighbours x 4 bytes each
+        graph = points * self.hnsw_m * 2 * 4
+        return original + quantized + graph
+
+
+def quantization_mode(config: Optional[qmodels.QuantizationConfig]) -> str:
+    if config is None:
+        return "none"
+    if isinstance(config, qmodels.ScalarQuantization):
+        return "scalar"
+    if isinstance(config, qmodels.BinaryQuantization):
+        return "binary"
+    return "product"
@@ -1,10 +1,39 @@
 import os
+import functools
+import asyncio
+import hashlib
+import json
+import threading
+import time
 import uuid
 import logging
-from typing import List, Dict, Any, Optional
-from qdrant_client import QdrantClient
+from collections import Counter
+from typing import AsyncIterator, Callable, Iterable, List, Dict, Any, Optional, Tuple
 from qdrant_client.http import models as qmodels
-from sentence_transformers import SentenceTransformer
+
+from document_router import DocumentRouter, dense_vector
+from embedding_backends import load_embedding_model
+from embedding_cache import EmbeddingCache
+from embedding_executor import EmbeddingExecutor
+from embedding_process_pool import EmbeddingProcessPool, resolve_workers
+from index_catalog import DEFAULT_EMBEDDING_MODEL, IndexCatalog, IndexSpec
+from near_duplicates import (
+    SHARED_FIELDS,
+    FingerprintIndex,
+    collapse_hits,
+    document_metadata,
+    fingerprint_fields,
+    promoted,
+    public_payload,
+    reference,
+    referenced_payloads,
+    without_sharers,
+)
+from parent_context import group_by_parent, merge_adjacent, missing_parent_ids
+from qdrant_clients import build_clients
+from query_batcher import QueryEmbeddingBatcher
+from result_selection import cutoff_count, dense_cutoff, mmr_select
+from sparse_encoder import BM25SparseEncoder
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -14,112 +43,1130 @@ logger = logging.getLogger(__name__)
 class VectorStore:
     def __init__(self):
         self.qdrant_url = os.getenv("QDRANT_URL", "http://qdrant:6333")
+        # Chunk reads and writes go through an alias, so a reindex can swap the collection behind it
+        self.collection_alias = os.getenv("QDRANT_COLLECTION_ALIAS", "documents")
+        self.collection_name = self.collection_alias
         # ACTUALIZACIÓN: Usando documents_v2 para el nuevo modelo de 768 dimensiones
-        self.collection_name = "documents_v2"
-        # ACTUALIZACIÓN: Modelo multilingüe superior (E5 Base)
-        self.embedding_model_name = "intfloat/multilingual-e5-base"
-        self.vector_size = 768  # Size for multilingual-e5-base
+        # (adopted by the alias on first start; reindexes build new collections)
+        self.initial_collection = os.getenv("QDRANT_INITIAL_COLLECTION", "documents_v2")
+        self.physical_collection: Optional[str] = None
+        # Model, chunking and storage settings (EMBEDDING_BACKEND, CHUNK_*, VECTOR_QUANTIZATION...);
+        # a collection built by a reindex uses its catalog entry instead
+        self._apply_spec(IndexSpec.from_env())
+        # Pre-downloaded model directory (baked into the image) and HF cache for fallbacks
+        self.embedding_model_path = os.getenv("EMBEDDING_MODEL_PATH")
+        self.embedding_cache_dir = os.getenv("EMBEDDING_CACHE_DIR")
+        # Chunks per SentenceTransformer.encode call during ingest
+        self.embedding_batch_size = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+        # Lexical (BM25) sparse vectors for hybrid search
+        self.sparse_encoder = BM25SparseEncoder(
+            avg_doc_len=float(os.getenv("BM25_AVG_DOC_LEN", "300"))
+        )
+        self.sparse_enabled = False
+        # Candidates taken from each of the dense / sparse rankings before RRF fusion
+        self.hybrid_prefetch_limit = int(os.getenv("HYBRID_PREFETCH_LIMIT", "50"))
+        # Upserts allowed in flight while the next cross-document batch is encoded
+        self.max_inflight_upserts = int(os.getenv("INGEST_MAX_INFLIGHT_UPSERTS", "2"))
+
+        # Initialize Qdrant Client: remote server, or in-process local mode (CI, single node)
+        self.vector_backend = os.getenv("VECTOR_BACKEND", "remote").lower()
+        self.client, self.async_client = build_clients(
+            self.vector_backend,
+            self.qdrant_url,
+            os.getenv("QDRANT_LOCAL_PATH", "/app/data/qdrant-local"),
+        )
+
+        # IndexSpec of each collection built by a reindex
+        self.index_catalog = IndexCatalog(self.client, self.async_client, self.collection_alias)
+        # Per-document centroid vectors for two-stage (document -> chunk) retrieval,
+        # bound to the collection behind the alias by _ensure_collection
+        self.document_router: Optional[DocumentRouter] = None
+        # Documents picked by the coarse stage before chunk search (0 = no routing)
+        self.routing_top_k = int(os.getenv("DOC_ROUTING_TOP_K", "0"))
+        # Refresh document vectors on every changed ingest; by default only when routing is
+        # on. Per-request route_documents with routing off needs DOCUMENT_VECTORS=true (or
+        # POST /document_vectors/rebuild before use), otherwise it routes on stale vectors
+        self.document_vectors_enabled = (
+            os.getenv("DOCUMENT_VECTORS", str(self.routing_top_k > 0)).lower() == "true"
+        )
+        # Child hits fetched per requested parent block when expanding parent-child chunks
+        self.parent_oversample = int(os.getenv("SEARCH_PARENT_OVERSAMPLE", "3"))
+        # MMR: candidate pool multiplier, relevance/diversity trade-off, near-duplicate cosine
+        self.mmr_candidate_factor = int(os.getenv("MMR_CANDIDATE_FACTOR", "2"))
+        self.mmr_lambda = float(os.getenv("MMR_LAMBDA", "0.7"))
+        self.mmr_duplicate_threshold = float(os.getenv("MMR_DUPLICATE_THRESHOLD", "0.95"))
+        # Near-duplicate chunks (MinHash) across documents of a workspace/conversation are
+        # stored once and referenced from each document; search collapses the rest
+        self.dedup_enabled = os.getenv("NEAR_DUPLICATE_DEDUP", "false").lower() == "true"
+        # Estimated Jaccard similarity of word 3-grams from which two chunks are duplicates
+        self.dedup_threshold = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.85"))
+        self.dedup_min_words = int(os.getenv("NEAR_DUPLICATE_MIN_WORDS", "8"))
+        # Serializes read-modify-writes of the shared_by/shared_refs payload of shared points
+        self._shared_lock = asyncio.Lock()
+
+        # Dedicated, bounded pool for CPU-bound encode calls
+        self.embedding_executor = EmbeddingExecutor(
+            max_workers=int(os.getenv("EMBEDDING_WORKERS", "2")),
+            max_queue=int(os.getenv("EMBEDDING_QUEUE_SIZE", "64")),
+        )
+        # Multi-process passage encoding for ingest: "0" = off, "auto" = one worker per
+        # core not reserved (EMBEDDING_RESERVED_CORES) for the in-process query path
+        self.embedding_processes = os.getenv("EMBEDDING_PROCESSES", "0").lower()
+        self.embedding_process_threads = int(os.getenv("EMBEDDING_PROCESS_THREADS", "1"))
+        self.embedding_reserved_cores = int(os.getenv("EMBEDDING_RESERVED_CORES", "2"))
+        self.embedding_pool: Optional[EmbeddingProcessPool] = None
+        # Query embedding cache (LRU, optionally shared through Redis)
+        self.query_cache = EmbeddingCache(
+            # Backends produce slightly different vectors, so they don't share entries
+            f"{self.embedding_model_name}:{self.embedding_backend}",
+            max_size=int(os.getenv("QUERY_CACHE_SIZE", "10000")),
+            redis_url=os.getenv("REDIS_URL")
+            if os.getenv("QUERY_CACHE_REDIS", "false").lower() == "true"
+            else None,
+            ttl_seconds=int(os.getenv("QUERY_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+        )
+        # Coalesces concurrent /search query embeddings into one encode batch
+        self.query_batcher = QueryEmbeddingBatcher(
+            self.get_embeddings,
+            self.embedding_executor,
+            window_ms=float(os.getenv("QUERY_BATCH_WINDOW_MS", "5")),
+            max_batch_size=int(os.getenv("QUERY_BATCH_MAX_SIZE", "32")),
+        )
 
-        # Initialize Qdrant Client
-        logger.info(f"VECTOR_STORE: Connecting to Qdrant at {self.qdrant_url}...")
-        self.client = QdrantClient(url=self.qdrant_url, timeout=60)
+        # Model and collection are set up by initialize(), off the import path
+        self.embedding_model = None
+        self.ready = threading.Event()
+        self.startup_error: Optional[str] = None
+        self.startup_timings: Dict[str, float] = {}
 
+    def initialize(self):
+        """
+        Staged startup, run in the background once the API is listening:
+        ensure the collection (retrying while Qdrant is unavailable), load
+        the model it was built with, warm up the encoder. Sets `ready` when done.
+        """
+        started = time.perf_counter()
+        try:
+            self._timed("collection", self._ensure_collection_with_retry)
+            self._timed("model_load", self._load_model)
+            self._timed("embedding_pool", self._start_embedding_pool)
+            self._timed("warmup", lambda: self.get_embeddings(["warmup"], is_query=True))
+        except Exception as e:
+            self.startup_error = str(e)
+            logger.error(f"VECTOR_STORE: Startup failed: {e}")
+            raise
+        self.startup_timings["total"] = round(time.perf_counter() - started, 3)
+        self.startup_error = None
+        self.ready.set()
+        logger.info(f"VECTOR_STORE: Ready (startup timings: {self.startup_timings})")
+
+    def _timed(self, phase: str, fn: Callable[[], Any]):
+        start = time.perf_counter()
+        fn()
+        self.startup_timings[phase] = round(time.perf_counter() - start, 3)
+        logger.info(f"VECTOR_STORE: Startup phase '{phase}' took {self.startup_timings[phase]}s")
+
+    def _apply_spec(self, spec: IndexSpec):
+        self.index_spec = spec
+        self.embedding_model_name = spec.embedding_model
+        self.embedding_backend = spec.embedding_backend
+        self.vector_size = spec.vector_size
+        # Quantization / on-disk / HNSW settings for the collection
+        self.storage_profile = spec.storage
+
+    def _load_model(self):
         # Initialize Embedding Model (Local CPU)
+        self.embedding_model = self.load_model(self.index_spec)
+        logger.info("VECTOR_STORE: Model loaded.")
+
+    def load_model(self, spec: IndexSpec):
+        return self._model_loader(spec)()
+
+    def _model_loader(self, spec: IndexSpec) -> Callable[[], Any]:
+        """Picklable zero-argument loader, so spawned pool workers can load the model too."""
+        source = spec.embedding_model
+        # The baked-in model directory holds the default model only
+        if (
+            spec.embedding_model == DEFAULT_EMBEDDING_MODEL
+            and self.embedding_model_path
+            and os.path.isdir(self.embedding_model_path)
+        ):
+            source = self.embedding_model_path
         logger.info(
-            f"VECTOR_STORE: Loading embedding model '{self.embedding_model_name}'..."
+            f"VECTOR_STORE: Loading embedding model '{spec.embedding_model}' "
+            f"from {source} (backend={spec.embedding_backend})..."
         )
-        self.embedding_model = SentenceTransformer(
-            self.embedding_model_name, device="cpu"
+        return functools.partial(
+            load_embedding_model,
+            source,
+            backend=spec.embedding_backend,
+            cache_folder=self.embedding_cache_dir,
+            onnx_cache_dir=os.getenv("EMBEDDING_ONNX_DIR", "/app/data/onnx"),
+            quantization_config=os.getenv("EMBEDDING_ONNX_QUANTIZATION", "avx2"),
         )
-        logger.info("VECTOR_STORE: Model loaded.")
 
-        self._ensure_collection()
+    def _start_embedding_pool(self, spawn: bool = False):
+        workers = resolve_workers(self.embedding_processes, self.embedding_reserved_cores)
+        if workers == 0:
+            return
+        if self.embedding_backend != "torch":
+            logger.warning(
+                f"VECTOR_STORE: EMBEDDING_PROCESSES requires EMBEDDING_BACKEND=torch "
+                f"(got {self.embedding_backend}), ingest keeps the in-process encoder"
+            )
+            return
+        import torch
+
+        # At startup the workers are forked before the first encode, so they share the
+        # loaded weights copy-on-write; restarts spawn them (see EmbeddingProcessPool)
+        self.embedding_pool = EmbeddingProcessPool(
+            self.embedding_model,
+            workers,
+            batch_size=self.embedding_batch_size,
+            threads_per_worker=self.embedding_process_threads,
+            loader=self._model_loader(self.index_spec) if spawn else None,
+        )
+        # The in-process encoder now only serves queries; keep it to the reserved cores
+        torch.set_num_threads(max(1, self.embedding_reserved_cores))
+
+    def _ensure_collection_with_retry(self, max_delay: float = 30.0):
+        """A Qdrant hiccup at boot delays readiness instead of crashing the service."""
+        delay = 1.0
+        while True:
+            try:
+                self._ensure_collection()
+                return
+            except Exception as e:
+                self.startup_error = f"Qdrant unavailable: {e}"
+                logger.warning(
+                    f"VECTOR_STORE: Could not ensure collection ({e}), retrying in {delay:.0f}s..."
+                )
+                time.sleep(delay)
+                delay = min(delay * 2, max_delay)
+
+    def startup_status(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready.is_set(),
+            "timings": self.startup_timings,
+            "error": self.startup_error,
+        }
+
+    # Payload fields used in search/delete filters
+    INDEXED_PAYLOAD_FIELDS = (
+        "workspace_id",
+        "conversation_id",
+        "document_id",
+        "shared_by",
+        "minhash_bands",
+    )
+    # Payload the search path reads itself (parent grouping and expansion)
+    SEARCH_PAYLOAD_FIELDS = (
+        "document_id",
+        "content",
+        "chunk_index",
+        "parent_chunk_id",
+        "parent_content",
+    )
+    # Named sparse vector holding the BM25 representation of each chunk
+    SPARSE_VECTOR_NAME = "bm25"
 
     def _ensure_collection(self):
-        """Ensure the collection exists with the correct config."""
-        try:
-            self.client.get_collection(self.collection_name)
-            logger.info(f"VECTOR_STORE: Collection '{self.collection_name}' exists.")
-        except Exception:
+        """
+        Resolve the alias to the collection behind it and ensure that collection
+        (and its document vectors) exists with the correct config. On first
+        start the alias is created over initial_collection, adopting an
+        existing collection as is.
+        """
+        self.index_catalog.ensure_collection()
+        aliases = {
+            a.alias_name: a.collection_name for a in self.client.get_aliases().aliases
+        }
+        physical = aliases.get(self.collection_alias, self.initial_collection)
+
+        spec = self.index_catalog.get(physical)
+        if spec is not None and spec != self.index_spec:
             logger.info(
-                f"VECTOR_STORE: Creating collection '{self.collection_name}'..."
+                f"VECTOR_STORE: '{physical}' was built by a reindex, using its catalog spec "
+                f"over the environment settings: {spec}"
             )
-            self.client.create_collection(
-                collection_name=self.collection_name,
-                vectors_config=qmodels.VectorParams(
-                    size=self.vector_size, distance=qmodels.Distance.COSINE
+            self._apply_spec(spec)
+            self.query_cache.model_name = f"{spec.embedding_model}:{spec.embedding_backend}"
+
+        if self.client.collection_exists(physical):
+            info = self.client.get_collection(physical)
+            logger.info(f"VECTOR_STORE: Collection '{physical}' exists.")
+            self._apply_storage_profile(physical, info.config)
+            sparse_vectors = info.config.params.sparse_vectors or {}
+            self.sparse_enabled = self.SPARSE_VECTOR_NAME in sparse_vectors
+            if not self.sparse_enabled:
+                # Sparse vectors can't be added to an existing collection; needs a reindex
+                logger.warning(
+                    f"VECTOR_STORE: '{physical}' has no sparse vectors, "
+                    "hybrid search will fall back to dense (POST /reindex adds them)."
+                )
+        else:
+            self.create_chunk_collection(physical, self.index_spec)
+            self.sparse_enabled = True
+        self.ensure_payload_indexes(physical)
+
+        if self.collection_alias not in aliases:
+            logger.info(f"VECTOR_STORE: Pointing alias '{self.collection_alias}' at '{physical}'...")
+            self.client.update_collection_aliases(
+                change_aliases_operations=[self._create_alias(physical)]
+            )
+        self._bind_collection(physical)
+        self.document_router.ensure_collection()
+
+    def create_chunk_collection(self, name: str, spec: IndexSpec):
+        logger.info(
+            f"VECTOR_STORE: Creating collection '{name}' "
+            f"(vector size {spec.vector_size}, storage profile: {spec.storage})..."
+        )
+        self.client.create_collection(
+            collection_name=name,
+            **spec.storage.create_kwargs(spec.vector_size),
+            sparse_vectors_config={
+                self.SPARSE_VECTOR_NAME: qmodels.SparseVectorParams(
+                    modifier=qmodels.Modifier.IDF
+                )
+            },
+        )
+
+    def _bind_collection(self, physical: str):
+        self.physical_collection = physical
+        self.document_router = DocumentRouter(
+            self.client, self.async_client, physical, self.vector_size
+        )
+
+    def _create_alias(self, physical: str) -> qmodels.CreateAliasOperation:
+        return qmodels.CreateAliasOperation(
+            create_alias=qmodels.CreateAlias(
+                collection_name=physical, alias_name=self.collection_alias
+            )
+        )
+
+    def swap_collection(self, physical: str, spec: IndexSpec, model: Any):
+        """
+        Atomically repoint the alias at `physical` and switch model, spec and
+        document vectors over to it. Runs without yielding to the event loop,
+        so no request sees the new collection with the old model.
+        """
+        self.client.update_collection_aliases(
+            change_aliases_operations=[
+                qmodels.DeleteAliasOperation(
+                    delete_alias=qmodels.DeleteAlias(alias_name=self.collection_alias)
                 ),
+                self._create_alias(physical),
+            ]
+        )
+        if model is not self.embedding_model and self.embedding_pool is not None:
+            # Workers hold the old model; restart_embedding_pool() spawns new ones
+            self.embedding_pool.shutdown()
+            self.embedding_pool = None
+        self._apply_spec(spec)
+        self.query_cache.model_name = f"{spec.embedding_model}:{spec.embedding_backend}"
+        self.embedding_model = model
+        self.sparse_enabled = True
+        self._bind_collection(physical)
+        logger.info(f"VECTOR_STORE: Alias '{self.collection_alias}' now points at '{physical}'")
+
+    def restart_embedding_pool(self):
+        """Start the pool again after a model swap, spawning workers as the service is live."""
+        if self.embedding_pool is None:
+            self._start_embedding_pool(spawn=True)
+
+    def _apply_storage_profile(self, name: str, config: qmodels.CollectionConfig):
+        """Update quantization / on-disk / HNSW settings of an existing collection."""
+        update = self.storage_profile.update_kwargs(config)
+        if not update:
+            return
+        logger.info(
+            f"VECTOR_STORE: Updating '{name}' to storage profile "
+            f"{self.storage_profile} ({', '.join(update)})..."
+        )
+        self.client.update_collection(collection_name=name, **update)
+
+    def ensure_payload_indexes(self, name: str):
+        """
+        Create keyword payload indexes for the filtered fields.
+        Also migrates collections created before the indexes existed.
+        Local mode has no payload indexes (filters scan), so this is skipped.
+        """
+        if self.vector_backend == "local":
+            return
+        info = self.client.get_collection(name)
+        existing = set((info.payload_schema or {}).keys())
+
+        for field_name in self.INDEXED_PAYLOAD_FIELDS:
+            if field_name in existing:
+                continue
+            logger.info(
+                f"VECTOR_STORE: Creating keyword payload index on '{name}.{field_name}'..."
             )
+            self.client.create_payload_index(
+                collection_name=name,
+                field_name=field_name,
+                field_schema=qmodels.PayloadSchemaType.KEYWORD,
+                wait=True,
+            )
+
+    async def aget_query_embedding(self, query: str) -> List[float]:
+        """Query embedding via the cache, falling back to the micro-batcher."""
+        prefixed = f"query: {query}"
+        cached = await self.query_cache.aget(prefixed)
+        if cached is not None:
+            return cached
+
+        embedding = await self.query_batcher.embed(query)
+        await self.query_cache.aput(prefixed, embedding)
+        return embedding
 
-    def get_embedding(self, text: str, is_query: bool = False) -> List[float]:
+    def get_embeddings(
+        self, texts: List[str], is_query: bool = False
+    ) -> List[List[float]]:
         """
-        Generate embedding for a single string.
-        E5 models require 'query: ' prefix for queries and 'passage: ' for documents (optional but recommended).
-        For simplicity and standard E5 usage:
-        - Queries MUST have "query: " prefix.
-        - Documents (passages) usually used as is or with "passage: ".
-        We will use "query: " for search queries and raw text for documents (symmetric is fine for base, but prefix is better).
-        Let's stick to adding "query: " only for search queries as per E5 instructions for asymmetric tasks.
+        Generate embeddings for many strings in batched encode calls.
+        E5 models expect a "query: " prefix on queries and "passage: " on documents.
         """
-        if is_query:
-            text = f"query: {text}"
-        else:
-            # E5 technically recommends "passage: " for documents but often works fine without if trained symmetrically.
-            # However, standard E5 practice acts as asymmetric. We'll add "passage: " to be safe and consistent.
-            text = f"passage: {text}"
+        if not texts:
+            return []
+
+        prefix = "query: " if is_query else "passage: "
+        prefixed = [f"{prefix}{text}" for text in texts]
+
+        embeddings = self.embedding_model.encode(
+            prefixed,
+            batch_size=self.embedding_batch_size,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+        return embeddings.tolist()
+
+    @staticmethod
+    def _point_id(metadata: Dict[str, Any]) -> str:
+        # Generate deterministic ID if not provided, or use random
+        if "chunk_id" in metadata:
+            return str(uuid.uuid5(uuid.NAMESPACE_DNS, metadata["chunk_id"]))
+        return str(uuid.uuid4())
+
+    @staticmethod
+    def content_hash(content: str) -> str:
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def payload_hash(cls, payload: Dict[str, Any]) -> str:
+        return cls.content_hash(json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str))
 
-        embedding = self.embedding_model.encode(text, convert_to_numpy=True)
-        return embedding.tolist()
+    def _build_payload(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        # Ensure payload has the content for retrieval
+        payload = doc["metadata"].copy()
+        payload["content"] = doc["content"]
+        payload["content_hash"] = self.content_hash(doc["content"])
+        if self.dedup_enabled:
+            payload.update(fingerprint_fields(doc["content"], self.dedup_min_words))
+        # Lets a re-ingest tell unchanged points apart reading back only this field
+        payload["payload_hash"] = self.payload_hash(payload)
+        return payload
 
-    def upsert_documents(self, documents: List[Dict[str, Any]]) -> int:
+    def _build_point(
+        self,
+        point_id: str,
+        payload: Dict[str, Any],
+        vector: List[float],
+        sparse: Optional[bool] = None,
+    ) -> qmodels.PointStruct:
+        if self.sparse_enabled if sparse is None else sparse:
+            vector = {
+                "": vector,
+                self.SPARSE_VECTOR_NAME: self.sparse_encoder.encode_passage(
+                    payload["content"]
+                ),
+            }
+        return qmodels.PointStruct(id=point_id, vector=vector, payload=payload)
+
+    def _log_ingest(self, count: int, total_seconds: float, encode_seconds: float):
+        logger.info(
+            f"VECTOR_STORE: Ingested {count} chunks in {total_seconds:.2f}s "
+            f"({count / max(total_seconds, 1e-6):.1f} chunks/sec, "
+            f"encode {count / max(encode_seconds, 1e-6):.1f} chunks/sec, "
+            f"batch_size={self.embedding_batch_size})"
+        )
+
+    async def aget_embeddings(
+        self, texts: List[str], is_query: bool = False
+    ) -> List[List[float]]:
         """
-        Upsert documents/chunks into Qdrant.
-        Expects list of dicts with: content, metadata (including document_id, workspace_id, etc.)
+        Async variant of get_embeddings.
+        Each batch is a separate job on the embedding pool, so searches can
+        interleave with a large ingest instead of waiting for all of it.
+        Passages go to the process pool when one is running.
         """
-        points = []
-        for doc in documents:
-            content = doc["content"]
-            metadata = doc["metadata"]
+        if self.embedding_pool is not None and not is_query:
+            return await self.embedding_pool.encode([f"passage: {text}" for text in texts])
+
+        vectors: List[List[float]] = []
+        for i in range(0, len(texts), self.embedding_batch_size):
+            batch = texts[i : i + self.embedding_batch_size]
+            vectors.extend(
+                await self.embedding_executor.run(self.get_embeddings, batch, is_query)
+            )
+        return vectors
+
+    def _plan_ingest(
+        self, documents: List[Dict[str, Any]], existing: Dict[str, Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Diff new chunks against the points already stored for a document.
+        - same point ID + same content hash: keep the vector (payload rewritten only
+          if its payload_hash changed, so `existing` needs only content_hash,
+          payload_hash and the shared fields)
+        - content hash found under another point ID (chunk moved): copy that vector
+        - otherwise: embed
+        Existing points whose ID is not produced again are stale. References
+        other documents hold on a kept point (shared_by/shared_refs) are kept.
+        """
+        hash_to_point = {
+            payload["content_hash"]: point_id
+            for point_id, payload in existing.items()
+            if payload.get("content_hash")
+        }
 
-            # Generate embedding (is_query=False)
-            vector = self.get_embedding(content, is_query=False)
+        plan = {"embed": [], "reuse": [], "payload_only": [], "unchanged": 0, "shared": []}
+        new_ids = set()
+        for doc in documents:
+            point_id = self._point_id(doc["metadata"])
+            payload = self._build_payload(doc)
+            new_ids.add(point_id)
 
-            # Generate deterministic ID if not provided, or use random
-            if "chunk_id" in metadata:
-                point_id = str(uuid.uuid5(uuid.NAMESPACE_DNS, metadata["chunk_id"]))
+            old_payload = existing.get(point_id)
+            if old_payload is not None and old_payload.get("content_hash") == payload["content_hash"]:
+                payload.update({k: old_payload[k] for k in SHARED_FIELDS if k in old_payload})
+                if old_payload.get("payload_hash") == payload["payload_hash"]:
+                    plan["unchanged"] += 1
+                else:
+                    plan["payload_only"].append((point_id, payload))
+            elif payload["content_hash"] in hash_to_point:
+                plan["reuse"].append((point_id, payload, hash_to_point[payload["content_hash"]]))
             else:
-                point_id = str(uuid.uuid4())
+                plan["embed"].append((point_id, payload))
+
+        plan["ids"] = new_ids
+        plan["stale"] = [point_id for point_id in existing if point_id not in new_ids]
+        # Existing points written over with other content
+        plan["replaced"] = [
+            point_id
+            for point_id in [p for p, _ in plan["embed"]] + [p for p, _, _ in plan["reuse"]]
+            if point_id in existing
+        ]
+        return plan
+
+    _dense_vector = staticmethod(dense_vector)
+
+    @staticmethod
+    def _ingest_summary(plan: Dict[str, Any], total: int) -> Dict[str, int]:
+        return {
+            "chunks": total,
+            "embedded": len(plan["embed"]),
+            "reused": len(plan["reuse"]),
+            "payload_updated": len(plan["payload_only"]),
+            "unchanged": plan["unchanged"],
+            "deleted": len(plan["stale"]),
+            "shared": len(plan["shared"]),
+        }
+
+    @staticmethod
+    def _plan_changed(plan: Dict[str, Any]) -> bool:
+        return bool(plan["embed"] or plan["reuse"] or plan["payload_only"] or plan["stale"])
+
+    async def _arefresh_document_vector(self, document_id: str):
+        """Recompute the routing vector of a document; a failure only affects routing."""
+        if not self.document_vectors_enabled:
+            return
+        try:
+            await self.document_router.aupdate(document_id)
+        except Exception as e:
+            logger.error(f"VECTOR_STORE: Document vector update failed for {document_id}: {e}")
+
+    async def _aexisting_chunks(
+        self, document_id: str, payload_fields: Optional[List[str]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        existing: Dict[str, Dict[str, Any]] = {}
+        offset = None
+        while True:
+            records, offset = await self.async_client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=self._document_selector(document_id).filter,
+                limit=256,
+                offset=offset,
+                with_payload=payload_fields or True,
+                with_vectors=False,
+            )
+            existing.update({str(r.id): r.payload for r in records})
+            if offset is None:
+                return existing
+
+    def _plan_points(
+        self, plan: Dict[str, Any], embedded: List[List[float]], reused: List[qmodels.Record]
+    ) -> List[qmodels.PointStruct]:
+        vectors_by_id = {str(r.id): self._dense_vector(r) for r in reused}
+        points = [
+            self._build_point(point_id, payload, vector)
+            for (point_id, payload), vector in zip(plan["embed"], embedded)
+        ]
+        points.extend(
+            self._build_point(point_id, payload, vectors_by_id[source_id])
+            for point_id, payload, source_id in plan["reuse"]
+        )
+        return points
+
+    @staticmethod
+    def _payload_operations(plan: Dict[str, Any]) -> List[qmodels.UpdateOperation]:
+        return [
+            qmodels.OverwritePayloadOperation(
+                overwrite_payload=qmodels.SetPayload(payload=payload, points=[point_id])
+            )
+            for point_id, payload in plan["payload_only"]
+        ]
+
+    @staticmethod
+    def _share_scope(payload: Dict[str, Any]) -> List[qmodels.Condition]:
+        """Chunks are only shared within the same workspace and conversation (or none)."""
+        conversation_id = payload.get("conversation_id")
+        return [
+            qmodels.FieldCondition(
+                key="workspace_id", match=qmodels.MatchValue(value=payload.get("workspace_id"))
+            ),
+            qmodels.FieldCondition(
+                key="conversation_id", match=qmodels.MatchValue(value=conversation_id)
+            )
+            if conversation_id
+            else qmodels.IsNullCondition(is_null=qmodels.PayloadField(key="conversation_id")),
+        ]
+
+    async def _ashare_near_duplicates(
+        self,
+        document_id: str,
+        documents: List[Dict[str, Any]],
+        plan: Dict[str, Any],
+        existing: Dict[str, Dict[str, Any]],
+    ):
+        """
+        Move chunks to embed that near-duplicate a chunk another document of the
+        same scope already stored from plan["embed"] to plan["shared"], as
+        (shared point ID, point ID, payload): the document references that point
+        instead of storing its own copy. A parent-child window is shared whole
+        or not at all, so a stored window always has its parent text.
+        """
+        candidates = [(point_id, payload) for point_id, payload in plan["embed"] if payload.get("minhash")]
+        if not self.dedup_enabled or not candidates:
+            return
+
+        bands = sorted({band for _, payload in candidates for band in payload["minhash_bands"]})
+        scope = qmodels.Filter(
+            must=[
+                *self._share_scope(candidates[0][1]),
+                qmodels.FieldCondition(key="minhash_bands", match=qmodels.MatchAny(any=bands)),
+            ],
+            must_not=[
+                qmodels.FieldCondition(key="document_id", match=qmodels.MatchValue(value=document_id))
+            ],
+        )
+        index = FingerprintIndex()
+        offset = None
+        while True:
+            records, offset = await self.async_client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=scope,
+                limit=1024,
+                offset=offset,
+                with_payload=["minhash", "minhash_bands"],
+                with_vectors=False,
+            )
+            for r in records:
+                index.add(str(r.id), r.payload)
+            if offset is None:
+                break
+
+        matches = {}
+        for point_id, payload in candidates:
+            shared_id = index.nearest(payload, self.dedup_threshold)
+            if shared_id is not None:
+                matches[point_id] = shared_id
+        windows = Counter(
+            doc["metadata"]["chunk_index"] for doc in documents if doc["metadata"].get("parent_chunk_id")
+        )
+        matched_windows = Counter(
+            payload["chunk_index"]
+            for point_id, payload in candidates
+            if point_id in matches and payload.get("parent_chunk_id")
+        )
+
+        shared = [
+            (matches[point_id], point_id, payload)
+            for point_id, payload in plan["embed"]
+            if point_id in matches
+            and (
+                not payload.get("parent_chunk_id")
+                or matched_windows[payload["chunk_index"]] == windows[payload["chunk_index"]]
+            )
+        ]
+        shared_ids = {point_id for _, point_id, _ in shared}
+        plan["shared"].extend(shared)
+        plan["embed"] = [(p, payload) for p, payload in plan["embed"] if p not in shared_ids]
+        plan["ids"] -= shared_ids
+        plan["replaced"] = [p for p in plan["replaced"] if p not in shared_ids]
+        plan["stale"].extend(p for p in shared_ids if p in existing)
+
+    async def _ashared_points(
+        self, condition: qmodels.Condition, with_vectors: bool = False
+    ) -> List[qmodels.Record]:
+        """Points matching the condition that other documents reference (non-empty shared_by)."""
+        shared_filter = qmodels.Filter(
+            must=[condition],
+            must_not=[qmodels.IsEmptyCondition(is_empty=qmodels.PayloadField(key="shared_by"))],
+        )
+        points: List[qmodels.Record] = []
+        offset = None
+        while True:
+            records, offset = await self.async_client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=shared_filter,
+                limit=256,
+                offset=offset,
+                with_payload=True,
+                with_vectors=with_vectors,
+            )
+            points.extend(records)
+            if offset is None:
+                return points
+
+    @staticmethod
+    def _set_payload_operation(point_id: str, payload: Dict[str, Any]) -> qmodels.UpdateOperation:
+        return qmodels.SetPayloadOperation(
+            set_payload=qmodels.SetPayload(payload=payload, points=[point_id])
+        )
+
+    async def _aset_references(
+        self, document_id: str, shared: List[Tuple[str, str, Dict[str, Any]]]
+    ) -> bool:
+        """
+        Record the document's shared chunks on the points they are shared with
+        and drop the references it no longer has. Chunks whose shared point was
+        deleted in the meantime are embedded and stored as the document's own.
+        Returns whether the document's set of points changed.
+        """
+        chunks: Dict[str, List[Dict[str, Any]]] = {}
+        for shared_id, _, payload in shared:
+            chunks.setdefault(shared_id, []).append(reference(payload))
+        metadata = document_metadata(shared[0][2]) if shared else {}
+
+        async with self._shared_lock:
+            held = await self._ashared_points(
+                qmodels.FieldCondition(key="shared_by", match=qmodels.MatchValue(value=document_id))
+            )
+            current = {}
+            if chunks:
+                current = {
+                    str(r.id): r.payload or {}
+                    for r in await self.async_client.retrieve(
+                        collection_name=self.collection_name,
+                        ids=list(chunks),
+                        with_payload=list(SHARED_FIELDS),
+                    )
+                }
+            operations = [
+                self._set_payload_operation(str(r.id), without_sharers(r.payload, [document_id]))
+                for r in held
+                if str(r.id) not in current
+            ]
+            for shared_id, payload in current.items():
+                entry = {"metadata": metadata, "chunks": chunks[shared_id]}
+                shared_refs = payload.get("shared_refs") or {}
+                if shared_refs.get(document_id) != entry:
+                    shared_refs = {**shared_refs, document_id: entry}
+                    operations.append(
+                        self._set_payload_operation(
+                            shared_id, {"shared_by": sorted(shared_refs), "shared_refs": shared_refs}
+                        )
+                    )
+            if operations:
+                await self.async_client.batch_update_points(
+                    collection_name=self.collection_name, update_operations=operations, wait=True
+                )
+
+        missing = [(point_id, payload) for shared_id, point_id, payload in shared if shared_id not in current]
+        if missing:
+            logger.warning(
+                f"VECTOR_STORE: {len(missing)} shared chunks of {document_id} lost their shared "
+                "point during ingest; storing them as its own"
+            )
+            vectors = await self.aget_embeddings([payload["content"] for _, payload in missing])
+            await self.async_client.upsert(
+                collection_name=self.collection_name,
+                points=[
+                    self._build_point(point_id, payload, vector)
+                    for (point_id, payload), vector in zip(missing, vectors)
+                ],
+                wait=True,
+            )
+        return bool(missing) or {str(r.id) for r in held} != set(current)
 
-            # Ensure payload has the content for retrieval
-            payload = metadata.copy()
-            payload["content"] = content
+    async def _ahand_over_shared(self, condition: qmodels.Condition, exclude: List[str] = ()):
+        """
+        Before points are deleted or written over: copy the ones other documents
+        still reference for the first of those documents (same vectors, its
+        chunk position and metadata), carrying the other references along.
+        `exclude` are documents being deleted, whose references do not count.
+        """
+        async with self._shared_lock:
+            points = []
+            for r in await self._ashared_points(condition, with_vectors=True):
+                payload = promoted(r.payload or {}, exclude)
+                if payload is not None:
+                    points.append(
+                        qmodels.PointStruct(id=self._point_id(payload), vector=r.vector, payload=payload)
+                    )
+            if points:
+                await self.async_client.upsert(
+                    collection_name=self.collection_name, points=points, wait=True
+                )
+                logger.info(f"VECTOR_STORE: Handed over {len(points)} shared chunks to a referencing document")
+
+    async def _arelease_replaced(self, plan: Dict[str, Any]):
+        """Hand over shared points the plan is about to delete or write over."""
+        point_ids = plan["stale"] + plan["replaced"]
+        if point_ids:
+            await self._ahand_over_shared(qmodels.HasIdCondition(has_id=point_ids))
+
+    async def _arelease_documents(self, document_ids: List[str]):
+        """Before deleting documents: drop their references and hand over the points others share."""
+        async with self._shared_lock:
+            held = await self._ashared_points(
+                qmodels.FieldCondition(key="shared_by", match=qmodels.MatchAny(any=document_ids))
+            )
+            if held:
+                await self.async_client.batch_update_points(
+                    collection_name=self.collection_name,
+                    update_operations=[
+                        self._set_payload_operation(str(r.id), without_sharers(r.payload, document_ids))
+                        for r in held
+                    ],
+                    wait=True,
+                )
+        await self._ahand_over_shared(
+            qmodels.FieldCondition(key="document_id", match=qmodels.MatchAny(any=document_ids)),
+            exclude=document_ids,
+        )
+
+    async def _areused_vectors(self, plan: Dict[str, Any]) -> List[qmodels.Record]:
+        """Source points of the reused vectors; must be read before the plan writes anything."""
+        if not plan["reuse"]:
+            return []
+        return await self.async_client.retrieve(
+            collection_name=self.collection_name,
+            ids=list({source_id for _, _, source_id in plan["reuse"]}),
+            with_vectors=True,
+        )
 
-            points.append(
-                qmodels.PointStruct(id=point_id, vector=vector, payload=payload)
+    async def _aapply_plan(
+        self,
+        plan: Dict[str, Any],
+        embed: bool = True,
+        reused: Optional[List[qmodels.Record]] = None,
+    ) -> float:
+        """
+        Embed, upsert, rewrite payloads and delete stale points; returns encode seconds.
+        embed=False skips the chunks to embed (already upserted by aingest_documents),
+        which then passes the reuse sources it read before those upserts.
+        """
+        start = time.perf_counter()
+        if reused is None:
+            reused = await self._areused_vectors(plan)
+        embedded = []
+        if embed:
+            embedded = await self.aget_embeddings(
+                [payload["content"] for _, payload in plan["embed"]], is_query=False
             )
+        encode_seconds = time.perf_counter() - start
 
+        points = self._plan_points(plan, embedded, reused)
         if points:
-            self.client.upsert(
+            await self.async_client.upsert(
                 collection_name=self.collection_name, points=points, wait=True
             )
+        operations = self._payload_operations(plan)
+        if operations:
+            await self.async_client.batch_update_points(
+                collection_name=self.collection_name, update_operations=operations, wait=True
+            )
+        if plan["stale"]:
+            await self.async_client.delete(
+                collection_name=self.collection_name,
+                points_selector=qmodels.PointIdsList(points=plan["stale"]),
+                wait=True,
+            )
+        return encode_seconds
 
-        return len(points)
+    async def aingest_document(
+        self, document_id: str, documents: List[Dict[str, Any]]
+    ) -> Dict[str, int]:
+        """
+        Incremental (re-)ingest of all chunks of one document.
+        Only new or changed chunks are embedded; stale chunks are deleted.
+        With NEAR_DUPLICATE_DEDUP, chunks another document of the workspace
+        already stored are referenced instead of embedded and stored again.
+        """
+        start = time.perf_counter()
+        existing = await self._aexisting_chunks(document_id)
+        plan = self._plan_ingest(documents, existing)
+        await self._ashare_near_duplicates(document_id, documents, plan, existing)
+        await self._arelease_replaced(plan)
+        encode_seconds = await self._aapply_plan(plan)
+        shared_changed = await self._aset_references(document_id, plan["shared"])
+        if self._plan_changed(plan) or shared_changed:
+            await self._arefresh_document_vector(document_id)
 
-    def search(
-        self,
-        query: str,
-        workspace_id: Optional[str] = None,
-        conversation_id: Optional[str] = None,
-        limit: int = 5,
-        threshold: float = 0.0,
+        summary = self._ingest_summary(plan, len(documents))
+        self._log_ingest(len(plan["embed"]), time.perf_counter() - start, encode_seconds)
+        logger.info(f"VECTOR_STORE: Document {document_id} ingest: {summary}")
+        return summary
+
+    async def aingest_documents(
+        self, batch: List[Tuple[str, List[Dict[str, Any]]]]
     ) -> List[Dict[str, Any]]:
         """
-        Search for similar documents.
+        Pipelined ingest of many (document_id, chunks) pairs.
+        Chunks to embed from all documents are packed into shared encode
+        batches, and each batch's upsert runs while the next one is encoded
+        (several batches at once when the embedding process pool is running).
+        Returns one summary per document, in order; failed documents carry "error".
+        A new document that fails after some of its points were written is
+        deleted rather than left half-ingested; a document indexed before the
+        batch is never deleted, its error says it may be partially updated.
+        Document IDs must be unique in the batch.
         """
-        # Generate embedding (is_query=True)
-        query_vector = self.get_embedding(query, is_query=True)
+        document_ids = [document_id for document_id, _ in batch]
+        if len(set(document_ids)) != len(document_ids):
+            raise ValueError("aingest_documents: duplicate document_id in batch")
+
+        start = time.perf_counter()
+        errors: Dict[int, str] = {}
+        # Documents with at least one write that landed
+        written: set = set()
+
+        existing_results = await asyncio.gather(
+            *(self._aexisting_chunks(document_id) for document_id, _ in batch),
+            return_exceptions=True,
+        )
+        plans: List[Optional[Dict[str, Any]]] = []
+        for i, ((_, documents), existing) in enumerate(zip(batch, existing_results)):
+            if isinstance(existing, Exception):
+                errors[i] = str(existing)
+                plans.append(None)
+            else:
+                plans.append(self._plan_ingest(documents, existing))
 
-        # Build filters
+        # Near-duplicate sharing and hand-over of shared points, before anything is written
+        async def prepare(i: int, plan: Dict[str, Any]):
+            try:
+                await self._ashare_near_duplicates(batch[i][0], batch[i][1], plan, existing_results[i])
+                await self._arelease_replaced(plan)
+            except Exception as e:
+                errors[i] = str(e)
+
+        await asyncio.gather(
+            *(prepare(i, plan) for i, plan in enumerate(plans) if plan is not None)
+        )
+
+        # Reused vectors are read before the embed upserts below can overwrite their sources
+        reused: Dict[int, List[qmodels.Record]] = {}
+
+        async def read_reused(i: int, plan: Dict[str, Any]):
+            try:
+                reused[i] = await self._areused_vectors(plan)
+            except Exception as e:
+                errors[i] = str(e)
+
+        await asyncio.gather(
+            *(
+                read_reused(i, plan)
+                for i, plan in enumerate(plans)
+                if plan is not None and i not in errors
+            )
+        )
+
+        pending = [
+            (i, point_id, payload)
+            for i, plan in enumerate(plans)
+            if plan is not None and i not in errors
+            for point_id, payload in plan["embed"]
+        ]
+
+        # One batch encoding at a time in-process; with the process pool, one per worker
+        encode_parallelism = self.embedding_pool.workers if self.embedding_pool is not None else 1
+        encode_slots = asyncio.Semaphore(encode_parallelism)
+        in_flight = asyncio.Semaphore(max(self.max_inflight_upserts, encode_parallelism))
+
+        async def upsert(points: List[qmodels.PointStruct], doc_indexes: set):
+            try:
+                await self.async_client.upsert(
+                    collection_name=self.collection_name, points=points, wait=True
+                )
+                written.update(doc_indexes)
+            except Exception as e:
+                for i in doc_indexes:
+                    errors.setdefault(i, str(e))
+            finally:
+                in_flight.release()
+
+        upserts = []
+        encode_seconds = 0.0
+
+        async def encode(entries: List[Tuple[int, str, Dict[str, Any]]]):
+            nonlocal encode_seconds
+            doc_indexes = {i for i, _, _ in entries}
+            async with encode_slots:
+                encode_start = time.perf_counter()
+                try:
+                    vectors = await self.aget_embeddings(
+                        [payload["content"] for _, _, payload in entries]
+                    )
+                except Exception as e:
+                    for i in doc_indexes:
+                        errors.setdefault(i, str(e))
+                    return
+                encode_seconds += time.perf_counter() - encode_start
+
+                points = [
+                    self._build_point(point_id, payload, vector)
+                    for (_, point_id, payload), vector in zip(entries, vectors)
+                ]
+                # Hold the encode slot until an upsert slot frees up (backpressure)
+                await in_flight.acquire()
+            upserts.append(asyncio.create_task(upsert(points, doc_indexes)))
+
+        await asyncio.gather(
+            *(
+                encode(pending[b : b + self.embedding_batch_size])
+                for b in range(0, len(pending), self.embedding_batch_size)
+            )
+        )
+        await asyncio.gather(*upserts)
+
+        # Reused vectors, payload rewrites, stale deletes and shared chunks, per document
+        async def finish(i: int, plan: Dict[str, Any]):
+            try:
+                await self._aapply_plan(plan, embed=False, reused=reused[i])
+                written.add(i)
+                shared_changed = await self._aset_references(batch[i][0], plan["shared"])
+            except Exception as e:
+                errors.setdefault(i, str(e))
+                return
+            if self._plan_changed(plan) or shared_changed:
+                await self._arefresh_document_vector(batch[i][0])
+
+        await asyncio.gather(
+            *(
+                finish(i, plan)
+                for i, plan in enumerate(plans)
+                if plan is not None and i not in errors
+            )
+        )
+
+        indexed_before = {
+            i for i, existing in enumerate(existing_results) if isinstance(existing, Exception) or existing
+        }
+        rollback = sorted(i for i in errors if i in written and i not in indexed_before)
+        for i in errors:
+            if i in indexed_before:
+                errors[i] += "; chunks indexed before the batch were kept (some may already be updated)"
+        if rollback:
+            try:
+                await self.adelete_documents([document_ids[i] for i in rollback])
+                note = "; its partially written chunks were deleted"
+            except Exception as e:
+                note = f"; its partially written chunks could not be deleted: {e}"
+            for i in rollback:
+                errors[i] += note
+
+        summaries = []
+        for i, ((document_id, documents), plan) in enumerate(zip(batch, plans)):
+            if i in errors:
+                logger.error(f"VECTOR_STORE: Document {document_id} ingest failed: {errors[i]}")
+                summaries.append({"chunks": 0, "embedded": 0, "error": errors[i]})
+            else:
+                summaries.append(self._ingest_summary(plan, len(documents)))
+
+        # Concurrent encodes overlap, so per-slot busy time approximates the wall clock
+        self._log_ingest(
+            len(pending), time.perf_counter() - start, max(encode_seconds / encode_parallelism, 1e-6)
+        )
+        logger.info(
+            f"VECTOR_STORE: Batch ingest of {len(batch)} documents "
+            f"({len(batch) - len(errors)} ok, {len(errors)} failed)"
+        )
+        return summaries
+
+    async def aingest_document_stream(
+        self, document_id: str, batches: AsyncIterator[List[Dict[str, Any]]]
+    ) -> Dict[str, int]:
+        """
+        Incremental ingest of a document whose chunks arrive in batches.
+        Only content/payload hashes of the existing points are held in memory, so
+        memory stays bounded by the batch size rather than the document size.
+        Stale points are deleted once the last batch has been applied.
+        """
+        start = time.perf_counter()
+        existing = await self._aexisting_chunks(
+            document_id, payload_fields=["content_hash", "payload_hash", *SHARED_FIELDS]
+        )
+        seen = set()
+        shared = []
+        summary = {key: 0 for key in self._ingest_summary(self._plan_ingest([], {}), 0)}
+        encode_seconds = 0.0
+        changed = False
+
+        async for documents in batches:
+            plan = self._plan_ingest(documents, existing)
+            await self._ashare_near_duplicates(document_id, documents, plan, existing)
+            plan["stale"] = []
+            seen.update(plan["ids"])
+            shared.extend(plan["shared"])
+            changed |= self._plan_changed(plan)
+            await self._arelease_replaced(plan)
+            encode_seconds += await self._aapply_plan(plan)
+            # Later batches plan against what is stored now: a point this batch wrote
+            # holds its new content, not the vector the snapshot recorded for it
+            for point_id, payload in [*plan["embed"], *((p, pl) for p, pl, _ in plan["reuse"])]:
+                existing[point_id] = {"content_hash": payload["content_hash"]}
+            for point_id, payload in plan["payload_only"]:
+                existing[point_id] = {**existing[point_id], "payload_hash": payload["payload_hash"]}
+            for key, value in self._ingest_summary(plan, len(documents)).items():
+                summary[key] += value
+
+        # An empty stream never wipes a previously indexed document
+        received = summary["chunks"] > 0
+        stale = [point_id for point_id in existing if point_id not in seen] if received else []
+        if stale:
+            await self._ahand_over_shared(qmodels.HasIdCondition(has_id=stale))
+            await self.async_client.delete(
+                collection_name=self.collection_name,
+                points_selector=qmodels.PointIdsList(points=stale),
+                wait=True,
+            )
+        summary["deleted"] = len(stale)
+        shared_changed = received and await self._aset_references(document_id, shared)
+        if changed or stale or shared_changed:
+            await self._arefresh_document_vector(document_id)
+
+        self._log_ingest(summary["embedded"], time.perf_counter() - start, encode_seconds)
+        logger.info(f"VECTOR_STORE: Document {document_id} stream ingest: {summary}")
+        return summary
+
+    @staticmethod
+    def _build_filter(
+        workspace_id: Optional[str], conversation_id: Optional[str]
+    ) -> Optional[qmodels.Filter]:
         must_filters = []
 
         # Filter by Workspace (Strict)
@@ -146,44 +1193,506 @@ class VectorStore:
                 )
             )
 
-        search_result = self.client.query_points(
-            collection_name=self.collection_name,
-            query=query_vector,
-            query_filter=qmodels.Filter(must=must_filters) if must_filters else None,
-            limit=limit,
-            score_threshold=None,  # Disable threshold for debugging/re-calibration
-            with_payload=True,
-        ).points
+        return qmodels.Filter(must=must_filters) if must_filters else None
+
+    @staticmethod
+    def _routed_filter(
+        query_filter: Optional[qmodels.Filter], document_ids: List[str], top_k: int
+    ) -> Optional[qmodels.Filter]:
+        """
+        Restrict the chunk search to the routed documents. Fewer than top_k
+        routed documents means the scope is small (or not backfilled yet),
+        so the chunk search stays unrestricted.
+        """
+        if len(document_ids) < top_k:
+            return query_filter
+        return qmodels.Filter(
+            must=[
+                *(query_filter.must if query_filter else []),
+                # Chunks the documents own or share with another document
+                qmodels.Filter(
+                    should=[
+                        qmodels.FieldCondition(
+                            key="document_id", match=qmodels.MatchAny(any=document_ids)
+                        ),
+                        qmodels.FieldCondition(
+                            key="shared_by", match=qmodels.MatchAny(any=document_ids)
+                        ),
+                    ]
+                ),
+            ]
+        )
 
+    @staticmethod
+    def _format_hits(hits: List[qmodels.ScoredPoint]) -> List[Dict[str, Any]]:
         results = []
-        for hit in search_result:
+        for hit in hits:
             results.append(
                 {
                     "document_id": hit.payload.get("document_id"),
                     "content": hit.payload.get("content"),
                     "score": hit.score,
-                    "metadata": hit.payload,
+                    "metadata": public_payload(hit.payload),
                 }
             )
-
         return results
 
-    def delete_document(self, document_id: str):
-        """Delete all chunks for a specific document ID."""
-        self.client.delete(
+    def _search_payload(self, fields: Optional[List[str]]):
+        """with_payload for a search whose caller needs only `fields` of the metadata (None = all)."""
+        if fields is None:
+            return True
+        internal = self.SEARCH_PAYLOAD_FIELDS + (("minhash",) if self.dedup_enabled else ())
+        return list(dict.fromkeys((*internal, *fields)))
+
+    def _fetch_limit(self, limit: int, expand_context: bool, mmr: bool = False) -> int:
+        fetch_limit = limit * self.parent_oversample if expand_context else limit
+        return fetch_limit * self.mmr_candidate_factor if mmr else fetch_limit
+
+    def _select_hits(
+        self,
+        points: List[qmodels.ScoredPoint],
+        query_vector: List[float],
+        limit: int,
+        cutoff: Optional[str],
+        mmr: bool,
+        fused: bool = False,
+    ) -> List[qmodels.ScoredPoint]:
+        """
+        Near-duplicate hits collapsed into the best one, dynamic cutoff on the
+        relevance ranking, then MMR diversification of what is left. Fused
+        (RRF) scores only reflect ranks, so for hybrid searches the cutoff is
+        taken on the dense cosine scores re-computed from the fetched vectors.
+        """
+        if self.dedup_enabled:
+            points = collapse_hits(points, self.dedup_threshold)
+        if cutoff and fused:
+            keep = dense_cutoff(cutoff, query_vector, [self._dense_vector(p) for p in points])
+            points = [points[i] for i in keep]
+        elif cutoff:
+            points = points[: cutoff_count(cutoff, [p.score for p in points])]
+        if mmr:
+            order = mmr_select(
+                query_vector,
+                [self._dense_vector(p) for p in points],
+                limit,
+                self.mmr_lambda,
+                self.mmr_duplicate_threshold,
+            )
+            points = [points[i] for i in order]
+        return points
+
+    @staticmethod
+    def _parent_texts(records: List[qmodels.Record]) -> Dict[str, str]:
+        return {str(r.id): (r.payload or {}).get("parent_content") for r in records}
+
+    def _fused(self, mode: str) -> bool:
+        """Whether the query ranks by RRF fusion rather than cosine similarity."""
+        return mode == "hybrid" and self.sparse_enabled
+
+    def _with_vectors(self, mode: str, cutoff: Optional[str], mmr: bool) -> bool:
+        return mmr or bool(cutoff and self._fused(mode))
+
+    def _query_kwargs(
+        self,
+        query: str,
+        query_vector: List[float],
+        query_filter: Optional[qmodels.Filter],
+        limit: int,
+        mode: str,
+    ) -> Dict[str, Any]:
+        """
+        Arguments for query_points.
+        mode="hybrid" fuses the dense and BM25 rankings with reciprocal rank fusion.
+        """
+        search_params = self.storage_profile.search_params()
+        if mode != "hybrid" or not self.sparse_enabled:
+            return {
+                "query": query_vector,
+                "query_filter": query_filter,
+                "limit": limit,
+                "score_threshold": None,  # Disable threshold for debugging/re-calibration
+                "search_params": search_params,
+            }
+
+        prefetch_limit = max(limit, self.hybrid_prefetch_limit)
+        return {
+            "prefetch": [
+                qmodels.Prefetch(
+                    query=query_vector,
+                    filter=query_filter,
+                    limit=prefetch_limit,
+                    params=search_params,
+                ),
+                qmodels.Prefetch(
+                    query=self.sparse_encoder.encode_query(query),
+                    using=self.SPARSE_VECTOR_NAME,
+                    filter=query_filter,
+                    limit=prefetch_limit,
+                ),
+            ],
+            "query": qmodels.FusionQuery(fusion=qmodels.Fusion.RRF),
+            "limit": limit,
+        }
+
+    async def asearch(
+        self,
+        query: str,
+        workspace_id: Optional[str] = None,
+        conversation_id: Optional[str] = None,
+        limit: int = 5,
+        threshold: float = 0.0,
+        mode: str = "dense",
+        route_documents: Optional[int] = None,
+        expand_context: bool = True,
+        cutoff: Optional[str] = None,
+        mmr: bool = False,
+        fields: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Search for similar documents (cached/micro-batched query embedding).
+        mode: "dense" (embeddings only) or "hybrid" (dense + BM25, RRF-fused).
+        route_documents: restrict the chunk search to the N documents closest
+        to the query (two-stage retrieval); None uses DOC_ROUTING_TOP_K, 0 disables.
+        expand_context: return the parent windows of matched child chunks,
+        de-duplicated and with adjacent windows merged (up to `limit` parents).
+        cutoff: "gap" or "knee" drops the tail after the biggest score drop / the knee.
+        mmr: diversify with maximal marginal relevance and drop near-duplicate chunks.
+        fields: metadata fields the caller needs; only those (plus what the search
+        itself reads) are fetched from Qdrant. None fetches the whole payload.
+        """
+        query_vector = await self.aget_query_embedding(query)
+
+        query_filter = self._build_filter(workspace_id, conversation_id)
+        top_k = self.routing_top_k if route_documents is None else route_documents
+        if top_k > 0:
+            query_filter = self._routed_filter(
+                query_filter,
+                await self.document_router.aroute(query_vector, query_filter, top_k),
+                top_k,
+            )
+
+        response = await self.async_client.query_points(
             collection_name=self.collection_name,
-            points_selector=qmodels.FilterSelector(
-                filter=qmodels.Filter(
-                    must=[
-                        qmodels.FieldCondition(
-                            key="document_id",
-                            match=qmodels.MatchValue(value=document_id),
-                        )
-                    ]
-                )
+            with_payload=self._search_payload(fields),
+            with_vectors=self._with_vectors(mode, cutoff, mmr),
+            **self._query_kwargs(
+                query,
+                query_vector,
+                query_filter,
+                self._fetch_limit(limit, expand_context, mmr),
+                mode,
             ),
+        )
+        points = self._select_hits(
+            response.points,
+            query_vector,
+            self._fetch_limit(limit, expand_context),
+            cutoff,
+            mmr,
+            self._fused(mode),
+        )
+
+        if not expand_context:
+            return self._format_hits(points)
+        groups = group_by_parent(points, limit, self._point_id)
+        missing = missing_parent_ids(groups)
+        parents = (
+            await self.async_client.retrieve(
+                collection_name=self.collection_name, ids=missing, with_payload=["parent_content"]
+            )
+            if missing
+            else []
+        )
+        return merge_adjacent(groups, self._parent_texts(parents))
+
+    async def aget_query_embeddings(self, queries: List[str]) -> List[List[float]]:
+        """Query embeddings for many queries: cache hits first, misses encoded as one batch."""
+        prefixed = [f"query: {query}" for query in queries]
+        vectors: List[Optional[List[float]]] = [
+            await self.query_cache.aget(text) for text in prefixed
+        ]
+
+        missing = list(dict.fromkeys(q for q, v in zip(queries, vectors) if v is None))
+        if missing:
+            encoded = dict(
+                zip(
+                    missing,
+                    await self.embedding_executor.run(self.get_embeddings, missing, True),
+                )
+            )
+            for i, query in enumerate(queries):
+                if vectors[i] is None:
+                    vectors[i] = encoded[query]
+            for query, vector in encoded.items():
+                await self.query_cache.aput(f"query: {query}", vector)
+
+        return vectors
+
+    async def asearch_batch(self, searches: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """
+        Run several searches in one encode batch and one Qdrant batch query.
+        Each item takes the same keys as asearch (query, workspace_id,
+        conversation_id, limit, mode, route_documents, expand_context, cutoff,
+        mmr, fields); results
+        come back in the same order. Document routing and parent-text lookups
+        for all items are one batch call each too.
+        """
+        if not searches:
+            return []
+
+        vectors = await self.aget_query_embeddings([s["query"] for s in searches])
+
+        filters = [
+            self._build_filter(s.get("workspace_id"), s.get("conversation_id")) for s in searches
+        ]
+        top_ks = [
+            self.routing_top_k if s.get("route_documents") is None else s["route_documents"]
+            for s in searches
+        ]
+        routed = [i for i, top_k in enumerate(top_ks) if top_k > 0]
+        if routed:
+            document_ids = await self.document_router.aroute_many(
+                [{"vector": vectors[i], "filter": filters[i], "top_k": top_ks[i]} for i in routed]
+            )
+            for i, ids in zip(routed, document_ids):
+                filters[i] = self._routed_filter(filters[i], ids, top_ks[i])
+
+        requests = []
+        for search, vector, query_filter in zip(searches, vectors, filters):
+            kwargs = self._query_kwargs(
+                search["query"],
+                vector,
+                query_filter,
+                self._fetch_limit(
+                    search.get("limit", 5),
+                    search.get("expand_context", True),
+                    search.get("mmr", False),
+                ),
+                search.get("mode", "dense"),
+            )
+            requests.append(
+                qmodels.QueryRequest(
+                    query=kwargs["query"],
+                    prefetch=kwargs.get("prefetch"),
+                    filter=kwargs.get("query_filter"),
+                    params=kwargs.get("search_params"),
+                    limit=kwargs["limit"],
+                    with_payload=self._search_payload(search.get("fields")),
+                    with_vector=self._with_vectors(
+                        search.get("mode", "dense"), search.get("cutoff"), search.get("mmr", False)
+                    ),
+                )
+            )
+
+        responses = await self.async_client.query_batch_points(
+            collection_name=self.collection_name, requests=requests
+        )
+
+        selected = [
+            self._select_hits(
+                response.points,
+                vector,
+                self._fetch_limit(search.get("limit", 5), search.get("expand_context", True)),
+                search.get("cutoff"),
+                search.get("mmr", False),
+                self._fused(search.get("mode", "dense")),
+            )
+            for search, vector, response in zip(searches, vectors, responses)
+        ]
+        groups = [
+            group_by_parent(points, search.get("limit", 5), self._point_id)
+            if search.get("expand_context", True)
+            else None
+            for search, points in zip(searches, selected)
+        ]
+        missing = list({
+            point_id for g in groups if g is not None for point_id in missing_parent_ids(g)
+        })
+        parents = self._parent_texts(
+            await self.async_client.retrieve(
+                collection_name=self.collection_name, ids=missing, with_payload=["parent_content"]
+            )
+            if missing
+            else []
+        )
+        return [
+            merge_adjacent(g, parents) if g is not None else self._format_hits(points)
+            for g, points in zip(groups, selected)
+        ]
+
+    @staticmethod
+    def _document_selector(document_id: str) -> qmodels.FilterSelector:
+        return qmodels.FilterSelector(
+            filter=qmodels.Filter(
+                must=[
+                    qmodels.FieldCondition(
+                        key="document_id",
+                        match=qmodels.MatchValue(value=document_id),
+                    )
+                ]
+            )
+        )
+
+    async def adelete_document(self, document_id: str):
+        """
+        Delete all chunks of a document. Chunks the document shares with
+        others are handed over to them instead of deleted.
+        """
+        await self._arelease_documents([document_id])
+        await self.async_client.delete(
+            collection_name=self.collection_name,
+            points_selector=self._document_selector(document_id),
             wait=True,
         )
+        await self.document_router.adelete([document_id])
+
+    async def adelete_documents(self, document_ids: List[str]) -> Dict[str, Any]:
+        """
+        Delete every chunk of several documents in a single filter-delete
+        (chunks shared with other documents are handed over to them).
+        """
+        await self._arelease_documents(document_ids)
+        selector = qmodels.Filter(
+            must=[
+                qmodels.FieldCondition(
+                    key="document_id", match=qmodels.MatchAny(any=document_ids)
+                )
+            ]
+        )
+        start = time.perf_counter()
+
+        matched = await self.async_client.count(
+            collection_name=self.collection_name, count_filter=selector, exact=True
+        )
+        await self.async_client.delete(
+            collection_name=self.collection_name,
+            points_selector=qmodels.FilterSelector(filter=selector),
+            wait=True,
+        )
+        await self.document_router.adelete(document_ids)
+
+        elapsed = time.perf_counter() - start
+        logger.info(
+            f"VECTOR_STORE: Deleted {matched.count} chunks of {len(document_ids)} documents "
+            f"in {elapsed:.2f}s"
+        )
+        return {"deleted_chunks": matched.count, "seconds": round(elapsed, 3)}
+
+    async def adocument_chunk_counts(self) -> Dict[str, int]:
+        """
+        Number of points per document_id in the live collection, owned or
+        shared (full payload-only scroll).
+        """
+        counts: Dict[str, int] = {}
+        offset = None
+        while True:
+            records, offset = await self.async_client.scroll(
+                collection_name=self.collection_name,
+                limit=1024,
+                offset=offset,
+                with_payload=["document_id", "shared_by"],
+                with_vectors=False,
+            )
+            for r in records:
+                payload = r.payload or {}
+                for document_id in [payload.get("document_id"), *(payload.get("shared_by") or [])]:
+                    if document_id:
+                        counts[document_id] = counts.get(document_id, 0) + 1
+            if offset is None:
+                return counts
+
+    async def adocument_chunks(self, document_id: str) -> List[Dict[str, Any]]:
+        """Payloads of every chunk of a document: its own points plus the chunks it shares."""
+        payloads = list((await self._aexisting_chunks(document_id)).values())
+        for record in await self._ashared_points(
+            qmodels.FieldCondition(key="shared_by", match=qmodels.MatchValue(value=document_id))
+        ):
+            payloads.extend(referenced_payloads(record.payload or {}, document_id))
+        return payloads
+
+    async def aindex_storage(self, in_use: Iterable[str] = ()) -> Dict[str, Any]:
+        """
+        Size of the live collection and of the collections left behind by
+        reindexes (kept for rollback, or abandoned by a crashed run) that
+        still share the alias prefix. `in_use` names collections that are not
+        stale despite the prefix, e.g. the target of a running reindex.
+        """
+        info = await self.async_client.get_collection(self.physical_collection)
+        active = {
+            self.physical_collection,
+            self.document_router.collection_name,
+            self.index_catalog.collection_name,
+            *in_use,
+        }
+        stale = []
+        for collection in (await self.async_client.get_collections()).collections:
+            if not collection.name.startswith(f"{self.collection_alias}_") or collection.name in active:
+                continue
+            points = await self.async_client.count(collection_name=collection.name, exact=False)
+            stale.append({"name": collection.name, "points": points.count})
+        return {
+            "points": info.points_count,
+            "indexed_vectors": info.indexed_vectors_count,
+            "segments": info.segments_count,
+            "status": str(info.status),
+            "stale_collections": stale,
+            "stale_points": sum(c["points"] for c in stale),
+        }
+
+    @staticmethod
+    def _scope_filter(
+        workspace_id: Optional[str], conversation_id: Optional[str]
+    ) -> qmodels.Filter:
+        """
+        Exact match on workspace_id and/or conversation_id for bulk deletes.
+        Unlike _build_filter, workspace-wide chunks (conversation_id=null) are
+        not matched by a conversation scope.
+        """
+        must = [
+            qmodels.FieldCondition(key=key, match=qmodels.MatchValue(value=value))
+            for key, value in (
+                ("workspace_id", workspace_id),
+                ("conversation_id", conversation_id),
+            )
+            if value
+        ]
+        if not must:
+            raise ValueError("A workspace_id or conversation_id is required")
+        return qmodels.Filter(must=must)
+
+    async def adelete_by_filter(
+        self, workspace_id: Optional[str] = None, conversation_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Delete every chunk of a workspace and/or conversation in a single
+        filter-delete (served by the keyword payload indexes).
+        """
+        scope = self._scope_filter(workspace_id, conversation_id)
+        start = time.perf_counter()
+
+        matched = await self.async_client.count(
+            collection_name=self.collection_name, count_filter=scope, exact=True
+        )
+        await self.async_client.delete(
+            collection_name=self.collection_name,
+            points_selector=qmodels.FilterSelector(filter=scope),
+            wait=True,
+        )
+        await self.document_router.adelete_by_filter(scope)
+
+        elapsed = time.perf_counter() - start
+        logger.info(
+            f"VECTOR_STORE: Deleted {matched.count} chunks "
+            f"(workspace_id={workspace_id}, conversation_id={conversation_id}) in {elapsed:.2f}s"
+        )
+        return {"deleted_chunks": matched.count, "seconds": round(elapsed, 3)}
+
+    async def aclose(self):
+        self.embedding_executor.shutdown()
+        if self.embedding_pool is not None:
+            self.embedding_pool.shutdown()
+        await self.query_cache.aclose()
+        await self.async_client.close()
 
 
 # Singleton instance
@@ -0,0 +1,47 @@
+"""
+Response encoding for search results, negotiated with the Accept header.
+
+Clients that send `Accept: application/msgpack` get msgpack; everyone else
+gets JSON, so older clients keep working. Results are encoded straight
+from the dicts the vector store builds, without a pydantic round trip,
+and can be narrowed to the metadata fields the caller asked for.
+"""
+
+from typing import Any, Dict, List, Optional
+
+import msgpack
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+
+MSGPACK = "application/msgpack"
+MSGPACK_TYPES = (MSGPACK, "application/x-msgpack")
+
+
+def accepts_msgpack(request: Request) -> bool:
+    """True when the Accept header lists msgpack with a non-zero quality."""
+    for item in request.headers.get("accept", "").split(","):
+        media_type, *params = [part.strip() for part in item.split(";")]
+        if media_type.lower() in MSGPACK_TYPES:
+            return not any(p.replace(" ", "") in ("q=0", "q=0.0") for p in params)
+    return False
+
+
+def select_fields(
+    results: List[Dict[str, Any]], fields: Optional[List[str]]
+) -> List[Dict[str, Any]]:
+    """Keep only the requested metadata keys (None = all of them)."""
+    if fields is None:
+        return results
+    return [
+        {**r, "metadata": {k: r["metadata"][k] for k in fields if k in r["metadata"]}}
+        for r in results
+    ]
+
+
+def encode(request: Request, content: Any) -> Response:
+    headers = {"Vary": "Accept"}
+    if accepts_msgpack(request):
+        return Response(
+            msgpack.packb(content, use_bin_type=True), media_type=MSGPACK, headers=headers
+        )
+    return JSONResponse(content, headers=headers)